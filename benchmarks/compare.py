@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+# vi: sw=4 ts=4 et:
+"""compare.py - compare two benchmark results of run_benchmarks.py
+
+Prints the median stage timings of both results and their ratio. Stages
+that became slower by more than the threshold are marked and make the
+script exit with status 1, so it can be used to check a commit against
+a baseline:
+
+  $ python benchmarks/compare.py baseline.json current.json --threshold 0.1
+
+This file is part of cMonkey Python. Please see README and LICENSE for
+more information and licensing details.
+"""
+import argparse
+import json
+import sys
+
+
+def stage_timings(result):
+    """a dictionary name -> seconds of the stages and the whole run"""
+    timings = {name: stage['median'] for name, stage in result.get('stages', {}).items()}
+    if 'run' in result:
+        timings['run'] = result['run']['seconds']
+        for name, seconds in result['run']['stages'].items():
+            timings['run:%s' % name] = seconds
+    return timings
+
+
+def compare(baseline, current, threshold):
+    """returns the list of (name, baseline seconds, current seconds, ratio, regressed)
+    of the timings that are in both results"""
+    baseline_timings = stage_timings(baseline)
+    current_timings = stage_timings(current)
+    rows = []
+    for name in sorted(set(baseline_timings.keys()) & set(current_timings.keys())):
+        before = baseline_timings[name]
+        after = current_timings[name]
+        ratio = after / before if before > 0.0 else float('inf')
+        rows.append((name, before, after, ratio, ratio > 1.0 + threshold))
+    return rows
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='compare two benchmark results')
+    parser.add_argument('baseline', help='result file of the baseline')
+    parser.add_argument('current', help='result file to compare with the baseline')
+    parser.add_argument('--threshold', type=float, default=0.1,
+                        help='relative slowdown that counts as a regression')
+    args = parser.parse_args()
+
+    with open(args.baseline) as infile:
+        baseline = json.load(infile)
+    with open(args.current) as infile:
+        current = json.load(infile)
+    if baseline['dataset'] != current['dataset']:
+        print('warning: the results are for different data sets')
+
+    print('baseline: %s (%s)' % (baseline['commit'], baseline['timestamp']))
+    print('current:  %s (%s)' % (current['commit'], current['timestamp']))
+    rows = compare(baseline, current, args.threshold)
+    print('%-32s %12s %12s %8s' % ('stage', 'baseline s', 'current s', 'ratio'))
+    for name, before, after, ratio, regressed in rows:
+        print('%-32s %12.4f %12.4f %8.2f%s' % (name, before, after, ratio,
+                                               '  SLOWER' if regressed else ''))
+    sys.exit(1 if any(row[4] for row in rows) else 0)
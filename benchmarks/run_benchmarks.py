@@ -0,0 +1,336 @@
+#!/usr/bin/env python3
+# vi: sw=4 ts=4 et:
+"""run_benchmarks.py - reproducible benchmarks of the cMonkey pipeline
+
+Runs cMonkey on a synthetic data set (see synthetic.py) and times
+
+  - the stages of an iteration in isolation: every row scoring function,
+    the column scoring, combining the row scores, density scores, size
+    compensation, the row and column membership updates and writing the
+    iteration results to the database. Each repetition is a complete,
+    forced iteration
+  - a whole run of --num_iterations iterations, together with the stage
+    totals that the run recorded in its metrics table
+
+The data set is generated from a seed and the clusters are seeded from
+the same seed, so two runs with the same arguments do the same work.
+With --motifs, motif scoring uses the deterministic MEME suite stubs in
+benchmarks/stubs, their latency can be set in the environment (see
+stubs/memesuite_stub.py).
+No network access is needed, but like cMonkey itself, the benchmarks
+need R. The results are written as JSON to benchmarks/results and can
+be compared with compare.py:
+
+  $ PYTHONPATH=.:benchmarks python benchmarks/run_benchmarks.py --size small --repeat 5
+  $ python benchmarks/compare.py benchmarks/results/before.json benchmarks/results/after.json
+
+This file is part of cMonkey Python. Please see README and LICENSE for
+more information and licensing details.
+"""
+import argparse
+import json
+import logging
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+from datetime import datetime
+
+import numpy as np
+
+import cmonkey.cmonkey_run as cmonkey_run
+import cmonkey.config as config
+import cmonkey.database as cm2db
+import cmonkey.instrumentation as instrumentation
+import cmonkey.membership as memb
+import cmonkey.persistence as persistence
+import cmonkey.scoring as scoring
+
+import synthetic
+
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results')
+
+STUBS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'stubs')
+
+ROWS_FUNCTION = {"id": "Rows",
+                 "function": {"module": "cmonkey.microarray", "class": "RowScoringFunction"}}
+NETWORKS_FUNCTION = {"id": "Networks",
+                     "function": {"module": "cmonkey.network", "class": "ScoringFunction"}}
+MOTIFS_FUNCTION = {"id": "Motifs",
+                   "function": {"module": "cmonkey.motif", "class": "MemeScoringFunction"}}
+SETS_FUNCTION = {"id": "SetEnrichment",
+                 "function": {"module": "cmonkey.set_enrichment", "class": "ScoringFunction"}}
+
+
+def make_pipeline(use_motifs, use_sets):
+    """the scoring pipeline of the benchmark run"""
+    functions = [ROWS_FUNCTION, NETWORKS_FUNCTION]
+    if use_motifs:
+        functions.append(MOTIFS_FUNCTION)
+    if use_sets:
+        functions.append(SETS_FUNCTION)
+    return {"row-scoring": {"id": "combiner",
+                            "function": {"module": "cmonkey.scoring",
+                                         "class": "ScoringFunctionCombiner"},
+                            "args": {"functions": functions}},
+            "column-scoring": {"id": "Columns",
+                               "function": {"module": "cmonkey.scoring",
+                                            "class": "ColumnScoringFunction"}}}
+
+
+def use_meme_stubs():
+    """puts the stub MEME suite in front of the PATH"""
+    if os.environ['PATH'].split(os.pathsep)[0] != STUBS_DIR:
+        os.environ['PATH'] = STUBS_DIR + os.pathsep + os.environ['PATH']
+
+
+class BenchmarkRun(cmonkey_run.CMonkeyRun):
+    """a cMonkey run on the synthetic organism of a data set"""
+
+    def __init__(self, dataset, ratios, args_in):
+        cmonkey_run.CMonkeyRun.__init__(self, ratios, args_in)
+        self.dataset = dataset
+        # k-means seeding is not reproducible, use a seeded random seeding
+        self.row_seeder = make_random_row_seeder(args_in['num_clusters'], dataset.seed)
+
+    def make_organism(self):
+        return synthetic.SyntheticOrganism(self.dataset, ratios=self.ratios)
+
+
+def make_random_row_seeder(num_clusters, seed):
+    """assigns every row to a random cluster"""
+    def seed_rows(row_membership, matrix):
+        random = np.random.RandomState(seed)
+        for row, cluster in enumerate(random.randint(1, num_clusters + 1, matrix.num_rows)):
+            row_membership[row][0] = cluster
+    return seed_rows
+
+
+def write_input_files(dataset, workdir, use_motifs, use_sets):
+    """writes the ratios, gene sets, configuration and pipeline files of the
+    data set, the ratios file is reused if it exists. Returns the paths of the
+    ratios file, the configuration file and the pipeline file"""
+    if not os.path.exists(workdir):
+        os.makedirs(workdir)
+    prefix = os.path.join(workdir, 'syn-%dx%d-%d' % (dataset.num_genes, dataset.num_conditions,
+                                                     dataset.seed))
+    ratios_path = prefix + '-ratios.tsv'
+    if not os.path.exists(ratios_path):
+        dataset.write_ratios(ratios_path)
+
+    config_path = prefix + '.ini'
+    with open(config_path, 'w') as outfile:
+        outfile.write('[General]\n')
+        outfile.write('random_seed = %d\n' % dataset.seed)
+        outfile.write('postadjust = False\n')
+        outfile.write('organism_bundle = False\n')
+        if use_sets:
+            sets_path = prefix + '-sets.json'
+            dataset.write_gene_sets(sets_path)
+            outfile.write('\n[SetEnrichment]\n')
+            outfile.write('schedule = 1,7\n')
+            outfile.write('scaling_const = 1.0\n')
+            outfile.write('set_types = synthetic\n')
+            outfile.write('\n[SetEnrichment-synthetic]\n')
+            outfile.write('set_file = %s\n' % sets_path)
+            outfile.write('weight = 1.0\n')
+
+    pipeline_path = prefix + '-pipeline.json'
+    with open(pipeline_path, 'w') as outfile:
+        json.dump(make_pipeline(use_motifs, use_sets), outfile, indent=4)
+    return ratios_path, config_path, pipeline_path
+
+
+def make_run(dataset, workdir, name, args):
+    """creates a benchmark run with the output directory workdir/name through
+    the regular cMonkey configuration"""
+    ratios_path, config_path, pipeline_path = write_input_files(dataset, workdir, args.motifs,
+                                                                args.sets)
+    outdir = os.path.join(workdir, name)
+    if os.path.exists(outdir):
+        shutil.rmtree(outdir)
+    argv = ['cmonkey2', ratios_path, '--organism', 'syn', '--out', outdir,
+            '--cachedir', os.path.join(workdir, 'cache'), '--pipeline', pipeline_path,
+            '--num_iterations', str(args.num_iterations), '--config', config_path]
+    if args.motifs:
+        use_meme_stubs()
+    else:
+        argv.append('--nomotifs')
+    if args.num_cores is not None:
+        argv += ['--num_cores', str(args.num_cores)]
+
+    orig_argv = sys.argv
+    sys.argv = argv
+    try:
+        _, params, ratios = config.setup()
+    finally:
+        sys.argv = orig_argv
+    params['multiprocessing'] = not args.nomultiprocessing
+    np.random.seed(dataset.seed)
+    return BenchmarkRun(dataset, ratios, params)
+
+
+def summarize(timings):
+    """the minimum, median and all timings of each stage"""
+    return {name: {'min': min(values), 'median': float(np.median(values)), 'all': values}
+            for name, values in timings.items()}
+
+
+def time_stages(run, repeat):
+    """times the stages of repeat forced iterations. The stages run in the
+    order of CMonkeyRun.run_iteration(), so each stage works on the results
+    of the previous one"""
+    timings = {}
+
+    def timed(name, fun):
+        start = instrumentation.timer()
+        result = fun()
+        timings.setdefault(name, []).append(instrumentation.timer() - start)
+        return result
+
+    params = run.config_params
+    membership = run.membership()
+    session = cm2db.make_session_from_config(params)
+    writer = persistence.ResultWriter(params, run.ratios, run.gene_indexes,
+                                      session=session, threaded=False)
+    try:
+        for iteration in range(1, repeat + 1):
+            iteration_result = {'iteration': iteration, 'score_means': {}}
+            result_matrices = []
+            score_scalings = []
+            for fun in run.row_scoring.scoring_functions:
+                reference_matrix = result_matrices[0] if len(result_matrices) > 0 else None
+                matrix = timed('score:%s' % fun.id,
+                               lambda: fun.compute_force(iteration_result, reference_matrix))
+                if matrix is not None:
+                    result_matrices.append(matrix)
+                    score_scalings.append(fun.scaling(iteration))
+
+            cscores = timed('score:%s' % run.column_scoring.id,
+                            lambda: run.column_scoring.compute_force(iteration_result))
+            rscores = timed('combine', lambda: scoring.combine(result_matrices, score_scalings,
+                                                               membership, iteration, params))
+            rd_scores, cd_scores = timed('density', lambda: memb.get_density_scores(
+                membership, rscores, cscores))
+            timed('compensate_size', lambda: memb.compensate_size(
+                membership, run.ratios, rd_scores, cd_scores))
+            timed('update_rows', lambda: memb.update_for_rows(
+                membership, rd_scores, params['multiprocessing']))
+            timed('update_columns', lambda: memb.update_for_cols(
+                membership, cd_scores, params['multiprocessing']))
+            timed('write_results', lambda: writer.write(session, persistence.IterationSnapshot(
+                iteration_result, membership, write_results=True, write_stats=True)))
+    finally:
+        session.close()
+    # the spans of the scoring functions are not needed here
+    instrumentation.SPANS.take()
+    return summarize(timings)
+
+
+def time_run(run):
+    """times a whole run and sums up the stage timings of its metrics table"""
+    start = instrumentation.timer()
+    run.run_iterations(start_iter=1)
+    elapsed = instrumentation.timer() - start
+    metrics = instrumentation.read_metrics(
+        os.path.join(run.config_params['output_dir'], instrumentation.METRICS_FILE), 'seconds')
+    return {'seconds': elapsed,
+            'num_iterations': run.config_params['num_iterations'],
+            'stages': {stage: sum(value for _, value in values)
+                       for stage, values in metrics.items()}}
+
+
+def git_commit():
+    """the commit of the working tree or None if it can't be determined"""
+    try:
+        output = subprocess.check_output(['git', 'rev-parse', 'HEAD'],
+                                         cwd=os.path.dirname(os.path.abspath(__file__)),
+                                         stderr=subprocess.STDOUT)
+        return output.decode('utf-8').strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmarks(args):
+    dataset = synthetic.make_dataset(args.size, args.num_genes, args.num_conditions,
+                                     args.seed)
+    workdir = os.path.abspath(args.workdir)
+    result = {'commit': git_commit(),
+              'timestamp': datetime.now().isoformat(),
+              'machine': {'platform': platform.platform(),
+                          'python': platform.python_version(),
+                          'numpy': np.__version__,
+                          'cpu_count': os.cpu_count()},
+              'dataset': dataset.describe(),
+              'settings': {'size': args.size, 'repeat': args.repeat,
+                           'num_iterations': args.num_iterations, 'sets': args.sets,
+                           'motifs': args.motifs,
+                           'multiprocessing': not args.nomultiprocessing,
+                           'num_cores': args.num_cores}}
+
+    if args.only in {None, 'stages'}:
+        logging.info("timing the stages of %d iterations", args.repeat)
+        run = make_run(dataset, workdir, 'stages', args)
+        try:
+            run.prepare_run()
+            result['stages'] = time_stages(run, args.repeat)
+        finally:
+            run.cleanup()
+
+    if args.only in {None, 'run'}:
+        logging.info("timing a run of %d iterations", args.num_iterations)
+        run = make_run(dataset, workdir, 'run', args)
+        try:
+            run.prepare_run()
+            result['run'] = time_run(run)
+        finally:
+            run.cleanup()
+    result['rss_mb'] = instrumentation.megabytes(instrumentation.process_rss())
+    return result
+
+
+def write_result(result, outfile=None):
+    """writes the result as JSON and returns the path"""
+    if outfile is None:
+        if not os.path.exists(RESULTS_DIR):
+            os.makedirs(RESULTS_DIR)
+        commit = (result['commit'] or 'unknown')[:10]
+        outfile = os.path.join(RESULTS_DIR, '%s-%dx%d-%s.json' % (
+            commit, result['dataset']['num_genes'], result['dataset']['num_conditions'],
+            datetime.now().strftime('%Y%m%d-%H%M%S')))
+    with open(outfile, 'w') as out:
+        json.dump(result, out, indent=2, sort_keys=True)
+    return outfile
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='cMonkey pipeline benchmarks')
+    parser.add_argument('--size', choices=sorted(synthetic.SIZES.keys()), default='small',
+                        help='data set size')
+    parser.add_argument('--num_genes', type=int, default=None, help='override the number of genes')
+    parser.add_argument('--num_conditions', type=int, default=None,
+                        help='override the number of conditions')
+    parser.add_argument('--seed', type=int, default=42, help='random seed of the data set')
+    parser.add_argument('--repeat', type=int, default=3,
+                        help='number of timed iterations of the stage benchmarks')
+    parser.add_argument('--num_iterations', type=int, default=20,
+                        help='number of iterations of the whole run')
+    parser.add_argument('--only', choices=['stages', 'run'], default=None,
+                        help='only run the stage or the whole run benchmarks')
+    parser.add_argument('--motifs', action='store_true',
+                        help='add motif scoring with the stub MEME suite in benchmarks/stubs')
+    parser.add_argument('--sets', action='store_true', help='add set enrichment scoring')
+    parser.add_argument('--num_cores', type=int, default=None)
+    parser.add_argument('--nomultiprocessing', action='store_true',
+                        help='run the membership updates in a single process')
+    parser.add_argument('--workdir', default=os.path.join(tempfile.gettempdir(),
+                                                          'cmonkey-benchmarks'),
+                        help='directory for the input files and the run outputs')
+    parser.add_argument('--outfile', default=None, help='result file, default: benchmarks/results')
+    args = parser.parse_args()
+
+    result = write_result(run_benchmarks(args), args.outfile)
+    print('wrote %s' % result)
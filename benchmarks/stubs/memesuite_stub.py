@@ -0,0 +1,405 @@
+# vi: sw=4 ts=4 et:
+"""memesuite_stub.py - deterministic stand-ins for the MEME suite tools
+
+The executables meme, mast and dust in this directory implement the
+command line contract that meme.MemeSuite481 expects from MEME 4.8.1 and
+later:
+
+  meme <fasta> -bfile <bg> -nmotifs <n> -minw <w> -maxw <w> -revcomp ... -text
+  mast <meme output> <fasta> -bfile <bg> ... -oc <dir>   (writes <dir>/mast.xml)
+  dust <fasta>
+  meme -version
+
+meme reports the most frequent words of the input sequences as motifs in
+MEME's text format, mast scores the sequences of the database with the
+motifs' probability matrices and writes MAST XML. The output only depends
+on the input, so runs with the stubs are reproducible. Putting this
+directory in front of the PATH makes cMonkey use the stubs:
+
+  $ PATH=benchmarks/stubs:$PATH bin/cmonkey2 ...
+
+The environment variables MEME_STUB_LATENCY, MAST_STUB_LATENCY and
+DUST_STUB_LATENCY add a delay in seconds to each call, either a fixed
+value or a range min:max, from which a delay is chosen depending on the
+input. This simulates the running times of the real tools, which
+dominate the motif stage. MEME_STUB_VERSION sets the reported version,
+for versions starting with 4.11, mast writes the MAST 4.11 XML format.
+
+This file is part of cMonkey Python. Please see README and LICENSE for
+more information and licensing details.
+"""
+import argparse
+import hashlib
+import os
+import re
+import sys
+import time
+from xml.sax.saxutils import quoteattr
+
+import numpy as np
+
+import cmonkey.seqtools as st
+
+
+DEFAULT_VERSION = '4.8.1'
+RELEASE_DATE = 'Tue Feb  7 14:03:40 EST 2012'
+MOTIF_WIDTH = 12
+ALPHABET = 'ACGT'
+SEPARATOR = '-' * 80
+STARS = '*' * 80
+
+
+def version():
+    return os.environ.get('MEME_STUB_VERSION', DEFAULT_VERSION)
+
+
+def simulate_latency(variable, data):
+    """sleeps for the latency configured in the environment variable, a range
+    min:max is mapped to a delay by the hash of data"""
+    value = os.environ.get(variable)
+    if not value:
+        return
+    if ':' in value:
+        low, high = [float(bound) for bound in value.split(':')]
+        fraction = int(hashlib.md5(data.encode('utf-8')).hexdigest()[:8], 16) / float(0xffffffff)
+        delay = low + (high - low) * fraction
+    else:
+        delay = float(value)
+    time.sleep(delay)
+
+
+def read_background(path):
+    """the order 0 letter frequencies of a MEME background file"""
+    result = {letter: 0.25 for letter in ALPHABET}
+    if path is None or not os.path.exists(path):
+        return result
+    with open(path) as infile:
+        for line in infile:
+            fields = line.split()
+            if len(fields) == 2 and fields[0] in result:
+                result[fields[0]] = float(fields[1])
+    return result
+
+
+######################################################################
+### meme
+######################################################################
+
+def find_motifs(seqs, num_motifs, width, use_revcomp):
+    """the num_motifs words of the specified width that occur in most
+    sequences. Returns a list of (word, sites), where sites is a list of
+    (seqname, strand, start) of the first occurrence in every sequence.
+    Occurrences at the ends of a sequence are not reported as sites,
+    because cMonkey's MEME parser needs a left flank"""
+    counts = {}
+    for _, seq in seqs:
+        words = set()
+        for start in range(len(seq) - width + 1):
+            word = seq[start:start + width]
+            if re.match('^[ACGT]+$', word) is None:
+                continue
+            if use_revcomp:
+                word = min(word, st.revcomp(word))
+            words.add(word)
+        for word in words:
+            counts[word] = counts.get(word, 0) + 1
+
+    ranked = sorted(counts.items(), key=lambda item: (-item[1], item[0]))
+    result = []
+    for word, _ in ranked[:num_motifs]:
+        sites = []
+        for name, seq in seqs:
+            start = find_site(seq, word)
+            if start >= 0:
+                sites.append((name, '+', start))
+            elif use_revcomp:
+                start = find_site(seq, st.revcomp(word))
+                if start >= 0:
+                    sites.append((name, '-', start))
+        result.append((word, sites))
+    # MEME always reports the number of motifs it was asked for
+    while len(result) < num_motifs:
+        result.append(('N' * width, []))
+    return result
+
+
+def find_site(seq, word):
+    """the start of the first occurrence of word that has flanks on both
+    sides or -1"""
+    start = seq.find(word, 1)
+    while start >= 0 and start + len(word) >= len(seq):
+        start = seq.find(word, start + 1)
+    return start
+
+
+def probability_matrix(word, num_sites):
+    """the probability matrix of num_sites occurrences of word with a
+    pseudocount of one site distributed over the letters"""
+    rows = []
+    for residue in word:
+        rows.append([(num_sites * (1.0 if letter == residue else 0.0) + 0.25) /
+                     (num_sites + 1.0) for letter in ALPHABET])
+    return rows
+
+
+def site_pvalue(width, seqlen):
+    return min(1.0, (0.25 ** width) * max(1, seqlen - width + 1))
+
+
+def format_meme_output(infile_path, bgfile_path, seqs, motifs, width):
+    """the motifs in MEME's text output format"""
+    seqmap = dict(seqs)
+    bg = read_background(bgfile_path)
+    lines = [STARS, 'MEME - Motif discovery tool', STARS,
+             'MEME version %s (Release date: %s)' % (version(), RELEASE_DATE), '',
+             'This output was produced by the cMonkey MEME stub.', '',
+             STARS, 'TRAINING SET', STARS,
+             'DATAFILE= %s' % infile_path, 'ALPHABET= %s' % ALPHABET, '',
+             'Background letter frequencies (from %s):' % bgfile_path,
+             ' '.join(['%s %.3f' % (letter, bg[letter]) for letter in ALPHABET]) + ' ',
+             STARS, '']
+
+    for motif_num, (word, sites) in enumerate(motifs, 1):
+        num_sites = len(sites)
+        llr = int(round(num_sites * width * 1.5))
+        evalue = 1.0e3 * (0.25 ** num_sites)
+        lines += ['', STARS,
+                  'MOTIF %2d MEME\twidth = %4d   sites = %3d   llr = %d   E-value = %.1e' %
+                  (motif_num, width, num_sites, llr, evalue),
+                  STARS, SEPARATOR,
+                  '\tMotif %d sites sorted by position p-value' % motif_num,
+                  SEPARATOR,
+                  'Sequence name            Strand  Start   P-value                Site',
+                  '-------------            ------  ----- ---------            ' + '-' * width]
+        for name, strand, start in sorted(sites, key=lambda site: site[0]):
+            seq = seqmap[name]
+            left = seq[max(0, start - 10):start]
+            right = seq[start + width:start + width + 10]
+            site = seq[start:start + width]
+            if strand == '-':
+                # sites on the reverse strand are reported in motif orientation
+                left, site, right = st.revcomp(right), st.revcomp(site), st.revcomp(left)
+            lines.append('%-24s %6s %6d  %.2e %10s %s %-10s' % (
+                name, strand, start + 1, site_pvalue(width, len(seq)), left, site, right))
+        lines += [SEPARATOR, '', SEPARATOR,
+                  '\tMotif %d position-specific probability matrix' % motif_num,
+                  SEPARATOR,
+                  'letter-probability matrix: alength= 4 w= %d nsites= %d E= %.1e ' %
+                  (width, num_sites, evalue)]
+        for row in probability_matrix(word, num_sites):
+            lines.append(' ' + '  '.join(['%.6f' % value for value in row]) + ' ')
+        lines += [SEPARATOR, '']
+    lines += [STARS, '', 'Stopped because requested number of motifs (%d) found.' % len(motifs),
+              '', 'CPU: stub', '', STARS, '']
+    return '\n'.join(lines)
+
+
+def meme_main(argv):
+    parser = argparse.ArgumentParser(prog='meme')
+    parser.add_argument('infile', nargs='?')
+    parser.add_argument('-version', action='store_true')
+    parser.add_argument('-bfile', default=None)
+    parser.add_argument('-nmotifs', type=int, default=1)
+    parser.add_argument('-minw', type=int, default=8)
+    parser.add_argument('-maxw', type=int, default=50)
+    parser.add_argument('-revcomp', action='store_true')
+    parser.add_argument('-text', action='store_true')
+    args, _ = parser.parse_known_args(argv)
+
+    if args.version:
+        print(version())
+        return 0
+    if args.infile is None:
+        sys.stderr.write('meme: no input file\n')
+        return 1
+    seqs = st.read_sequences_from_fasta_file(args.infile)
+    width = max(args.minw, min(args.maxw, MOTIF_WIDTH))
+    motifs = find_motifs(seqs, args.nmotifs, width, args.revcomp)
+    output = format_meme_output(args.infile, args.bfile, seqs, motifs, width)
+    simulate_latency('MEME_STUB_LATENCY', output)
+    sys.stdout.write(output)
+    return 0
+
+
+######################################################################
+### mast
+######################################################################
+
+def read_probability_matrices(meme_output):
+    """the probability matrices of the motifs in MEME text output"""
+    result = []
+    lines = meme_output.split('\n')
+    for index, line in enumerate(lines):
+        match = re.match(r'letter-probability matrix: alength= 4 w= (\d+)', line)
+        if match is not None:
+            width = int(match.group(1))
+            result.append([[float(value) for value in row.split()]
+                           for row in lines[index + 1:index + 1 + width]])
+    return result
+
+
+def log_odds(pssm, bg):
+    """the log2-odds matrix of a probability matrix, with a row for the
+    letters A, C, G, T and a row of zeros for other letters"""
+    bgvalues = np.array([bg[letter] for letter in ALPHABET])
+    scores = np.log2(np.maximum(np.array(pssm), 1e-4) / bgvalues)
+    return np.hstack([scores, np.zeros((len(pssm), 1))])
+
+
+def encode(seq):
+    """the sequence as an array of letter indexes, 4 for non-ACGT letters"""
+    lookup = np.full(256, 4, dtype=np.int64)
+    for index, letter in enumerate(ALPHABET):
+        lookup[ord(letter)] = index
+    return lookup[np.frombuffer(seq.upper().encode('ascii'), dtype=np.uint8)]
+
+
+def window_scores(encoded, scores):
+    """the scores of all windows of the encoded sequence"""
+    width = scores.shape[0]
+    num_windows = len(encoded) - width + 1
+    if num_windows <= 0:
+        return np.zeros(0)
+    result = np.zeros(num_windows)
+    for pos in range(width):
+        result += scores[pos, encoded[pos:pos + num_windows]]
+    return result
+
+
+def scan_sequence(seq, motifs, max_hit_pvalue):
+    """scores a sequence with the log-odds matrices of the motifs on both
+    strands. Returns the combined p-value and a list of hits
+    (pos, motif index, strand, pvalue), pos is 1-based"""
+    encoded = encode(seq)
+    revcomp_encoded = encode(st.revcomp(seq))
+    best_pvalues = []
+    hits = []
+    for motif_index, scores in enumerate(motifs):
+        width = scores.shape[0]
+        max_score = scores[:, :4].max(axis=1).sum()
+        best = 1.0
+        for strand, values in [('forward', window_scores(encoded, scores)),
+                               ('reverse', window_scores(revcomp_encoded, scores))]:
+            pvalues = np.minimum(1.0, (0.25 ** width) * np.exp2(max_score - values))
+            for window in np.where(pvalues < max_hit_pvalue)[0]:
+                # positions on the reverse strand are reported on the forward strand
+                pos = len(seq) - width - window if strand == 'reverse' else window
+                hits.append((int(pos) + 1, motif_index, strand, float(pvalues[window])))
+            if len(pvalues) > 0:
+                best = min(best, float(pvalues.min()))
+        num_windows = max(1, 2 * (len(seq) - width + 1))
+        best_pvalues.append(min(1.0, best * num_windows))
+    combined = min(1.0, min(best_pvalues) * len(motifs)) if len(best_pvalues) > 0 else 1.0
+    return combined, sorted(hits)
+
+
+def format_mast_output(meme_path, db_path, bg, seqs, motif_matrices, results,
+                       max_seq_evalue):
+    """MAST XML output of the 4.8 or the 4.11 format"""
+    is_4_11 = version().startswith('4.11')
+    lines = ["<?xml version='1.0' encoding='UTF-8' standalone='yes'?>",
+             '<mast version="%s" release="%s">' % (version(), RELEASE_DATE)]
+    lines.append('\t<alphabet type="nucleotide" bg_source="file" bg_file=%s>' % quoteattr(str(bg)))
+    lines.append('\t</alphabet>')
+    lines.append('\t<motifs source=%s name=%s>' % (quoteattr(meme_path), quoteattr(meme_path)))
+    for motif_index, matrix in enumerate(motif_matrices):
+        if is_4_11:
+            lines.append('\t\t<motif db="0" id="%d" alt="MEME" length="%d"/>' %
+                         (motif_index + 1, len(matrix)))
+        else:
+            lines.append('\t\t<motif id="motif_%d" num="%d" name="%d" width="%d"/>' %
+                         (motif_index + 1, motif_index + 1, motif_index + 1, len(matrix)))
+    lines.append('\t</motifs>')
+    lines.append('\t<sequences>')
+    for num, (name, combined, hits) in enumerate(results, 1):
+        evalue = combined * len(seqs)
+        if evalue > max_seq_evalue:
+            continue
+        seq = dict(seqs)[name]
+        if is_4_11:
+            lines.append('\t\t<sequence db="0" name=%s comment="" length="%d">' %
+                         (quoteattr(name), len(seq)))
+        else:
+            lines.append('\t\t<sequence id="seq_1_%d" db="db_1" num="%d" name=%s comment="" '
+                         'length="%d">' % (num, num, quoteattr(name), len(seq)))
+        lines.append('\t\t\t<score strand="both" combined_pvalue="%.2e" evalue="%.2g"/>' %
+                     (combined, evalue))
+        if len(hits) > 0:
+            lines.append('\t\t\t<seg start="1">')
+            lines.append('\t\t\t\t<data>\n%s\n\t\t\t\t</data>' % seq)
+            for pos, motif_index, strand, pvalue in hits:
+                if is_4_11:
+                    lines.append('\t\t\t\t<hit pos="%d" idx="%d" rc="%s" pvalue="%.1e"/>' %
+                                 (pos, motif_index, 'y' if strand == 'reverse' else 'n', pvalue))
+                else:
+                    lines.append('\t\t\t\t<hit pos="%d" motif="motif_%d" pvalue="%.1e" '
+                                 'strand="%s"/>' % (pos, motif_index + 1, pvalue, strand))
+            lines.append('\t\t\t</seg>')
+        lines.append('\t\t</sequence>')
+    lines.append('\t</sequences>')
+    lines.append('\t<runtime cycles="0" seconds="0.000"/>')
+    lines.append('</mast>')
+    return '\n'.join(lines) + '\n'
+
+
+def mast_main(argv):
+    parser = argparse.ArgumentParser(prog='mast')
+    parser.add_argument('memefile')
+    parser.add_argument('dbfile', nargs='?')
+    parser.add_argument('-d', dest='dbfile_option', default=None)
+    parser.add_argument('-bfile', default=None)
+    parser.add_argument('-ev', type=float, default=10.0)
+    parser.add_argument('-mt', type=float, default=1e-4)
+    parser.add_argument('-oc', default=None)
+    args, _ = parser.parse_known_args(argv)
+
+    dbfile = args.dbfile or args.dbfile_option
+    with open(args.memefile) as infile:
+        matrices = read_probability_matrices(infile.read())
+    if len(matrices) == 0:
+        sys.stderr.write('No input motifs pass the E-value threshold\n')
+        return 1
+    bg = read_background(args.bfile)
+    motifs = [log_odds(matrix, bg) for matrix in matrices]
+    seqs = st.read_sequences_from_fasta_file(dbfile)
+
+    results = []
+    for name, seq in seqs:
+        combined, hits = scan_sequence(seq, motifs, args.mt)
+        results.append((name, combined, hits))
+    results.sort(key=lambda result: (result[1], result[0]))
+    output = format_mast_output(args.memefile, dbfile, args.bfile, seqs, matrices, results,
+                                args.ev)
+    simulate_latency('MAST_STUB_LATENCY', output)
+
+    if args.oc is not None:
+        if not os.path.exists(args.oc):
+            os.makedirs(args.oc)
+        with open(os.path.join(args.oc, 'mast.xml'), 'w') as outfile:
+            outfile.write(output)
+    else:
+        sys.stdout.write(output)
+    return 0
+
+
+######################################################################
+### dust
+######################################################################
+
+def dust_main(argv):
+    if len(argv) < 1:
+        sys.stderr.write('usage: dust <fasta file>\n')
+        return 1
+    seqs = st.read_sequences_from_fasta_file(argv[0])
+    output = ''.join(['>%s\n%s\n' % (name, st.dust(seq)) for name, seq in seqs])
+    simulate_latency('DUST_STUB_LATENCY', output)
+    sys.stdout.write(output)
+    return 0
+
+
+def main(tool, argv):
+    mains = {'meme': meme_main, 'mast': mast_main, 'dust': dust_main}
+    return mains[tool](argv)
+
+
+__all__ = ['main', 'find_motifs', 'read_probability_matrices', 'scan_sequence']
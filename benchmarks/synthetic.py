@@ -0,0 +1,180 @@
+# vi: sw=4 ts=4 et:
+"""synthetic.py - synthetic data sets for the benchmarks
+
+A data set consists of a ratios matrix with planted co-expression
+modules, a network whose edges are denser within the modules, gene sets
+that overlap the modules and upstream sequences in which a motif
+per module is planted. All data is generated from a seed, so the same
+parameters always generate the same data set.
+
+This file is part of cMonkey Python. Please see README and LICENSE for
+more information and licensing details.
+"""
+import json
+import numpy as np
+
+import cmonkey.datamatrix as dm
+import cmonkey.network as nw
+import cmonkey.organism as org
+import cmonkey.seqtools as st
+import cmonkey.thesaurus as thesaurus
+
+
+NUCLEOTIDES = np.array(list('ACGT'))
+
+# data set sizes that can be selected by name
+SIZES = {'tiny': (200, 20),
+         'small': (1000, 50),
+         'medium': (10000, 200),
+         'large': (50000, 2000)}
+
+
+class DataSet:
+    """the synthetic data of a benchmark run. modules is an array that
+    contains the planted module of each gene, -1 for background genes"""
+
+    def __init__(self, num_genes, num_conditions, num_modules=None, seed=42,
+                 module_fraction=0.5, seq_length=250, motif_width=12):
+        self.num_genes = num_genes
+        self.num_conditions = num_conditions
+        self.num_modules = num_modules or max(2, num_genes // 50)
+        self.seed = seed
+        self.seq_length = seq_length
+        self.motif_width = motif_width
+
+        random = np.random.RandomState(seed)
+        self.genes = ['G%06d' % index for index in range(num_genes)]
+        self.conditions = ['C%04d' % index for index in range(num_conditions)]
+        in_module = random.random_sample(num_genes) < module_fraction
+        self.modules = np.where(in_module, random.randint(0, self.num_modules, num_genes), -1)
+        self.motifs = [''.join(NUCLEOTIDES[random.randint(0, 4, motif_width)])
+                       for _ in range(self.num_modules)]
+        self.__ratios = None
+
+    def describe(self):
+        return {'num_genes': self.num_genes, 'num_conditions': self.num_conditions,
+                'num_modules': self.num_modules, 'seed': self.seed}
+
+    def module_genes(self, module):
+        return [self.genes[index] for index in np.where(self.modules == module)[0]]
+
+    def ratios(self):
+        """the ratios matrix: each module follows its own profile over a
+        random half of the conditions, everything else is noise"""
+        if self.__ratios is None:
+            random = np.random.RandomState(self.seed + 1)
+            values = random.normal(0.0, 1.0, (self.num_genes, self.num_conditions))
+            for module in range(self.num_modules):
+                rows = np.where(self.modules == module)[0]
+                columns = random.random_sample(self.num_conditions) < 0.5
+                profile = random.normal(0.0, 2.0, columns.sum())
+                values[np.ix_(rows, np.where(columns)[0])] += profile
+            self.__ratios = dm.DataMatrix(self.num_genes, self.num_conditions,
+                                          self.genes, self.conditions, values=values,
+                                          copy=False)
+        return self.__ratios
+
+    def write_ratios(self, path):
+        """writes the ratios matrix as a tab-separated file that can be
+        read with datamatrix.create_from_csv()"""
+        ratios = self.ratios()
+        with open(path, 'w') as outfile:
+            outfile.write('\t'.join(ratios.column_names) + '\n')
+            for gene, row in zip(ratios.row_names, ratios.values):
+                outfile.write(gene + '\t' + '\t'.join(['%.5f' % value for value in row]) + '\n')
+
+    def network_edges(self, within_degree=5, background_degree=1):
+        """edges (gene1, gene2, score) between random pairs of genes in the
+        same module and between random pairs of all genes"""
+        random = np.random.RandomState(self.seed + 2)
+        edges = []
+        for module in range(self.num_modules):
+            members = self.module_genes(module)
+            if len(members) < 2:
+                continue
+            num_edges = len(members) * within_degree // 2
+            for gene1, gene2 in random.randint(0, len(members), (num_edges, 2)):
+                edges.append((members[gene1], members[gene2], float(random.randint(400, 1000))))
+        num_edges = self.num_genes * background_degree // 2
+        for gene1, gene2 in random.randint(0, self.num_genes, (num_edges, 2)):
+            edges.append((self.genes[gene1], self.genes[gene2], float(random.randint(150, 700))))
+        return edges
+
+    def gene_sets(self, noise=0.2):
+        """a gene set per module, a fraction of its genes is replaced by
+        random genes"""
+        random = np.random.RandomState(self.seed + 3)
+        result = {}
+        for module in range(self.num_modules):
+            members = self.module_genes(module)
+            num_random = int(len(members) * noise)
+            members = members[num_random:] + [self.genes[index] for index in
+                                              random.randint(0, self.num_genes, num_random)]
+            if len(members) > 0:
+                result['set%04d' % module] = sorted(set(members))
+        return result
+
+    def write_gene_sets(self, path):
+        with open(path, 'w') as outfile:
+            json.dump(self.gene_sets(), outfile)
+
+    def upstream_sequences(self):
+        """upstream sequences of all genes, the motif of its module is planted
+        into the sequence of a module gene at a random position, on a random
+        strand"""
+        random = np.random.RandomState(self.seed + 4)
+        residues = NUCLEOTIDES[random.randint(0, 4, (self.num_genes, self.seq_length))]
+        result = {}
+        for index, gene in enumerate(self.genes):
+            seq = ''.join(residues[index])
+            module = self.modules[index]
+            if module >= 0:
+                motif = self.motifs[module]
+                if random.random_sample() < 0.5:
+                    motif = st.revcomp(motif)
+                pos = random.randint(0, self.seq_length - self.motif_width)
+                seq = seq[:pos] + motif + seq[pos + self.motif_width:]
+            result[gene] = (st.Location('chromosome', index * 1000,
+                                        index * 1000 + self.seq_length, False), seq)
+        return result
+
+
+class SyntheticOrganism(org.OrganismBase):
+    """An organism that knows the genes, network and upstream sequences of
+    a synthetic data set. Gene names are their own primary names"""
+
+    def __init__(self, dataset, ratios=None, use_network=True):
+        self.dataset = dataset
+        self.__synonyms = thesaurus.as_thesaurus({gene: gene for gene in dataset.genes})
+        self.__seqs = None
+        network_factories = [self.__make_network] if use_network else []
+        org.OrganismBase.__init__(self, 'syn', network_factories, ratios=ratios)
+
+    def __make_network(self, organism, ratios):
+        return nw.Network.create('synthetic', self.dataset.network_edges(), 1.0,
+                                 organism=organism, ratios=ratios)
+
+    def thesaurus(self):
+        return self.__synonyms
+
+    def species(self):
+        return 'Synthetic organism'
+
+    def sequences_for_genes_search(self, genes, seqtype='upstream'):
+        if self.__seqs is None:
+            self.__seqs = self.dataset.upstream_sequences()
+        return {gene: self.__seqs[gene] for gene in genes if gene in self.__seqs}
+
+    def sequences_for_genes_scan(self, genes, seqtype='upstream'):
+        return self.sequences_for_genes_search(genes, seqtype)
+
+
+def make_dataset(size=None, num_genes=None, num_conditions=None, seed=42):
+    """returns the data set of a named size, num_genes and num_conditions
+    override the size"""
+    default_genes, default_conditions = SIZES[size or 'small']
+    return DataSet(num_genes or default_genes, num_conditions or default_conditions,
+                   seed=seed)
+
+
+__all__ = ['DataSet', 'SyntheticOrganism', 'make_dataset', 'SIZES']
@@ -3,9 +3,6 @@
 This file is part of cMonkey Python. Please see README and LICENSE for
 more information and licensing details.
 
-To Do: Write a 'save' and 'load' function that pickles/writes and unpickles/reads.
-      Integrate that with main cMonkey save and load functions.
-
 To Do: Write a function for resplitting clusters based on a new ratios matrix
 
 This module implements the algorithm described in:
@@ -13,6 +10,8 @@ Bicluster Sampled Coherence Metric (BSCM) provides an accurate environmental con
 Danziger et al.
 BMC Systems Biology, 2015
 """
+import os
+import hashlib
 import numpy as np
 import scipy as sp
 import math
@@ -26,14 +25,32 @@ import cmonkey.util as util
 
 
 def getVarianceMeanSDvect_mp_wrapper(args):
-    return getVarianceMeanSDvect(args[0], args[1], args[2], args[3], args[4], args[5], args[6])
+    return getVarianceMeanSDvect(*args)
+
+
+def sampleVariances(values, perm, n, rng):
+    """Draw one sample of n values without replacement for each row of the
+    permutation matrix perm and return the variances of the samples.
+    This is a partial Fisher-Yates shuffle that is run on all rows at once:
+    after step i, perm[:, :i+1] holds a uniform sample for every row. perm
+    stays a permutation, so it can be reused for the next chunk without
+    resetting it.
+    """
+    numRows, numValues = perm.shape
+    rows = np.arange(numRows)
+    for i in range(n):
+        j = rng.integers(i, numValues, size=numRows)
+        tmp = perm[rows, i]
+        perm[rows, i] = perm[rows, j]
+        perm[rows, j] = tmp
+    return values[perm[:, :n]].var(axis=1)
 
 
 def getVarianceMeanSDvect(ratioVect, n, tolerance = 0.01, maxTime=600, chunkSize=200, verbose=False,
-                          expName=None):
+                          expName=None, seed=None):
     """Given a ratios matrix and a number of genes, figure out the expected distribution of variances
        Will sample background until the mean and sd converge or the operation times out
-       Will return a list of variances to be used for statistical tests,
+       Will return an array of variances to be used for statistical tests,
        or return nan if only nan values in ratioVect
 
      Keyword arguments:
@@ -44,50 +61,121 @@ def getVarianceMeanSDvect(ratioVect, n, tolerance = 0.01, maxTime=600, chunkSize
      chunkSize  -- The number of samples to add between test (DEFAULT: 200)
      verbose    -- Set to false to suppress output (DEFAULT: False)
      expName    -- Set to echo this name if verbose = True (DEFAULT: None)
+     seed       -- Seed for the random number generator, if None, it is drawn
+                   from Python's random module (DEFAULT: None)
 
      Useage:
      varDist = getVarianceMeanSD(ratioVect, n)
     """
-    ratioVect = [x for x in ratioVect if not math.isnan(x)]
+    ratioVect = np.asarray(ratioVect, dtype='float64')
+    ratioVect = ratioVect[~np.isnan(ratioVect)]
 
     if verbose:
         logging.info("Calculating background for %d sampled from %d in %s", n, len(ratioVect), expName)
 
     if n <= 1 or n > len(ratioVect):
-        return [np.nan]
-
-    varList = []
+        return np.array([np.nan])
+
+    if seed is None:
+        seed = random.getrandbits(64)
+    rng = np.random.default_rng(seed)
+    perm = np.tile(np.arange(len(ratioVect)), (chunkSize, 1))
+
+    # the sampled variances are stored in a preallocated array, which is
+    # doubled when it is full
+    varList = np.empty(chunkSize * 16)
+    count = 0
+
+    # running mean and sum of squared differences (Welford/Chan), so the
+    # convergence test does not need to look at all previous samples
+    mean = 0.0
+    m2 = 0.0
     repeat = True
     startTime = dt.datetime.now()
 
     while repeat:
-        newVars = []
-        for i in range(0, chunkSize):
-            curSample = random.sample(ratioVect, n)
-            try:
-                newVar = np.var(curSample)
-            except:
-                newVar = 0
-            newVars.append(newVar)
-
-        if len(varList) > 0: #True if past the first sample
-            oldMean = np.mean(varList)
-            oldVar = np.var(varList)
-            varList = varList+newVars
-            newMean = np.mean(varList)
-            newVar = np.var(varList)
-            meanWinTol = abs(newMean-oldMean) < tolerance*abs(oldMean)
+        newVars = sampleVariances(ratioVect, perm, n, rng)
+
+        if count + chunkSize > len(varList):
+            varList = np.concatenate((varList, np.empty(len(varList))))
+        varList[count:count + chunkSize] = newVars
+
+        chunkMean = newVars.mean()
+        chunkM2 = np.square(newVars - chunkMean).sum()
+        newCount = count + chunkSize
+        delta = chunkMean - mean
+        newMean = mean + delta * chunkSize / newCount
+        newM2 = m2 + chunkM2 + delta * delta * count * chunkSize / newCount
+
+        if count > 0: #True if past the first sample
+            oldVar = m2 / count
+            newVar = newM2 / newCount
+            meanWinTol = abs(newMean-mean) < tolerance*abs(mean)
             varWinTol = abs(oldVar-newVar) < tolerance*abs(oldVar)
             if meanWinTol and varWinTol:
                 repeat = False
-        else:
-            varList = varList+newVars
+
+        count, mean, m2 = newCount, newMean, newM2
 
         curTime = dt.datetime.now()
         if (curTime-startTime).seconds > maxTime:
             repeat = False
 
-    return varList
+    return varList[:count]
+
+
+def ratios_hash(ratios):
+    """returns a hash over the names and values of a ratios matrix"""
+    digest = hashlib.sha1()
+    digest.update('\t'.join(ratios.row_names).encode('utf-8'))
+    digest.update('\t'.join(ratios.column_names).encode('utf-8'))
+    digest.update(np.ascontiguousarray(ratios.values, dtype='float64').tobytes())
+    return digest.hexdigest()
+
+
+class BackgroundStore:
+    """On-disk store for the sampled background distributions of a ratios
+    matrix. Sampling a background is expensive, but it only depends on the
+    ratios matrix, the column, the sample size and the tolerance, so it can
+    be shared between runs on the same data set.
+
+    The backgrounds are stored in a subdirectory that is named after the
+    hash of the ratios matrix, one .npy file per (column, n, tolerance).
+    Sampled variances are stored as float32 and loaded memory-mapped,
+    fitted chi2 distributions are stored as their parameters.
+    """
+    def __init__(self, dirpath, ratios):
+        self.dirpath = os.path.join(dirpath, ratios_hash(ratios))
+        self.column_indexes = {name: index for index, name in enumerate(ratios.column_names)}
+
+    def path_for(self, column, n, tolerance, useChi2):
+        return os.path.join(self.dirpath, 'c%05d-n%d-t%r%s.npy' % (self.column_indexes[column], n,
+                                                                   tolerance,
+                                                                   '-chi2' if useChi2 else ''))
+
+    def get(self, column, n, tolerance, useChi2):
+        """returns the stored background or None if it was not computed yet"""
+        path = self.path_for(column, n, tolerance, useChi2)
+        if not os.path.exists(path):
+            return None
+        if useChi2:
+            return tuple(np.load(path).tolist())
+        return np.load(path, mmap_mode='r')
+
+    def put(self, column, n, tolerance, useChi2, background):
+        """stores a background, the file is renamed into place after it was
+        written, so concurrent runs never see a partial file"""
+        if not os.path.exists(self.dirpath):
+            try:
+                os.makedirs(self.dirpath)
+            except OSError:
+                # another run created it in the meantime
+                pass
+        path = self.path_for(column, n, tolerance, useChi2)
+        tmp_path = '%s.%d.tmp' % (path, os.getpid())
+        with open(tmp_path, 'wb') as outfile:
+            np.save(outfile, np.asarray(background, dtype='float64' if useChi2 else 'float32'))
+        os.rename(tmp_path, path)
 
 
 class BSCM:
@@ -96,7 +184,8 @@ class BSCM:
     completed, it can be queried to return a p-Value for a specific set of genes
     Right now it copies ratios, which will waste some memory
     """
-    def __init__(self, ratios, tolerance = 0.001, maxTime=600, chunkSize=200, verbose=False, useChi2=False):
+    def __init__(self, ratios, tolerance = 0.001, maxTime=600, chunkSize=200, verbose=False, useChi2=False,
+                 store=None):
         """Given a ratios matrix and a number of genes, figure out the expected distribution of variances
            Will sample background until the mean and sd converge or the operation times out
 
@@ -107,6 +196,7 @@ class BSCM:
          chunkSize      -- The number of samples to add between test (DEFAULT: 200)
          verbose        -- Set to false to suppress output (DEFAULT: False)
          useChi2        -- Set to True to fit a chi2 instead of storing all values (DEFAULT: False)
+         store          -- A BackgroundStore to load and save backgrounds (DEFAULT: None)
         """
         self.allVars = {} #Store all of the variances here.  Structure: allVars[expName][numExp]
         self.ratios = ratios
@@ -115,30 +205,67 @@ class BSCM:
         self.chunkSize = chunkSize
         self.verbose = verbose
         self.useChi2 = useChi2
+        self.store = store
+        self.__pool = None
+        self.__poolSize = None
+
+    def getPool(self, num_cores):
+        """returns the worker pool, it is kept for the lifetime of this object,
+        so we don't have to start new processes for every cluster"""
+        if self.__pool is not None and self.__poolSize != num_cores:
+            self.close()
+        if self.__pool is None:
+            self.__pool = mp.Pool(num_cores)
+            self.__poolSize = num_cores
+        return self.__pool
+
+    def close(self):
+        """shut down the worker pool"""
+        if self.__pool is not None:
+            self.__pool.close()
+            self.__pool.join()
+            self.__pool = None
+            self.__poolSize = None
+
+    def setBackground(self, cn, n, background):
+        """store a background in memory. Sampled backgrounds are kept sorted,
+        so the p-values can be looked up with a binary search"""
+        if not self.useChi2:
+            background = np.asarray(background)
+            if np.any(background[1:] < background[:-1]):
+                background = np.sort(background)
+        self.allVars[cn][str(n)] = background
+
+    def columnVariances(self, geneNames):
+        """returns the number of non-NaN values and the variances in each
+        column of the ratios matrix, restricted to the specified genes"""
+        rowIdx = sorted(idx for idx in self.ratios.row_indexes_for(set(geneNames)) if idx >= 0)
+        values = self.ratios.values[rowIdx]
+        valid = ~np.isnan(values)
+        counts = valid.sum(axis=0)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            means = np.where(valid, values, 0.0).sum(axis=0) / counts
+            variances = np.square(np.where(valid, values - means, 0.0)).sum(axis=0) / counts
+        return counts, variances
 
     def getPvals(self, geneNames, num_cores=1):
         """Get p-Values for the the list of genes, one for each column in the ratios matrix
 
          Keyword arguments:
          geneNames  -- A list of genes in the cluster
-         singleCore -- Set to True to use a single core.  False may not work.
+         num_cores  -- The number of worker processes to sample missing backgrounds
         """
-        pVals = {}
-
-        relGenes = list(set(geneNames) & set(self.ratios.row_names))
-        curGeneMatrix = self.ratios.submatrix_by_rows(self.ratios.row_indexes_for(relGenes))
+        #  1) Compute the variances of all columns at once
+        counts, variances = self.columnVariances(geneNames)
 
         noVarNs = []  #These three matrices should have a matched order
         noVarRats = []  #It would be better to have a single list
         noVarCns = []   #With 3 named elements in each list item
 
-        for cn in self.ratios.column_names:
-            colIdx = curGeneMatrix.column_indexes_for(column_names = [cn])
-            geneVect = curGeneMatrix.column_values(column = colIdx)
-            geneVect = [x for x in geneVect if not math.isnan(x)]
-            n = len(geneVect)
+        for colIdx, cn in enumerate(self.ratios.column_names):
+            n = int(counts[colIdx])
 
-            if not self.allVars.get(cn, False):
+            if cn not in self.allVars:
                 self.allVars[cn] = {}
 
             #For loop: efficiently use multicore by precalculating additional numbers of genes
@@ -146,10 +273,14 @@ class BSCM:
             if num_cores > 1:
                 i_s = [n-3, n-2, n-1, n, n+1, n+2, n+3]
             for i in i_s:
-                if not self.allVars[cn].get(str(i), False) and i >= 0:
-                    ratioVect = self.ratios.column_values(column = self.ratios.column_indexes_for(column_names = [cn]))
+                if str(i) not in self.allVars[cn] and i >= 0:
+                    if self.store is not None:
+                        background = self.store.get(cn, i, self.tolerance, self.useChi2)
+                        if background is not None:
+                            self.setBackground(cn, i, background)
+                            continue
                     noVarNs.append(i)
-                    noVarRats.append(ratioVect.tolist())
+                    noVarRats.append(self.ratios.values[:, colIdx])
                     noVarCns.append(cn)
 
         #  2) Use a pool of workers to calculate a distribution for each of the tuples
@@ -158,50 +289,45 @@ class BSCM:
             if self.useChi2:
                 logging.info("\tFitting variance samples to Chi2 distribution")
 
+            # the seeds are drawn here, so forked workers don't share a random state
+            newargs = []
+            for i in range(0, len(noVarNs)):
+                newargs.append([noVarRats[i], noVarNs[i], self.tolerance,
+                                self.maxTime, self.chunkSize, self.verbose, noVarCns[i],
+                                random.getrandbits(64)])
             if num_cores > 1:
-                newargs = []
-                for i in range(0, len(noVarNs)):
-                    newargs.append([noVarRats[i], noVarNs[i], self.tolerance,
-                                    self.maxTime, self.chunkSize, self.verbose, noVarCns[i]])
-                pool = mp.Pool(num_cores)
-                newVars = pool.map(getVarianceMeanSDvect_mp_wrapper, newargs)
-                pool.close()
-                pool.join()
+                newVars = self.getPool(num_cores).map(getVarianceMeanSDvect_mp_wrapper, newargs)
             else:
-                tolerance = np.repeat(self.tolerance, len(noVarNs)).tolist()
-                maxTime = np.repeat(self.maxTime, len(noVarNs)).tolist()
-                chunkSize = np.repeat(self.chunkSize, len(noVarNs)).tolist()
-                verbose = np.repeat(self.verbose, len(noVarNs)).tolist()
-                newVars = list(map(getVarianceMeanSDvect, noVarRats, noVarNs, tolerance, maxTime,
-                                   chunkSize, verbose, noVarCns))
+                newVars = list(map(getVarianceMeanSDvect_mp_wrapper, newargs))
 
         #  3) Assign the new values into the empty slots
         for idx in range(0,len(noVarCns)):
             cn = noVarCns[idx]
-            curN = str(noVarNs[idx])
+            curN = noVarNs[idx]
             if self.useChi2:
-                curVars = newVars[idx]
-                self.allVars[cn][curN] = sp.stats.chi2.fit(curVars, df=int(curN))
+                self.setBackground(cn, curN, sp.stats.chi2.fit(newVars[idx], df=curN))
             else:
-                self.allVars[cn][curN] = newVars[idx]
+                self.setBackground(cn, curN, np.asarray(newVars[idx], dtype='float32'))
+            if self.store is not None:
+                self.store.put(cn, curN, self.tolerance, self.useChi2,
+                               self.allVars[cn][str(curN)])
 
         #  4) Calculate the p-Values
         pVals = {}
-        for cn in self.ratios.column_names:
-            colIdx = curGeneMatrix.column_indexes_for(column_names = [cn])
-            geneVect = curGeneMatrix.column_values(column = colIdx)
-            geneVect = [x for x in geneVect if not math.isnan(x)]
-            n = str(len(geneVect))
+        for colIdx, cn in enumerate(self.ratios.column_names):
+            n = int(counts[colIdx])
+            background = self.allVars[cn][str(n)]
 
-            if len(geneVect) <= 1 or np.any(np.isnan(self.allVars[cn][str(n)])):
+            if n <= 1 or np.isnan(background[0]):
                 pVals[cn] = 1
             else:
-                curVar = np.var(geneVect)
+                curVar = variances[colIdx]
                 if self.useChi2:
-                    [df, loc, scale] = self.allVars[cn][str(n)]
+                    [df, loc, scale] = background
                     pVals[cn] = 1-sp.stats.chi2.sf(curVar, df=df, loc=loc, scale=scale)
                 else:
-                    pVals[cn] = np.mean(self.allVars[cn][str(n)] < curVar)
+                    # fraction of the background that is smaller than curVar
+                    pVals[cn] = np.searchsorted(background, curVar, side='left') / float(len(background))
 
         return pVals
 
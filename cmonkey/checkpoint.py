@@ -0,0 +1,133 @@
+# vi: sw=4 ts=4 et:
+"""checkpoint.py - saving and restoring the state of a cMonkey run
+
+A checkpoint contains everything that is needed to continue a run after
+the iteration it was written in without recomputing anything: the
+membership matrices, the state of each scoring function (last results,
+MEME results, networks) and the states of the random number generators.
+
+File format: an 8 byte magic string, followed by the format version and
+the iteration as little-endian 32 bit integers, followed by the pickled
+state. The iteration can be read from the header without loading the state.
+
+This file is part of cMonkey Python. Please see README and LICENSE for
+more information and licensing details.
+"""
+import os
+import struct
+import random
+import logging
+import numpy as np
+
+import cmonkey.util as util
+import cmonkey.membership as memb
+
+# Python2/Python3 compatibility
+try:
+    import cPickle as pickle
+except ImportError:
+    import pickle
+
+
+MAGIC = b'CMCHKPT\n'
+FORMAT_VERSION = 1
+HEADER_FORMAT = '<ii'
+FILENAME = 'checkpoint.bin'
+
+
+def checkpoint_path(output_dir):
+    return os.path.join(output_dir, FILENAME)
+
+
+def read_header(infile):
+    magic = infile.read(len(MAGIC))
+    if magic != MAGIC:
+        raise Exception("not a cMonkey checkpoint file")
+    version, iteration = struct.unpack(HEADER_FORMAT, infile.read(struct.calcsize(HEADER_FORMAT)))
+    if version != FORMAT_VERSION:
+        raise Exception("unsupported checkpoint format version: %d (expected %d)" %
+                        (version, FORMAT_VERSION))
+    return iteration
+
+
+def write_checkpoint(path, iteration, state):
+    """writes the state dictionary. The file is written under a temporary name
+    and renamed, so a pre-empted job never leaves a truncated checkpoint"""
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as outfile:
+        outfile.write(MAGIC)
+        outfile.write(struct.pack(HEADER_FORMAT, FORMAT_VERSION, iteration))
+        pickle.dump(state, outfile, pickle.HIGHEST_PROTOCOL)
+    os.rename(tmp_path, path)
+
+
+def read_iteration(path):
+    """returns the iteration of the checkpoint at path or None if there is no
+    checkpoint"""
+    if not os.path.exists(path):
+        return None
+    with open(path, 'rb') as infile:
+        return read_header(infile)
+
+
+def read_checkpoint(path):
+    """returns the pair (iteration, state) stored in the checkpoint file"""
+    with open(path, 'rb') as infile:
+        iteration = read_header(infile)
+        return iteration, pickle.load(infile)
+
+
+def random_state():
+    """the states of the Python, numpy and R random number generators"""
+    try:
+        r_state = util.r_random_state()
+    except Exception:
+        logging.warn("could not retrieve R's random state, it will not be restored")
+        r_state = None
+    return {'python': random.getstate(), 'numpy': np.random.get_state(), 'r': r_state}
+
+
+def set_random_state(state):
+    random.setstate(state['python'])
+    np.random.set_state(state['numpy'])
+    if state['r'] is not None:
+        util.r_set_random_state(state['r'])
+
+
+def make_state(membership, row_scoring, column_scoring):
+    """collects the state of a run at the end of an iteration"""
+    return {'row_names': list(membership.row_names),
+            'col_names': list(membership.col_names),
+            'row_membs': np.copy(membership.row_membs),
+            'col_membs': np.copy(membership.col_membs),
+            'row_scoring': row_scoring.checkpoint_state(),
+            'column_scoring': column_scoring.checkpoint_state(),
+            'random': random_state()}
+
+
+def make_membership(state, matrix, config_params):
+    """creates the membership that was saved in the checkpoint. The checkpoint
+    has to be for the same input matrix and membership configuration"""
+    if (state['row_names'] != list(matrix.row_names) or
+        state['col_names'] != list(matrix.column_names)):
+        raise Exception("checkpoint does not match the input matrix")
+    membership = memb.OrigMembership(matrix.row_names, matrix.column_names, {}, {},
+                                     config_params, matrix.row_indexes,
+                                     matrix.column_indexes)
+    if (state['row_membs'].shape != membership.row_membs.shape or
+        state['col_membs'].shape != membership.col_membs.shape):
+        raise Exception("checkpoint does not match the membership configuration")
+    membership.row_membs = state['row_membs'].astype('int32')
+    membership.col_membs = state['col_membs'].astype('int32')
+    return membership
+
+
+def restore_state(state, row_scoring, column_scoring):
+    """restores the state of the scoring functions and random number generators"""
+    row_scoring.restore_checkpoint_state(state['row_scoring'])
+    column_scoring.restore_checkpoint_state(state['column_scoring'])
+    set_random_state(state['random'])
+
+
+__all__ = ['write_checkpoint', 'read_checkpoint', 'read_iteration', 'checkpoint_path',
+           'make_state', 'make_membership', 'restore_state']
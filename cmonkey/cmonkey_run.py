@@ -9,12 +9,12 @@ import re
 import logging
 import gzip
 from decimal import Decimal
-import bz2
 from pkg_resources import Requirement, resource_filename, DistributionNotFound
 from sqlalchemy import and_
 
 import cmonkey.config as config
 import cmonkey.microarray as microarray
+import cmonkey.datamatrix as dm
 import cmonkey.membership as memb
 import cmonkey.meme as meme
 import cmonkey.motif as motif
@@ -25,11 +25,14 @@ import cmonkey.organism as org
 import cmonkey.scoring as scoring
 import cmonkey.network as nw
 import cmonkey.stringdb as stringdb
-import cmonkey.debug as debug
-import cmonkey.sizes as sizes
 import cmonkey.thesaurus as thesaurus
 import cmonkey.BSCM as BSCM
 import cmonkey.database as cm2db
+import cmonkey.persistence as persistence
+import cmonkey.membership_store as mstore
+import cmonkey.checkpoint as checkpoint
+import cmonkey.organism_bundle as organism_bundle
+import cmonkey.instrumentation as instrumentation
 
 # Python2/Python3 compatibility
 try:
@@ -67,13 +70,37 @@ class CMonkeyRun:
         self.__membership = None
         self.__organism = None
         self.__session = None
+        self.__writer = None
+        self.__metrics_log = None
+        self.__checkpoint = None
+        self.__checkpoint_iteration = None
+        self.row_scoring = None
+        self.column_scoring = None
         self.config_params = args_in
         self.ratios = ratios
-        if args_in['resume']:
-            self.row_seeder = memb.make_db_row_seeder(self.__dbsession())
+        if args_in['resume'] and not args_in['new_data_file']:
+            self.__checkpoint = self.read_checkpoint()
+
+        if self.__checkpoint is not None:
+            # memberships are restored from the checkpoint, no seeding needed
+            self.row_seeder = None
+            self.column_seeder = None
+        elif args_in['resume']:
+            # prefer the membership snapshot of the last complete iteration
+            # over reassembling the memberships from the database
+            store = mstore.MembershipStore(args_in['output_dir'])
+            last_iteration = self.get_last_iteration()
+            use_snapshot = store.has_iteration(last_iteration)
+            if use_snapshot:
+                logging.info("resuming from membership snapshot of iteration %d", last_iteration)
+                self.row_seeder = memb.make_snapshot_row_seeder(store, last_iteration)
+            else:
+                self.row_seeder = memb.make_db_row_seeder(self.__dbsession())
 
             if args_in['new_data_file']:  # data file has changed
                 self.column_seeder = microarray.seed_column_members
+            elif use_snapshot:
+                self.column_seeder = memb.make_snapshot_column_seeder(store, last_iteration)
             else:
                 self.column_seeder = memb.make_db_column_seeder(self.__dbsession())
         else:
@@ -95,6 +122,10 @@ class CMonkeyRun:
 
     def cleanup(self):
         """cleanup this run object"""
+        self.close_result_writer()
+        for scoring_function in [self.row_scoring, self.column_scoring]:
+            if scoring_function is not None:
+                scoring_function.cleanup()
         if self.__session is not None:
             self.__session.close()
             self.__session = None
@@ -104,8 +135,48 @@ class CMonkeyRun:
             self.__session = cm2db.make_session_from_config(self.config_params)
         return self.__session
 
+    def result_writer(self):
+        """returns the writer for iteration results. Unless disabled or in
+        interactive mode, results are written by a background thread"""
+        if self.__writer is None:
+            threaded = (self.config_params['async_writes'] and
+                        not self.config_params['interactive'])
+            # make sure the writer thread sees everything we wrote so far
+            self.__dbsession().commit()
+            self.__writer = persistence.ResultWriter(self.config_params, self.ratios,
+                                                     self.gene_indexes,
+                                                     session=self.__dbsession(),
+                                                     threaded=threaded,
+                                                     queue_size=self.config_params['write_queue_size'])
+        return self.__writer
+
+    def close_result_writer(self):
+        """wait until all pending results are written and stop the writer"""
+        if self.__writer is not None:
+            writer = self.__writer
+            self.__writer = None
+            writer.close()
+
+    def write_metrics(self, iteration):
+        """append the spans that were recorded since the last call to the
+        run's metrics table"""
+        if self.__metrics_log is None:
+            self.__metrics_log = persistence.AppendLog(
+                os.path.join(self.config_params['output_dir'], instrumentation.METRICS_FILE),
+                instrumentation.METRICS_HEADER)
+        for row in instrumentation.metric_rows(iteration, instrumentation.SPANS.take(),
+                                               instrumentation.SPANS.take_gauges()):
+            self.__metrics_log.write_row(row)
+        self.__metrics_log.flush()
+
+    def close_metrics(self):
+        if self.__metrics_log is not None:
+            self.__metrics_log.close()
+            self.__metrics_log = None
+
     def __create_output_database(self):
         session = self.__dbsession()
+        cm2db.upgrade_database(session.get_bind())
         row_names = [cm2db.RowName(order_num=index, name=self.ratios.row_names[index])
                      for index in xrange(len(self.ratios.row_names))]
         session.add_all(row_names)
@@ -125,6 +196,10 @@ class CMonkeyRun:
 
     def __make_membership(self):
         """returns the seeded membership on demand"""
+        if self.__checkpoint is not None:
+            _, state = self.__checkpoint
+            return checkpoint.make_membership(state, self.ratios, self.config_params)
+
         if 'random_seed' in self.config_params['debug']:
             util.r_set_seed(10)
 
@@ -139,13 +214,13 @@ class CMonkeyRun:
             self.__membership = self.__make_membership()
 
             # debug: write seed into an analytical file for iteration 0
-            if 'random_seed' in self.config_params['debug']:
+            if 'random_seed' in self.config_params['debug'] and self.__checkpoint is None:
                 self.write_memberships(0)
                 # write complete result into a cmresults.tsv
                 path =  os.path.join(self.config_params['output_dir'], 'cmresults-0000.tsv.bz2')
-                with bz2.BZ2File(path, 'w') as outfile:
-                    debug.write_iteration(self.__dbsession, outfile, 0,
-                                          self.config_params['num_clusters'], self.config_params['output_dir'])
+                persistence.dump_iteration(self.__dbsession(), path, 0,
+                                           self.config_params['num_clusters'],
+                                           self.config_params['output_dir'])
 
         return self.__membership
 
@@ -155,35 +230,133 @@ class CMonkeyRun:
             self.__organism = org.DummyOrganism()
         elif self.__organism is None:
             self.__organism = self.make_organism()
+            # registered here, so subclasses overriding make_organism() can write statistics
+            self.__add_stats_types('network',
+                                   [network.name for network in self.__organism.networks()])
+            self.__add_stats_types('seqtype', self.config_params['sequence_types'])
         return self.__organism
 
-    def __get_kegg_data(self):
-        # determine the NCBI code
-        organism_code = self.config_params['organism_code']
+    def __kegg_file_path(self):
+        try:
+            return resource_filename(Requirement.parse("cmonkey2"), USER_KEGG_FILE_PATH)
+        except DistributionNotFound:
+            return USER_KEGG_FILE_PATH
 
+    def __go_file_path(self):
         try:
-            kegg_path = resource_filename(Requirement.parse("cmonkey2"), USER_KEGG_FILE_PATH)
+            return resource_filename(Requirement.parse("cmonkey2"), USER_GO_FILE_PATH)
         except DistributionNotFound:
-            kegg_path = USER_KEGG_FILE_PATH
+            return USER_GO_FILE_PATH
+
+    def __get_kegg_data(self):
+        # determine the NCBI code
+        organism_code = self.config_params['organism_code']
+        kegg_path = self.__kegg_file_path()
 
-        keggfile = util.read_dfile(kegg_path, comment='#')
-        kegg_map = util.make_dfile_map(keggfile, 1, 3)
-        kegg2ncbi = util.make_dfile_map(keggfile, 1, 2)
+        kegg_map = {}
+        kegg2ncbi = {}
+        for code, ncbi, species in util.iter_dfile(kegg_path, comment='#', columns=[1, 2, 3]):
+            kegg_map[code] = species
+            kegg2ncbi[code] = ncbi
         if self.config_params['ncbi_code'] is None and organism_code in kegg2ncbi:
             self.config_params['ncbi_code'] = kegg2ncbi[organism_code]
         return self.config_params['ncbi_code'], kegg_map[organism_code]
 
+    def __organism_bundle_path(self):
+        return organism_bundle.bundle_path(self.config_params['cache_dir'],
+                                           self.config_params['organism_code'])
+
+    def __organism_signature(self):
+        """describes the sources the organism is built from, this needs to be
+        determined before make_organism() fills in ncbi_code and string_file"""
+        return organism_bundle.source_signature(
+            self.config_params,
+            [self.__kegg_file_path(), self.__go_file_path(),
+             self.config_params['synonym_file'], self.config_params['operon_file'],
+             self.config_params['string_file'], self.config_params['rsat_dir']])
+
+    def __network_settings(self):
+        """returns the triple (use_string, use_operons, network_weight)"""
+        is_microbe = self.config_params['organism_code'] not in VERTEBRATES
+        use_string = not self.config_params['nonetworks'] and self.config_params['use_string']
+        use_operons = (is_microbe and not self.config_params['nonetworks'] and
+                       self.config_params['use_operons'])
+
+        # determine the final weights. note: for now, we will just check whether
+        # we have 1 or 2 networks
+        num_networks = len([used for used in [use_string, use_operons] if used])
+        network_weight = 0.0
+        if num_networks > 0:
+            network_weight = 1.0 / num_networks
+        return use_string, use_operons, network_weight
+
     def make_organism(self):
-        """returns the organism object to work on"""
+        """returns the organism object to work on. If there is an up-to-date
+        organism bundle, the organism is created from the bundle"""
         self.__make_dirs_if_needed()
-        ncbi_code, kegg_species = self.__get_kegg_data()
+        organism = None
+        if self.config_params['organism_bundle']:
+            bundle = organism_bundle.load_bundle(self.__organism_bundle_path(),
+                                                 self.__organism_signature())
+            if bundle is not None:
+                organism = self.__make_organism_from_bundle(bundle)
+        if organism is None:
+            organism = self.__make_organism_from_sources()
+        return organism
 
-        try:
-            go_file_path = resource_filename(Requirement.parse("cmonkey2"), USER_GO_FILE_PATH)
-        except DistributionNotFound:
-            go_file_path = USER_GO_FILE_PATH
+    def __add_stats_types(self, category, names):
+        """adds the statistics types of a category that are not in the database
+        yet, a resumed run sets up the same organism and scoring functions again"""
+        session = self.__dbsession()
+        existing = {stats_type.name for stats_type in
+                    session.query(cm2db.StatsType).filter(cm2db.StatsType.category == category)}
+        session.add_all([cm2db.StatsType(category=category, name=name)
+                         for name in names if name not in existing])
+        session.commit()
+
+    def __make_organism_from_bundle(self, bundle):
+        """creates the organism from the data in an organism bundle"""
+        logging.info("using organism bundle at '%s'", bundle.path)
+        info = bundle.info
+        if self.config_params['ncbi_code'] is None:
+            self.config_params['ncbi_code'] = info['ncbi_code']
+
+        mo_db = self.__make_microbes_online()
+        use_string, use_operons, network_weight = self.__network_settings()
+        nw_factories = []
+        if use_string:
+            self.config_params['string_file'] = info['string_file']
+            nw_factories.append(stringdb.get_network_factory(
+                self.config_params['organism_code'], info['string_file'], network_weight,
+                links=info['string_links']))
+        if use_operons:
+            nw_factories.append(microbes_online.get_network_factory(
+                mo_db, max_operon_size=self.ratios.num_rows / 20,
+                weight=network_weight, operons=info['operons']))
+
+        rsat_info = org.RsatSpeciesInfo(bundle, info['kegg_species'], info['rsat_species'],
+                                        info['taxonomy_id'])
+        return org.Microbe(self.config_params['organism_code'], info['kegg_species'],
+                           rsat_info, info['go_taxonomy_id'], mo_db, nw_factories,
+                           self.config_params['search_distances'],
+                           self.config_params['scan_distances'],
+                           self.config_params['use_operons'], self.ratios, info['thesaurus'],
+                           self.config_params['fasta_file'], info['features'],
+                           info['operon_mappings'])
+
+    def __make_microbes_online(self):
+        if self.config_params['operon_file']:
+            logging.info("using operon file at '%s'", self.config_params['operon_file'])
+            return microbes_online.MicrobesOnlineOperonFile(self.config_params['operon_file'])
+        else:
+            logging.info("attempting automatic download of operons from Microbes Online")
+            return microbes_online.MicrobesOnline(self.config_params['cache_dir'])
+
+    def __make_organism_from_sources(self):
+        """creates the organism by reading and parsing the organism data files"""
+        ncbi_code, kegg_species = self.__get_kegg_data()
+        go_file_path = self.__go_file_path()
 
-        gofile = util.read_dfile(go_file_path)
 
         if self.config_params['rsat_dir']:
             if not self.config_params['rsat_organism']:
@@ -198,30 +371,14 @@ class CMonkeyRun:
                                        self.config_params['cache_dir'], kegg_species, ncbi_code,
                                        self.config_params['rsat_features'])
 
-        if self.config_params['operon_file']:
-            logging.info("using operon file at '%s'", self.config_params['operon_file'])
-            mo_db = microbes_online.MicrobesOnlineOperonFile(self.config_params['operon_file'])
-        else:
-            logging.info("attempting automatic download of operons from Microbes Online")
-            mo_db = microbes_online.MicrobesOnline(self.config_params['cache_dir'])
+        mo_db = self.__make_microbes_online()
 
         stringfile = self.config_params['string_file']
         nw_factories = []
-        is_microbe = self.config_params['organism_code'] not in VERTEBRATES
-
-        # determine the final weights. note: for now, we will just check whether
-        # we have 1 or 2 networks
-        num_networks = 0
-        if not self.config_params['nonetworks'] and self.config_params['use_string']:
-            num_networks += 1
-        if is_microbe and not self.config_params['nonetworks'] and self.config_params['use_operons']:
-            num_networks += 1
-        network_weight = 0.0
-        if num_networks > 0:
-            network_weight = 1.0 / num_networks
+        use_string, use_operons, network_weight = self.__network_settings()
 
         # do we use STRING ?
-        if not self.config_params['nonetworks'] and self.config_params['use_string']:
+        if use_string:
             # download if not provided
             if stringfile is None:
                 if ncbi_code is None:
@@ -244,7 +401,7 @@ class CMonkeyRun:
                 self.config_params['organism_code'], stringfile, network_weight))
 
         # do we use operons ?
-        if is_microbe and not self.config_params['nonetworks'] and self.config_params['use_operons']:
+        if use_operons:
             logging.debug('adding operon network factory')
             nw_factories.append(microbes_online.get_network_factory(
                 mo_db, max_operon_size=self.ratios.num_rows / 20,
@@ -254,7 +411,7 @@ class CMonkeyRun:
         logging.debug("Creating Microbe object for '%s'", orgcode)
         rsat_info = org.RsatSpeciesInfo(rsatdb, kegg_species, self.config_params['rsat_organism'],
                                         ncbi_code)
-        gotax = util.make_dfile_map(gofile, 0, 1)[rsat_info.go_species()]
+        gotax = util.read_dfile_map(go_file_path, 0, 1)[rsat_info.go_species()]
         synonyms = None
         if self.config_params['synonym_file'] is not None:
             synonyms = thesaurus.create_from_delimited_file2(self.config_params['synonym_file'],
@@ -278,18 +435,53 @@ class CMonkeyRun:
                                         self.config_params['scan_distances'],
                                         self.ratios, synonyms,
                                         self.config_params['fasta_file'])
-
-        session = self.__dbsession()
-        network_stats_types = [cm2db.StatsType(category='network', name=network.name)
-                               for network in organism.networks()]
-        sequence_stats_types = [cm2db.StatsType(category='seqtype', name=sequence_type)
-                                for sequence_type in self.config_params['sequence_types']]
-        session.add_all(network_stats_types)
-        session.add_all(sequence_stats_types)
-        session.commit()
-
         return organism
 
+    def build_organism_bundle(self):
+        """sets up the organism from its sources and writes everything that
+        was read into the organism bundle, so subsequent runs can use it"""
+        self.__make_dirs_if_needed()
+        start_time = util.current_millis()
+        signature = self.__organism_signature()
+        organism = self.__make_organism_from_sources()
+        use_string, use_operons, _ = self.__network_settings()
+
+        string_links = None
+        if use_string:
+            string_links = stringdb.read_links(self.config_params['organism_code'],
+                                               self.config_params['string_file'])
+        operons = None
+        if use_operons:
+            operons = microbes_online.get_operons(self.__make_microbes_online(), organism)
+        operon_mappings = None
+        if self.config_params['use_operons']:
+            operon_mappings = organism.operon_map()
+
+        features = organism.feature_table()
+        contig_sequences = {}
+        if self.config_params['fasta_file'] is None:
+            for contig in {feature.location.contig for feature in features.values()}:
+                contig_sequences[contig] = organism.contig_sequence(contig)
+
+        info = {'signature': signature,
+                'organism_code': self.config_params['organism_code'],
+                'kegg_species': organism.kegg_organism,
+                'ncbi_code': self.config_params['ncbi_code'],
+                'go_taxonomy_id': organism.go_taxonomy_id,
+                'rsat_species': organism.species(),
+                'taxonomy_id': organism.taxonomy_id(),
+                'string_file': self.config_params['string_file'] if use_string else None,
+                'thesaurus': organism.thesaurus(),
+                'features': features,
+                'operon_mappings': operon_mappings,
+                'operons': operons,
+                'string_links': string_links}
+        path = self.__organism_bundle_path()
+        organism_bundle.write_bundle(path, info, contig_sequences)
+        elapsed = util.current_millis() - start_time
+        logging.info("wrote organism bundle '%s' in %f s.", path, elapsed / 1000.0)
+        return path
+
 
     def __make_dirs_if_needed(self):
         logging.debug('creating aux directories')
@@ -395,6 +587,8 @@ class CMonkeyRun:
             output_dir = self.config_params['output_dir']
             if not os.path.exists(os.path.join(output_dir, '/ratios.tsv')):
                 self.ratios.write_tsv_file(output_dir + '/ratios.tsv')
+            # the binary version can be memory-mapped by tools reading the results
+            dm.write_binary_file(self.ratios, os.path.join(output_dir, 'ratios.npy'))
             # also copy the input matrix to the output
             if (os.path.exists(self.config_params['ratios_file'])):
                 if self.config_params['ratios_file'].endswith('.gz'):
@@ -406,9 +600,8 @@ class CMonkeyRun:
                                 os.path.join(output_dir, 'ratios.original.tsv'))
 
         # gene index map is used for writing statistics
-        thesaurus = self.organism().thesaurus()
-        genes = [thesaurus[row_name] if row_name in thesaurus else row_name
-                 for row_name in self.ratios.row_names]
+        synonyms = thesaurus.as_thesaurus(self.organism().thesaurus())
+        genes = synonyms.canonical_names(self.ratios.row_names)
         self.gene_indexes = {genes[index]: index
                              for index in xrange(len(genes))}
         row_scoring, col_scoring = self.__setup_pipeline()
@@ -422,18 +615,14 @@ class CMonkeyRun:
         self.report_params()
         self.write_start_info()
 
-        session = self.__dbsession()
-        row_scoring_stats_types = [cm2db.StatsType(category='scoring', name=scoring_function.id)
-                                   for scoring_function in self.row_scoring.scoring_functions]
-        session.add_all(row_scoring_stats_types)
-        session.add(cm2db.StatsType(category='scoring', name=self.column_scoring.id))
-        session.commit()
-
-        if 'profile_mem' in self.config_params['debug']:
-            with open(os.path.join(self.config_params['output_dir'], 'memprofile.tsv'), 'w') as outfile:
-                outfile.write('Iteration\tMembership\tOrganism\tCol\tRow\tNetwork\tMotif\n')
+        self.__add_stats_types('scoring',
+                               [scoring_function.id
+                                for scoring_function in self.row_scoring.scoring_functions] +
+                               [self.column_scoring.id])
 
-        if self.config_params['resume']:
+        if self.__checkpoint is not None:
+            self.config_params['start_iteration'] = self.restore_checkpoint() + 1
+        elif self.config_params['resume']:
             self.config_params['start_iteration'] = self.get_last_iteration()
 
     def run(self):
@@ -441,114 +630,26 @@ class CMonkeyRun:
         self.run_iterations()
 
     def residual_for(self, row_names, column_names):
-        if len(column_names) <= 1 or len(row_names) <= 1:
-            return 1.0
-        else:
-            matrix = self.ratios.submatrix_by_name(row_names, column_names)
-            return matrix.residual()
+        return persistence.residual_for(self.ratios, row_names, column_names)
 
     def write_memberships(self, iteration):
         session = self.__dbsession()
-        for cluster in range(1, self.config_params['num_clusters'] + 1):
-            column_names = self.membership().columns_for_cluster(cluster)
-            column_members = [cm2db.ColumnMember(iteration=iteration, cluster=cluster, order_num=order_num)
-                                  for order_num in self.ratios.column_indexes_for(column_names)]
-            session.add_all(column_members)
-
-            row_names = self.membership().rows_for_cluster(cluster)
-            row_members = [cm2db.RowMember(iteration=iteration, cluster=cluster, order_num=order_num)
-                               for order_num in self.ratios.row_indexes_for(row_names)]
-            session.add_all(row_members)
+        persistence.write_memberships(session, self.ratios, self.membership(), iteration,
+                                      self.config_params['num_clusters'])
         session.commit()
 
     def write_results(self, iteration_result):
         """write iteration results to database"""
-        iteration = iteration_result['iteration']
-        self.write_memberships(iteration)
-
-        if 'motifs' in iteration_result:
-            motifs = iteration_result['motifs']
-            session = self.__dbsession()
-
-            for seqtype in motifs:
-                for cluster in motifs[seqtype]:
-                    motif_infos = motifs[seqtype][cluster]['motif-info']
-                    for motif_info in motif_infos:
-                        db_motif_info = cm2db.MotifInfo(iteration=iteration, cluster=cluster, seqtype=seqtype,
-                                                        motif_num=motif_info['motif_num'], evalue=motif_info['evalue'])
-                        session.add(db_motif_info)
-                        session.flush()
-
-                        pssm_rows = motif_info['pssm']
-                        db_pssm_rows = [cm2db.MotifPSSMRow(motif_info_id=db_motif_info.rowid, iteration=iteration, row=row,
-                                                            a=pssm_rows[row][0], c=pssm_rows[row][1],
-                                                            g=pssm_rows[row][2], t=pssm_rows[row][3])
-                                        for row in xrange(len(pssm_rows))]
-                        session.add_all(db_pssm_rows)
-
-                        annotations = motif_info['annotations']
-                        db_annotations = [cm2db.MotifAnnotation(motif_info_id=db_motif_info.rowid, iteration=iteration,
-                                                                gene_num=self.gene_indexes[annotation['gene']],
-                                                                position=annotation['position'],
-                                                                reverse=annotation['reverse'],
-                                                                pvalue=annotation['pvalue'])
-                                            for annotation in annotations]
-                        session.add_all(db_annotations)
-
-                        sites = motif_info['sites']
-                        if len(sites) > 0 and isinstance(sites[0], tuple):
-                            db_sites = [cm2db.MemeMotifSite(motif_info_id=db_motif_info.rowid,
-                                                            seq_name=seqname, reverse=(strand == '-'),
-                                                            start=start, pvalue=pval,
-                                                            flank_left=flank_left, seq=seq, flank_right=flank_right)
-                                for seqname, strand, start, pval, flank_left, seq, flank_right in sites]
-                            session.add_all(db_sites)
-
-            session.commit()
+        session = self.__dbsession()
+        persistence.write_results(session, self.ratios, self.membership(), iteration_result,
+                                  self.config_params['num_clusters'], self.gene_indexes)
+        session.commit()
 
     def write_stats(self, iteration_result):
-        # write stats for this iteration
-        iteration = iteration_result['iteration']
-
-        network_scores = iteration_result['networks'] if 'networks' in iteration_result else {}
-        motif_pvalues = iteration_result['motif-pvalue'] if 'motif-pvalue' in iteration_result else {}
-        fuzzy_coeff = iteration_result['fuzzy-coeff'] if 'fuzzy-coeff' in iteration_result else 0.0
-
-        residuals = []
+        """write stats for this iteration"""
         session = self.__dbsession()
-        for cluster in range(1, self.config_params['num_clusters'] + 1):
-            row_names = self.membership().rows_for_cluster(cluster)
-            column_names = self.membership().columns_for_cluster(cluster)
-            residual = self.residual_for(row_names, column_names)
-            residuals.append(residual)
-            if np.isnan(residual) or np.isinf(residual):
-                residual = 1.0
-            session.add(cm2db.ClusterStat(iteration=iteration, cluster=cluster, num_rows=len(row_names),
-                                          num_cols=len(column_names), residual=residual))
-
-        session.add(cm2db.IterationStat(statstype=1, iteration=iteration, score=fuzzy_coeff))
-
-        median_residual = np.median(residuals)
-        if np.isnan(residual) or np.isinf(residual):
-            medial_residual = 1.0
-        session.add(cm2db.IterationStat(statstype=2, iteration=iteration, score=median_residual))
-
-        # insert the score means
-        for fun_id in iteration_result['score_means']:
-            statstype = session.query(cm2db.StatsType).filter(and_(cm2db.StatsType.category == 'scoring',
-                                                                   cm2db.StatsType.name == fun_id)).one()
-            session.add(cm2db.IterationStat(statstype=statstype.rowid, iteration=iteration,
-                                            score=iteration_result['score_means'][fun_id]))
-
-        for network, score in network_scores.items():
-            statstype = session.query(cm2db.StatsType).filter(and_(cm2db.StatsType.category == 'network',
-                                                                   cm2db.StatsType.name == network)).one()
-            session.add(cm2db.IterationStat(statstype=statstype.rowid, iteration=iteration, score=score))
-
-        for seqtype, pval in motif_pvalues.items():
-            statstype = session.query(cm2db.StatsType).filter(and_(cm2db.StatsType.category == 'seqtype',
-                                                                   cm2db.StatsType.name == seqtype)).one()
-            session.add(cm2db.IterationStat(statstype=statstype.rowid, iteration=iteration, score=pval))
+        persistence.write_stats(session, self.ratios, self.membership(), iteration_result,
+                                self.config_params['num_clusters'])
         session.commit()
 
     def write_start_info(self):
@@ -572,7 +673,7 @@ class CMonkeyRun:
 
     def update_iteration(self, iteration):
         session = self.__dbsession()
-        session.query(cm2db.RunInfo).first().last_iteration = iteration
+        persistence.update_iteration(session, iteration)
         session.commit()
 
     def get_last_iteration(self):
@@ -589,6 +690,66 @@ class CMonkeyRun:
         session.query(cm2db.RunInfo).first().finish_time = datetime.now()
         session.commit()
 
+    def optimize_database(self):
+        """post-run ANALYZE/VACUUM of the result database, speeds up the viewer
+        and tools on long runs"""
+        postproc = self.config_params['Postprocessing']
+        if postproc.get('analyze_database', 'True') == 'True':
+            start_time = util.current_millis()
+            session = self.__dbsession()
+            session.commit()
+            cm2db.optimize_database(session.get_bind(),
+                                    vacuum=(postproc.get('vacuum_database', 'False') == 'True'))
+            elapsed = util.current_millis() - start_time
+            logging.debug("optimized result database in %f s.", elapsed / 1000.0)
+
+    def read_checkpoint(self):
+        """returns the pair (iteration, state) of the run's checkpoint or None
+        if there is no usable checkpoint"""
+        path = checkpoint.checkpoint_path(self.config_params['output_dir'])
+        if not os.path.exists(path):
+            return None
+        try:
+            start_time = util.current_millis()
+            result = checkpoint.read_checkpoint(path)
+            elapsed = util.current_millis() - start_time
+            logging.debug("read checkpoint of iteration %d in %f s.", result[0], elapsed / 1000.0)
+            return result
+        except:
+            logging.exception("could not read checkpoint '%s', resuming from the database", path)
+            return None
+
+    def write_checkpoint(self, iteration):
+        """save the state of the run after the iteration. Pending results are
+        written first, so the database never lags behind the checkpoint"""
+        start_time = util.current_millis()
+        if self.__writer is not None:
+            self.__writer.flush()
+        state = checkpoint.make_state(self.membership(), self.row_scoring,
+                                      self.column_scoring)
+        checkpoint.write_checkpoint(checkpoint.checkpoint_path(self.config_params['output_dir']),
+                                    iteration, state)
+        elapsed = util.current_millis() - start_time
+        logging.debug("wrote checkpoint of iteration %d in %f s.", iteration, elapsed / 1000.0)
+
+    def restore_checkpoint(self):
+        """restore the scoring function states from the checkpoint and remove
+        the results that were written after it. Returns the checkpoint's iteration"""
+        iteration, state = self.__checkpoint
+        logging.info("resuming from checkpoint of iteration %d", iteration)
+        checkpoint.restore_state(state, self.row_scoring, self.column_scoring)
+        self.__checkpoint = None
+        self.__checkpoint_iteration = iteration
+
+        session = self.__dbsession()
+        persistence.delete_iterations_after(session, iteration)
+        session.commit()
+        mstore.MembershipStore(self.config_params['output_dir']).remove_after(iteration)
+        persistence.AppendLog(os.path.join(self.config_params['output_dir'],
+                                           instrumentation.METRICS_FILE),
+                              instrumentation.METRICS_HEADER).remove_after(iteration)
+        return iteration
+
     def combined_rscores_pickle_path(self):
         return "%s/combined_rscores_last.pkl" % self.config_params['output_dir']
 
@@ -607,10 +768,12 @@ class CMonkeyRun:
             rscores = self.row_scoring.compute(iteration_result)
         start_time = util.current_millis()
 
-        if force:
-            cscores = self.column_scoring.compute_force(iteration_result)
-        else:
-            cscores = self.column_scoring.compute(iteration_result)
+        with instrumentation.span('score:%s' % self.column_scoring.id):
+            if force:
+                cscores = self.column_scoring.compute_force(iteration_result)
+            else:
+                cscores = self.column_scoring.compute(iteration_result)
+        instrumentation.record_nbytes('score:%s' % self.column_scoring.id, cscores)
 
         elapsed = util.current_millis() - start_time
         if elapsed > 0.0001:
@@ -618,6 +781,7 @@ class CMonkeyRun:
 
         self.membership().update(self.ratios, rscores, cscores,
                                  self.config_params['num_iterations'], iteration_result)
+        instrumentation.record_nbytes('membership', self.membership())
 
         mean_net_score = 0.0
         mean_mot_pvalue = 0.0
@@ -634,33 +798,22 @@ class CMonkeyRun:
         logging.debug('mean net = %s | mean mot = %s', str(mean_net_score), mean_mot_pvalue)
 
         # Reduce I/O, will write the results to database only on a debug run
-        if not self.config_params['minimize_io']:
-            if iteration == 1 or (iteration % self.config_params['result_freq'] == 0):
-                self.write_results(iteration_result)
+        write_results = (not self.config_params['minimize_io'] and
+                         (iteration == 1 or (iteration % self.config_params['result_freq'] == 0)))
 
         # This should not be too much writing, so we can keep it OUT of minimize_io option...?
-        if iteration == 1 or (iteration % self.config_params['stats_freq'] == 0):
-            self.write_stats(iteration_result)
-            self.update_iteration(iteration)
+        write_stats = iteration == 1 or (iteration % self.config_params['stats_freq'] == 0)
 
+        dump_path = None
         if 'dump_results' in self.config_params['debug'] and (iteration == 1 or
                                                               (iteration % self.config_params['debug_freq'] == 0)):
             # write complete result into a cmresults.tsv
-            session = self.__dbsession()
-            path =  os.path.join(self.config_params['output_dir'], 'cmresults-%04d.tsv.bz2' % iteration)
-            with bz2.BZ2File(path, 'w') as outfile:
-                debug.write_iteration(session, outfile, iteration,
-                                      self.config_params['num_clusters'], self.config_params['output_dir'])
-
-    def write_mem_profile(self, outfile, iteration):
-        membsize = sizes.asizeof(self.membership()) / 1000000.0
-        orgsize = sizes.asizeof(self.organism()) / 1000000.0
-        colsize = sizes.asizeof(self.column_scoring) / 1000000.0
-        funs = self.row_scoring.scoring_functions
-        rowsize = sizes.asizeof(funs[0]) / 1000000.0
-        netsize = sizes.asizeof(funs[1]) / 1000000.0
-        motsize = sizes.asizeof(funs[2]) / 1000000.0
-        outfile.write('%d\t%.4f\t%.4f\t%.4f\t%.4f\t%.4f\t%.4f\n' % (iteration, membsize, orgsize, colsize, rowsize, netsize, motsize))
+            dump_path = os.path.join(self.config_params['output_dir'], 'cmresults-%04d.tsv.bz2' % iteration)
+
+        if write_results or write_stats or dump_path is not None:
+            self.result_writer().submit(persistence.IterationSnapshot(
+                iteration_result, self.membership(), write_results=write_results,
+                write_stats=write_stats, dump_path=dump_path))
 
     def run_iterations(self, start_iter=None, num_iter=None):
         if start_iter is None:
@@ -671,19 +824,46 @@ class CMonkeyRun:
         if self.config_params['interactive']:  # stop here in interactive mode
             return
 
-        for iteration in range(start_iter, num_iter):
-            start_time = util.current_millis()
-            force = self.config_params['resume'] and iteration == start_iter
-            self.run_iteration(iteration, force=force)
+        if 'start_millis' in self.config_params:
+            elapsed = util.current_millis() - self.config_params['start_millis']
+            instrumentation.SPANS.add('startup', elapsed / 1000.0)
+            logging.info("start-up finished in %f s.", elapsed / 1000.0)
 
-            # garbage collection after everything in iteration went out of scope
-            gc.collect()
-            elapsed = util.current_millis() - start_time
-            logging.debug("performed iteration %d in %f s.", iteration, elapsed / 1000.0)
+        profile_mem = 'profile_mem' in self.config_params['debug']
+        instrumentation.enable_memory_sampling(profile_mem)
 
-            if 'profile_mem' in self.config_params['debug'] and (iteration == 1 or iteration % 100 == 0):
-                with open(os.path.join(self.config_params['output_dir'], 'memprofile.tsv'), 'a') as outfile:
-                    self.write_mem_profile(outfile, iteration)
+        # after restoring a checkpoint, all scoring functions are up to date
+        resume_force = self.config_params['resume'] and self.__checkpoint_iteration is None
+        try:
+            for iteration in range(start_iter, num_iter):
+                start_time = util.current_millis()
+                force = resume_force and iteration == start_iter
+                debug_iteration = iteration == 1 or iteration % self.config_params['debug_freq'] == 0
+                cpu_profile_path = None
+                if 'profile_cpu' in self.config_params['debug'] and debug_iteration:
+                    cpu_profile_path = os.path.join(self.config_params['output_dir'],
+                                                    'cpuprofile-%04d.prof' % iteration)
+                # tracemalloc is too slow to trace every iteration
+                with instrumentation.profiled(cpu_profile_path, profile_mem and debug_iteration):
+                    self.run_iteration(iteration, force=force)
+
+                # garbage collection after everything in iteration went out of scope
+                gc.collect()
+                elapsed = util.current_millis() - start_time
+                instrumentation.SPANS.add('iteration', elapsed / 1000.0)
+                if profile_mem:
+                    instrumentation.sample_memory('iteration')
+                logging.debug("performed iteration %d in %f s.", iteration, elapsed / 1000.0)
+
+                checkpoint_freq = self.config_params['checkpoint_freq']
+                if checkpoint_freq > 0 and iteration % checkpoint_freq == 0:
+                    with instrumentation.span('checkpoint'):
+                        self.write_checkpoint(iteration)
+                self.write_metrics(iteration)
+        finally:
+            # flush the pending results, also when we were interrupted
+            self.close_result_writer()
+            self.close_metrics()
 
 
         """run post processing after the last iteration. We store the results in
@@ -714,17 +894,18 @@ class CMonkeyRun:
 
             self.write_results(iteration_result)
             self.write_stats(iteration_result)
-            self.update_iteration(iteration)
+            # don't use the loop variable, a run resumed from the checkpoint of the
+            # last iteration does not run any iterations
+            self.update_iteration(self.config_params['num_iterations'])
 
             # default behaviour:
             # always write complete result into a cmresults.tsv for R/cmonkey
             # compatibility
             session = self.__dbsession()
             path =  os.path.join(self.config_params['output_dir'], 'cmresults-postproc.tsv.bz2')
-            with bz2.BZ2File(path, 'w') as outfile:
-                debug.write_iteration(session, outfile,
-                                      self.config_params['num_iterations'] + 1,
-                                      self.config_params['num_clusters'], self.config_params['output_dir'])
+            persistence.dump_iteration(session, path, self.config_params['num_iterations'] + 1,
+                                       self.config_params['num_clusters'],
+                                       self.config_params['output_dir'])
 
             # additionally: run tomtom on the motifs if requested
             if (self.config_params['MEME']['global_background'] == 'True' and
@@ -732,6 +913,7 @@ class CMonkeyRun:
                 meme.run_tomtom(session, self.config_params['output_dir'], self.config_params['MEME']['version'])
 
         self.write_finish_info()
+        self.optimize_database()
         logging.info("Done !!!!")
 
 
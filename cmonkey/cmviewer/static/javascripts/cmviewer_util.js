@@ -239,6 +239,17 @@ function drawRunlogGraph(selector, titleSize, runlogSeries) {
         });
 }
 
+function drawStageTimingGraph(selector, titleSize, timingSeries) {
+    $(selector).highcharts(
+        {
+            chart: {type: 'area', width: 300, height: 200},
+            title: {text: 'Stage timings', style: {'fontSize': titleSize}},
+            plotOptions: { area: { stacking: 'normal', marker: { enabled: false } } },
+            yAxis: { title: { text: 'seconds' }, min: 0 },
+            series: timingSeries
+        });
+}
+
 function drawMeanScoreGraph(selector, titleText, yTitleText, titleSize, iterations,
                             minScore, maxScore, meanScores) {
     $(selector).highcharts(
@@ -291,6 +302,7 @@ function updateRunStatus() {
                      reloadResidualGraphValues('#residual-graph', iterations);
                      reloadClusterMemberGraphValues('#cluster-member-graph', iterations);
                      reloadRunlogGraphValues('#runlog-graph');
+                     reloadStageTimingGraphValues('#stage-timing-graph');
                      reloadFuzzyCoeffGraphValues('#fuzzy-graph', iterations);
                      reloadNetworkScoreGraphValues('#network-score-graph', iterations);
                      reloadMeanScoreGraphValues('#mean-score-graph', iterations);
@@ -361,6 +373,12 @@ function reloadRunlogGraphValues(selector) {
              }});
 }
 
+function reloadStageTimingGraphValues(selector) {
+    $.ajax({ url: '/api/stage_timings', success: function(data) {
+                 drawStageTimingGraph(selector, TITLE_SIZE, data);
+             }});
+}
+
 function reloadFuzzyCoeffGraphValues(selector) {
     $.ajax({ url: '/api/fuzzy_coeffs', success: function(data) {
                  drawFuzzyCoeffGraph(selector, TITLE_SIZE, iterations, data);
@@ -2,23 +2,31 @@
 
 import cherrypy
 from cherrypy import tools
+from cherrypy.lib import cptools
 import cherrypy_cors
 
 from jinja2 import Environment, FileSystemLoader
 import os
-from collections import namedtuple, defaultdict
+from collections import namedtuple, defaultdict, OrderedDict
 import json
 import gzip
 import numpy as np
 import glob
 import math
 import argparse
+import functools
+import threading
+import time
+import warnings
 from sqlalchemy import func, and_, or_
-from sqlalchemy.orm import aliased
+from sqlalchemy.orm import aliased, sessionmaker
 
 import sys
 import traceback as tb
 import cmonkey.database as cm2db
+import cmonkey.datamatrix as dm
+import cmonkey.membership_store as mstore
+import cmonkey.instrumentation as instrumentation
 
 
 DEFAULT_OUTDIR = 'out'
@@ -27,6 +35,21 @@ env = Environment(loader=FileSystemLoader(os.path.join(current_dir, 'templates')
 outdir = DEFAULT_OUTDIR
 dburl = None
 
+# the run information is checked at most once within this number of seconds
+# to decide whether cached responses are still valid
+RUN_VERSION_TTL = 5.0
+
+# number of clusters whose expression data is kept in memory
+EXPRESSION_CACHE_SIZE = 32
+
+# number of iterations whose membership snapshot is kept in memory
+SNAPSHOT_CACHE_SIZE = 4
+
+# one session factory per database URL, so the engine and its connection pool
+# are shared between requests
+session_factories = {}
+session_factories_lock = threading.Lock()
+
 
 # We create this to store temporary visualization objects
 MotifAnnotation = namedtuple('MotifAnnotation', ['motif_info_id', 'seqtype', 'motif_num',
@@ -70,38 +93,39 @@ class Ratios:
         The result is a sub matrix with |genes| rows and the original number of
         columns, but rearranged so that the columns inside the cluster are
         first then the ones that are outside the cluster are last"""
-        in_indexes = [self.cond_idx[cond] for cond in conds]
-        out_indexes = sorted(set(self.cond_idx.values()) - set(in_indexes))
-        col_indexes = in_indexes + out_indexes
-        row_indexes = [self.gene_idx[gene] for gene in genes]
-        data = self.data[row_indexes][:, col_indexes]
+        in_indexes = np.array([self.cond_idx[cond] for cond in conds], dtype=int)
+        is_out = np.ones(len(self.conds), dtype=bool)
+        is_out[in_indexes] = False
+        col_indexes = np.concatenate((in_indexes, np.where(is_out)[0]))
+        row_indexes = np.array([self.gene_idx[gene] for gene in genes], dtype=int)
+        data = self.data[np.ix_(row_indexes, col_indexes)]
         new_conds = [self.conds[i] for i in col_indexes]
         return Ratios(genes, new_conds, data)
 
-    def hs_subratios_for(self, genes, conds):
-        subratios = self.subratios_for(genes, conds)
-        return [{'name': gene, 'data': [normalize_js(val) for val in subratios.data[i]]}
-                for i, gene in enumerate(genes)]
-
-    def hs_boxplot_data_for(self, genes, conds, hc_workaround=True):
-        def make_row(row):
-            r = sorted(row)
-            minval = r[0]
-            maxval = r[-1]
-            median = r[int(len(r) / 2) + len(r) % 2]
-            quart = int(len(r) / 4)
-            lower_quartile = r[quart]
-            upper_quartile = r[-(quart + 1)]
-            return [normalize_js(minval), normalize_js(lower_quartile),
-                    normalize_js(median), normalize_js(upper_quartile),
-                    normalize_js(maxval)]
-
-        subratios = self.subratios_for(genes, conds)
-        # cut up the data into left and right half
-        data_in = subratios.data[:,:len(conds)].T
-        data_out = subratios.data[:,len(conds):].T
-        inrows = sorted(map(make_row, data_in), key=lambda r: r[2])
-        outrows = sorted(map(make_row, data_out), key=lambda r: r[2])
+    def hs_rows(self):
+        """the rows of this matrix as Highcharts series"""
+        values = np.where(np.isnan(self.data), 0.0, self.data)
+        return [{'name': gene, 'data': values[i].tolist()}
+                for i, gene in enumerate(self.genes)]
+
+    def hs_boxplot_rows(self, num_in, hc_workaround=True):
+        """the boxplot rows [min, lower quartile, median, upper quartile, max]
+        of the columns of this matrix. The first num_in columns and the
+        remaining columns are each sorted by their median. A matrix without
+        rows has no boxplot"""
+        if len(self.genes) == 0:
+            return []
+        with warnings.catch_warnings():
+            # columns that only contain NA values result in NaN
+            warnings.simplefilter('ignore', RuntimeWarning)
+            quantiles = np.nanpercentile(self.data, [0, 25, 50, 75, 100], axis=0)
+        quantiles = np.where(np.isnan(quantiles), 0.0, quantiles).T
+
+        def sorted_rows(rows):
+            return rows[np.argsort(rows[:, 2], kind='stable')].tolist()
+
+        inrows = sorted_rows(quantiles[:num_in])
+        outrows = sorted_rows(quantiles[num_in:])
 
         # The boxplot in Highcharts fails if there are too many values (> 1000 or so)
         # We remove values depending on the order of magnitude of their length
@@ -109,24 +133,73 @@ class Ratios:
         if hc_workaround:
             nin = len(inrows)
             nout = len(outrows)
-            scale_in = 10 ** (int(round(math.log10(nin))) - 2)
-            scale_out = 10 ** (int(round(math.log10(nout))) - 2)
             if nin > 100:
+                scale_in = 10 ** (int(round(math.log10(nin))) - 2)
                 inrows = [row for i, row in enumerate(inrows) if i % scale_in == 1]
             if nout > 100:
+                scale_out = 10 ** (int(round(math.log10(nout))) - 2)
                 outrows = [row for i, row in enumerate(outrows) if i % scale_out == 1]
 
         result = inrows + outrows
         return result
 
+    def hs_subratios_for(self, genes, conds):
+        return self.subratios_for(genes, conds).hs_rows()
+
+    def hs_boxplot_data_for(self, genes, conds, hc_workaround=True):
+        return self.subratios_for(genes, conds).hs_boxplot_rows(len(conds), hc_workaround)
+
+    def hs_cluster_data_for(self, genes, conds):
+        """the expression series, boxplot rows and mean of a cluster, computed
+        from a single sub matrix"""
+        subratios = self.subratios_for(genes, conds)
+        return {'expressions': subratios.hs_rows(),
+                'boxplot': subratios.hs_boxplot_rows(len(conds)),
+                'mean': normalize_js(subratios.mean())}
+
+
+class LRUCache:
+    """A thread-safe dictionary that holds at most maxsize entries and
+    evicts the least recently used one"""
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()
+
+    def get(self, key, compute):
+        """returns the entry for key, compute() is called if there is none"""
+        with self.lock:
+            if key in self.entries:
+                value = self.entries.pop(key)
+                self.entries[key] = value
+                return value
+        value = compute()
+        with self.lock:
+            self.entries[key] = value
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+        return value
+
+
+snapshot_members = LRUCache(SNAPSHOT_CACHE_SIZE)
+
 
 def read_ratios():
+    """reads the run's ratios matrix. The binary matrix that the run writes
+    next to its results is memory-mapped, older runs only have the
+    tab-separated file"""
     def to_float(s):
         if s == 'NA':
             return float('nan')
         else:
             return float(s)
     global outdir
+    binary_file = os.path.join(outdir, 'ratios.npy')
+    if os.path.exists(binary_file) and os.path.exists(dm.binary_names_path(binary_file)):
+        matrix = dm.read_binary_file(binary_file)
+        return Ratios(list(matrix.row_names), list(matrix.column_names), matrix.values)
+
     ratios_file = os.path.join(outdir, 'ratios.tsv.gz')
     with gzip.open(ratios_file) as infile:
         column_titles = infile.readline().strip().split(b'\t')
@@ -140,23 +213,119 @@ def read_ratios():
     return Ratios(row_titles, column_titles, np.array(data))
 
 
+def cluster_members(session, iteration, cluster):
+    """returns the row and column member names of a cluster. The membership
+    snapshot is used if the run has one for the iteration, otherwise we
+    query the database"""
+    global outdir
+    iteration = int(iteration)
+    cluster = int(cluster)
+    store = mstore.MembershipStore(outdir)
+    if store.has_iteration(iteration):
+        # a resumed run can rewrite the snapshot, so its time stamp is part of the key
+        path = store.path_for(iteration)
+        rows, columns = snapshot_members.get((path, os.path.getmtime(path)),
+                                             lambda: store.cluster_members(iteration))
+        return rows.get(cluster, []), columns.get(cluster, [])
+
+    rows = [rm.row_name.name for rm in session.query(cm2db.RowMember).filter(
+        and_(cm2db.RowMember.iteration == iteration, cm2db.RowMember.cluster == cluster))]
+    columns = [cm.column_name.name for cm in session.query(cm2db.ColumnMember).filter(
+        and_(cm2db.ColumnMember.iteration == iteration, cm2db.ColumnMember.cluster == cluster))]
+    return rows, columns
+
+
 def clusterstat_factory(cursor, row):
     return ClusterStat(*row)
 
 
 def dbsession():
+    """returns a session on the database of the run. The engine is only
+    created on the first call, later sessions take their connections from
+    its pool"""
     global dburl
-    return cm2db.make_session(dburl)
+    with session_factories_lock:
+        if dburl not in session_factories:
+            session_factories[dburl] = sessionmaker(bind=cm2db.make_engine(dburl))
+        return session_factories[dburl]()
+
+
+class ResponseCache:
+    """Caches the results of the JSON API for the current state of the run.
+    The state is identified by the last iteration in the run information,
+    which is looked up at most once within ttl seconds. All cached results
+    are dropped as soon as the run advanced"""
+
+    def __init__(self, ttl=RUN_VERSION_TTL):
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        self.version = None
+        self.version_time = None
+        self.entries = {}
+
+    def run_version(self):
+        with self.lock:
+            now = time.time()
+            if self.version_time is not None and now - self.version_time < self.ttl:
+                return self.version
+
+        session = dbsession()
+        try:
+            runinfo = session.query(cm2db.RunInfo.last_iteration,
+                                    cm2db.RunInfo.finish_time).first()
+        finally:
+            session.close()
+        version = 0 if runinfo is None else runinfo[0] or 0
+        if runinfo is not None and runinfo[1] is not None:
+            version = "%d-finished" % version
+
+        with self.lock:
+            if version != self.version:
+                self.entries = {}
+                self.version = version
+            self.version_time = now
+        return version
+
+    def get(self, key, compute):
+        """returns the cached result for key, compute() is called if there is none"""
+        version = self.run_version()
+        with self.lock:
+            if key in self.entries:
+                return self.entries[key]
+        result = compute()
+        with self.lock:
+            if version == self.version:
+                self.entries[key] = result
+        return result
+
+    def clear(self):
+        with self.lock:
+            self.version = None
+            self.version_time = None
+            self.entries = {}
+
 
+response_cache = ResponseCache()
 
-def make_int_histogram(counts):
-    """input: list of counts
-    output: xvalues (count), yvalues (# clusters)"""
-    histogram = defaultdict(int)
-    for count in counts:
-        histogram[count] += 1
-    sorted_keys = sorted(histogram.keys())
-    return sorted_keys, [histogram[key] for key in sorted_keys]
+
+def cached_response(method):
+    """Decorator for JSON API methods whose results only change when the run
+    advanced. The result is served from response_cache and the response gets
+    an ETag for the run state, so clients that send a matching If-None-Match
+    get a 304 without the body"""
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        key = (method.__name__, args, tuple(sorted(kwargs.items())))
+        version = response_cache.run_version()
+        cherrypy.response.headers['ETag'] = '"%s"' % version
+        cptools.validate_etags()
+        return response_cache.get(key, lambda: method(self, *args, **kwargs))
+    return wrapper
+
+
+def last_stats_iteration(session):
+    """the last iteration that has cluster statistics"""
+    return session.query(func.max(cm2db.ClusterStat.iteration)).scalar()
 
 
 def make_float_histogram(values, nbuckets=20):
@@ -178,10 +347,10 @@ def make_float_histogram(values, nbuckets=20):
 def make_series(stats):
     """Creates a data series for Highcharts and returns a triple of the
     series data and minimum and maximum score
-    The input is a list of IterationStat objects
+    The input is a list of (statstype name, score) pairs ordered by iteration
     """
     groups = defaultdict(list)
-    scores = [stat.score for stat in stats]
+    scores = [score for _, score in stats]
     if len(scores) > 0:
         minscore = min(scores)
         maxscore = max(scores)
@@ -189,8 +358,8 @@ def make_series(stats):
         minscore = 0.0
         maxscore = 0.0
 
-    for stat in stats:
-        groups[stat.statstype_obj.name].append(stat.score)
+    for name, score in stats:
+        groups[name].append(score)
     minscore = math.floor(minscore)
     maxscore = math.ceil(maxscore)
     return [{'name': label, 'data': groups[label]} for label in groups], minscore, maxscore
@@ -200,12 +369,25 @@ class ClusterViewerApp:
 
     def __init__(self):
         self.__ratios = None
+        self.__cluster_data = LRUCache(EXPRESSION_CACHE_SIZE)
 
     def ratios(self):
         if self.__ratios is None:
             self.__ratios = read_ratios()
         return self.__ratios
 
+    def cluster_data(self, session, iteration, cluster):
+        """the members and expression plot data of a cluster, see
+        Ratios.hs_cluster_data_for(). The members of an iteration do not change,
+        so the data of the recently viewed clusters is kept"""
+        def compute():
+            rows, columns = cluster_members(session, iteration, cluster)
+            result = self.ratios().hs_cluster_data_for(rows, columns)
+            result['rows'] = rows
+            result['columns'] = columns
+            return result
+        return self.__cluster_data.get((int(iteration), int(cluster)), compute)
+
     @cherrypy.expose
     def index(self):
         iteration = None
@@ -404,6 +586,7 @@ class ClusterViewerApp:
 
     @cherrypy.expose
     @cherrypy.tools.json_out()
+    @cached_response
     def iterations(self):
         session = dbsession()
         try:
@@ -415,6 +598,7 @@ class ClusterViewerApp:
 
     @cherrypy.expose
     @cherrypy.tools.json_out()
+    @cached_response
     def mean_residuals(self):
         session = dbsession()
         try:
@@ -427,22 +611,19 @@ class ClusterViewerApp:
 
     @cherrypy.expose
     @cherrypy.tools.json_out()
+    @cached_response
     def mean_cluster_members(self):
-        row_stats = defaultdict(list)
-        col_stats = defaultdict(list)
         session = dbsession()
         try:
-            for cstat in session.query(cm2db.ClusterStat):
-                row_stats[cstat.iteration].append(cstat.num_rows)
-                col_stats[cstat.iteration].append(cstat.num_cols)
+            means = session.query(func.avg(cm2db.ClusterStat.num_rows),
+                                  func.avg(cm2db.ClusterStat.num_cols)).group_by(
+                cm2db.ClusterStat.iteration).order_by(cm2db.ClusterStat.iteration).all()
         finally:
             if session is not None:
                 session.close()
 
-        mean_nrow = [float(sum(row_stats[i])) / len(row_stats[i])
-                     for i in sorted(row_stats.keys())]
-        mean_ncol = [float(sum(col_stats[i])) / len(col_stats[i])
-                     for i in sorted(col_stats.keys())]
+        mean_nrow = [float(mean_rows) for mean_rows, _ in means]
+        mean_ncol = [float(mean_cols) for _, mean_cols in means]
         return {'meanNumRows': mean_nrow, 'meanNumCols': mean_ncol}
 
     @cherrypy.expose
@@ -462,6 +643,21 @@ class ClusterViewerApp:
 
     @cherrypy.expose
     @cherrypy.tools.json_out()
+    def stage_timings(self):
+        """the time spent in the pipeline stages per iteration, the total
+        iteration and start-up times are left out"""
+        global outdir
+        path = os.path.join(outdir, instrumentation.METRICS_FILE)
+        if not os.path.exists(path):
+            return []
+        timings = instrumentation.read_metrics(path, 'seconds')
+        return [{'name': stage, 'data': [list(entry) for entry in timings[stage]]}
+                for stage in sorted(timings.keys())
+                if stage not in ['iteration', 'startup']]
+
+    @cherrypy.expose
+    @cherrypy.tools.json_out()
+    @cached_response
     def fuzzy_coeffs(self):
         session = dbsession()
         try:
@@ -474,47 +670,49 @@ class ClusterViewerApp:
 
     @cherrypy.expose
     @cherrypy.tools.json_out()
+    @cached_response
     def cluster_row_hist(self):
         """Note: this is actually iteration-specific, currently we lock this to the last
         iteration until it becomes an issue"""
-        row_stats = defaultdict(list)
         session = dbsession()
         try:
-            for cstat in session.query(cm2db.ClusterStat):
-                row_stats[cstat.iteration].append(cstat.num_rows)
-            nrows_x, nrows_y = make_int_histogram(row_stats[max(row_stats.keys())])
+            counts = session.query(cm2db.ClusterStat.num_rows, func.count()).filter(
+                cm2db.ClusterStat.iteration == last_stats_iteration(session)).group_by(
+                    cm2db.ClusterStat.num_rows).order_by(cm2db.ClusterStat.num_rows).all()
         finally:
             if session is not None:
                 session.close()
-        return {'xvalues': nrows_x, 'yvalues': nrows_y}
+        return {'xvalues': [count[0] for count in counts],
+                'yvalues': [count[1] for count in counts]}
 
     @cherrypy.expose
     @cherrypy.tools.json_out()
+    @cached_response
     def cluster_col_hist(self):
         """Note: this is actually iteration-specific, currently we lock this to the last
         iteration until it becomes an issue"""
-        col_stats = defaultdict(list)
         session = dbsession()
         try:
-            for cstat in session.query(cm2db.ClusterStat):
-                col_stats[cstat.iteration].append(cstat.num_cols)
-            ncols_x, ncols_y = make_int_histogram(col_stats[max(col_stats.keys())])
+            counts = session.query(cm2db.ClusterStat.num_cols, func.count()).filter(
+                cm2db.ClusterStat.iteration == last_stats_iteration(session)).group_by(
+                    cm2db.ClusterStat.num_cols).order_by(cm2db.ClusterStat.num_cols).all()
         finally:
             if session is not None:
                 session.close()
-        return {'xvalues': ncols_x, 'yvalues': ncols_y}
+        return {'xvalues': [count[0] for count in counts],
+                'yvalues': [count[1] for count in counts]}
 
     @cherrypy.expose
     @cherrypy.tools.json_out()
+    @cached_response
     def cluster_residuals(self):
         """Note: this is actually iteration-specific, currently we lock this to the last
         iteration until it becomes an issue"""
-        resid_stats = defaultdict(list)
         session = dbsession()
         try:
-            for cstat in session.query(cm2db.ClusterStat):
-                resid_stats[cstat.iteration].append(cstat.residual)
-            resids_x, resids_y = make_float_histogram(resid_stats[max(resid_stats.keys())])
+            resids = [r[0] for r in session.query(cm2db.ClusterStat.residual).filter(
+                cm2db.ClusterStat.iteration == last_stats_iteration(session))]
+            resids_x, resids_y = make_float_histogram(resids)
         finally:
             if session is not None:
                 session.close()
@@ -522,11 +720,13 @@ class ClusterViewerApp:
 
     @cherrypy.expose
     @cherrypy.tools.json_out()
+    @cached_response
     def network_score_means(self):
         session = dbsession()
         try:
-            iter_stats = session.query(cm2db.IterationStat).join(cm2db.StatsType).filter(
-                cm2db.StatsType.category == 'network')
+            iter_stats = session.query(cm2db.StatsType.name, cm2db.IterationStat.score).join(
+                cm2db.IterationStat.statstype_obj).filter(
+                    cm2db.StatsType.category == 'network').order_by(cm2db.IterationStat.iteration).all()
             series, min_score, max_score = make_series(iter_stats)
         finally:
             if session is not None:
@@ -535,6 +735,7 @@ class ClusterViewerApp:
 
     @cherrypy.expose
     @cherrypy.tools.json_out()
+    @cached_response
     def slider_ranges(self, iteration):
         session = dbsession()
         try:
@@ -556,23 +757,17 @@ class ClusterViewerApp:
 
     @cherrypy.expose
     @cherrypy.tools.json_out()
+    @cached_response
     def generic_score_means(self):
         session = dbsession()
         try:
-            stats_scores = []
-            stats = []
-            for statstype in session.query(cm2db.StatsType).filter(
-                and_(cm2db.StatsType.name.notin_(['Rows', 'Columns', 'Networks']),
+            iter_stats = session.query(cm2db.StatsType.name, cm2db.IterationStat.score).join(
+                cm2db.IterationStat.statstype_obj).filter(
+                    and_(cm2db.StatsType.name.notin_(['Rows', 'Columns', 'Networks']),
                          or_(cm2db.StatsType.category == 'scoring',
-                                 cm2db.StatsType.category == 'seqtype'))):
-                mean_stats, min_score, max_score = make_series(
-                    session.query(cm2db.IterationStat).join(cm2db.StatsType).filter(
-                        cm2db.StatsType.name == statstype.name))
-                stats_scores.append(min_score)
-                stats_scores.append(max_score)
-                stats.extend(mean_stats)
-            min_stats_score = min(stats_scores)
-            max_stats_score = max(stats_scores)
+                             cm2db.StatsType.category == 'seqtype'))).order_by(
+                                 cm2db.IterationStat.iteration).all()
+            stats, min_stats_score, max_stats_score = make_series(iter_stats)
         finally:
             if session is not None:
                 session.close()
@@ -697,10 +892,7 @@ class ClusterViewerApp:
     def cluster_members(self, iteration, cluster):
         session = dbsession()
         try:
-            rows = [rm.row_name.name for rm in session.query(cm2db.RowMember).filter(
-                and_(cm2db.RowMember.iteration == iteration, cm2db.RowMember.cluster == cluster))]
-            columns = [cm.column_name.name for cm in session.query(cm2db.ColumnMember).filter(
-                and_(cm2db.ColumnMember.iteration == iteration, cm2db.ColumnMember.cluster == cluster))]
+            rows, columns = cluster_members(session, iteration, cluster)
             return {'rowMembers': sorted(rows), 'columnMembers': sorted(columns)}
         finally:
             if session is not None:
@@ -711,11 +903,7 @@ class ClusterViewerApp:
     def cluster_expressions(self, iteration, cluster):
         session = dbsession()
         try:
-            rows = [rm.row_name.name for rm in session.query(cm2db.RowMember).filter(
-                and_(cm2db.RowMember.iteration == iteration, cm2db.RowMember.cluster == cluster))]
-            columns = [cm.column_name.name for cm in session.query(cm2db.ColumnMember).filter(
-                and_(cm2db.ColumnMember.iteration == iteration, cm2db.ColumnMember.cluster == cluster))]
-            return self.ratios().hs_subratios_for(rows, columns)
+            return self.cluster_data(session, iteration, cluster)['expressions']
         finally:
             if session is not None:
                 session.close()
@@ -725,14 +913,10 @@ class ClusterViewerApp:
     def cluster_bpexpressions(self, iteration, cluster):
         session = dbsession()
         try:
-            rows = [rm.row_name.name for rm in session.query(cm2db.RowMember).filter(
-                and_(cm2db.RowMember.iteration == iteration, cm2db.RowMember.cluster == cluster))]
-            columns = [cm.column_name.name for cm in session.query(cm2db.ColumnMember).filter(
-                and_(cm2db.ColumnMember.iteration == iteration, cm2db.ColumnMember.cluster == cluster))]
-            ratios_mean = normalize_js(self.ratios().subratios_for(rows, columns).mean())
+            cluster_data = self.cluster_data(session, iteration, cluster)
             return {
-                'values': self.ratios().hs_boxplot_data_for(rows, columns),
-                'mean': ratios_mean
+                'values': cluster_data['boxplot'],
+                'mean': cluster_data['mean']
             }
         finally:
             if session is not None:
@@ -774,11 +958,10 @@ class ClusterViewerApp:
         try:
             runinfo = session.query(cm2db.RunInfo).one()
             species = runinfo.species
-            rows = [rm.row_name.name for rm in session.query(cm2db.RowMember).filter(
-                and_(cm2db.RowMember.iteration == iteration, cm2db.RowMember.cluster == cluster))]
-            columns = [cm.column_name.name for cm in session.query(cm2db.ColumnMember).filter(
-                and_(cm2db.ColumnMember.iteration == iteration, cm2db.ColumnMember.cluster == cluster))]
-            js_ratios = json.dumps(self.ratios().hs_subratios_for(rows, columns))
+            cluster_data = self.cluster_data(session, iteration, cluster)
+            rows = cluster_data['rows']
+            columns = cluster_data['columns']
+            js_ratios = json.dumps(cluster_data['expressions'])
 
             # grouped by seqtype
             motif_infos = defaultdict(list)
@@ -816,8 +999,8 @@ class ClusterViewerApp:
                                   make_annotations(session, iteration, cluster).items()
             }
 
-            ratios_mean = normalize_js(self.ratios().subratios_for(rows, columns).mean())
-            js_boxplot_ratios = json.dumps(self.ratios().hs_boxplot_data_for(rows, columns))
+            ratios_mean = cluster_data['mean']
+            js_boxplot_ratios = json.dumps(cluster_data['boxplot'])
 
         finally:
             if session is not None:
@@ -919,6 +1102,7 @@ def setup_routes():
     # charts
     d.connect('fuzzy_coeffs', '/api/fuzzy_coeffs', controller=main, action="fuzzy_coeffs")
     d.connect('runlog', '/api/runlog', controller=main, action="runlog")
+    d.connect('stage_timings', '/api/stage_timings', controller=main, action="stage_timings")
     d.connect('mean_residuals', '/api/mean_residuals', controller=main, action="mean_residuals")
     d.connect('cluster_residuals', '/api/cluster_residuals', controller=main,
               action="cluster_residuals")
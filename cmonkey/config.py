@@ -40,11 +40,14 @@ supported debug options:
   - keep_memeout: keeps meme output files
   - dump_results: dump results into cmresults files, implies keep_memeout
   - dump_scores: dumps score matrices as received from the individual scoring functions
-  - profile_mem: write memory profile
+  - profile_mem: sample the memory usage of the pipeline stages into the metrics table,
+    allocations are traced in the iterations that are selected by debug_frequency
+  - profile_cpu: write cProfile statistics of the main process for the iterations
+    that are selected by debug_frequency
   - random_seed: fixed random seed
 """
 ALL_DEBUG_OPTIONS = {'keep_memeout', 'dump_results', 'dump_scores', 'profile_mem',
-                     'random_seed', 'keep_mastout'}
+                     'profile_cpu', 'random_seed', 'keep_mastout'}
 
 
 def get_config_boolean(config, section, option, default_value):
@@ -120,6 +123,16 @@ def set_config_general(config, params):
     params['stats_freq'] = config.getint('General', 'stats_frequency')
     params['result_freq'] = config.getint('General', 'result_frequency')
     params['debug_freq'] = config.getint('General', 'debug_frequency')
+    params['async_writes'] = get_config_boolean(config, 'General', 'async_writes', True)
+    params['write_queue_size'] = get_config_int(config, 'General', 'write_queue_size', 2)
+    params['membership_snapshots'] = get_config_boolean(config, 'General', 'membership_snapshots', True)
+    params['checkpoint_freq'] = get_config_int(config, 'General', 'checkpoint_frequency', 10)
+    params['organism_bundle'] = get_config_boolean(config, 'General', 'organism_bundle', True)
+    params['ratios_cache'] = get_config_boolean(config, 'General', 'ratios_cache', True)
+    params['ratios_dtype'] = get_config_str(config, 'General', 'ratios_dtype', 'float64')
+    if params['ratios_dtype'] not in {'float32', 'float64'}:
+        raise Exception("ratios_dtype must be float32 or float64 (was '%s')" %
+                        params['ratios_dtype'])
 
     # implicit parameters for compatibility
     params['use_operons'] = get_config_boolean(config, 'General', 'use_operons', True)
@@ -228,7 +241,7 @@ def __get_arg_parser(arg_ext):
     parser.add_argument('--nooperons', action="store_true", help="deactivate operon network scoring")
     parser.add_argument('--config', default=None, nargs='*', help="additional configuration file(s)")
     parser.add_argument('--debug', default=None,  help="""run in debug mode, can be keep_memeout,
-dump_results, dump_scores, profile_mem, random_seed, keep_mastout, all or a combination""")
+dump_results, dump_scores, profile_mem, profile_cpu, random_seed, keep_mastout, all or a combination""")
     parser.add_argument('--random_seed', type=int)
     parser.add_argument('--num_cores', type=int, default=None)
     parser.add_argument('--minimize_io', action="store_true",
@@ -471,7 +484,7 @@ def setup_default(args, config_parser):
     else:
         overrides['memb.clusters_per_col'] = int(round(num_clusters * 2.0 / 3.0))
 
-    params['MEME']['version'] = meme.check_meme_version()
+    params['MEME']['version'] = meme.check_meme_version(args.cachedir or params['cache_dir'])
     overrides['nomotifs'] = args.nomotifs or not params['MEME']['version']
     overrides['use_string'] = not args.nostring
     overrides['use_operons'] = not args.nooperons
@@ -534,7 +547,12 @@ def read_ratios(params, args_in):
     matrix_filename = args_in.ratios
 
     case_sensitive = params['case_sensitive'] or args_in.case_sensitive
-    return dm.create_from_csv(matrix_filename, filters=ratio_filters, case_sensitive=case_sensitive)
+    if params['ratios_cache']:
+        cache_dir = getattr(args_in, 'cachedir', None) or params['cache_dir']
+    else:
+        cache_dir = None
+    return dm.create_from_csv(matrix_filename, filters=ratio_filters, case_sensitive=case_sensitive,
+                              cache_dir=cache_dir, dtype=params['ratios_dtype'])
 
 
 def write_setup(config_params):
@@ -579,6 +597,13 @@ def write_general_settings(outfile, config_params):
     outfile.write('stats_frequency = %d\n' % config_params['stats_freq'])
     outfile.write('result_frequency = %d\n' % config_params['result_freq'])
     outfile.write('debug_frequency = %d\n' % config_params['debug_freq'])
+    outfile.write('async_writes = %s\n' % str(config_params['async_writes']))
+    outfile.write('write_queue_size = %d\n' % config_params['write_queue_size'])
+    outfile.write('membership_snapshots = %s\n' % str(config_params['membership_snapshots']))
+    outfile.write('checkpoint_frequency = %d\n' % config_params['checkpoint_freq'])
+    outfile.write('organism_bundle = %s\n' % str(config_params['organism_bundle']))
+    outfile.write('ratios_cache = %s\n' % str(config_params['ratios_cache']))
+    outfile.write('ratios_dtype = %s\n' % config_params['ratios_dtype'])
     outfile.write('postadjust = %s\n' % str(config_params['postadjust']))
     outfile.write('add_fuzz = %s\n' % str(config_params['add_fuzz']))
     outfile.write('num_clusters = %d\n' % config_params['num_clusters'])
@@ -1,5 +1,6 @@
 """database.py - mapping cmonkey_run.db files with SQLAlchemy"""
-from sqlalchemy import Column, Integer, String, DateTime, Float, ForeignKey, Boolean, create_engine, func
+import logging
+from sqlalchemy import Column, Integer, String, DateTime, Float, ForeignKey, Boolean, Index, create_engine, func, inspect, text
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.ext.automap import automap_base
 from sqlalchemy.orm import relationship, sessionmaker
@@ -36,6 +37,7 @@ class RunInfo(Base):
 
 class ClusterStat(Base):
     __tablename__ = 'cluster_stats'
+    __table_args__ = (Index('ix_cluster_stats_iteration_cluster', 'iteration', 'cluster'),)
 
     rowid     = Column(Integer, primary_key=True)
     iteration = Column(Integer, index=True)
@@ -63,11 +65,12 @@ class StatsType(Base):
 
 class IterationStat(Base):
     __tablename__ = 'iteration_stats'
+    __table_args__ = (Index('ix_iteration_stats_statstype_iteration', 'statstype', 'iteration'),)
 
     rowid = Column(Integer, primary_key=True)
     statstype = Column(Integer, ForeignKey('statstypes.rowid'))
     statstype_obj = relationship('StatsType')
-    iteration = Column(Integer)
+    iteration = Column(Integer, index=True)
     score = Column(Float)
 
     def __repr__(self):
@@ -98,6 +101,7 @@ class ColumnName(Base):
 
 class RowMember(Base):
     __tablename__ = 'row_members'
+    __table_args__ = (Index('ix_row_members_iteration_cluster', 'iteration', 'cluster'),)
 
     rowid = Column(Integer, primary_key=True)
     iteration = Column(Integer, index=True)
@@ -111,10 +115,11 @@ class RowMember(Base):
 
 class ColumnMember(Base):
     __tablename__ = 'column_members'
+    __table_args__ = (Index('ix_column_members_iteration_cluster', 'iteration', 'cluster'),)
 
     rowid = Column(Integer, primary_key=True)
     iteration = Column(Integer, index=True)
-    cluster = Column(Integer)
+    cluster = Column(Integer, index=True)
     order_num = Column(Integer, ForeignKey('column_names.order_num'))
     column_name = relationship('ColumnName')
 
@@ -135,9 +140,10 @@ class GlobalBackground(Base):
 
 class MotifInfo(Base):
     __tablename__ = 'motif_infos'
+    __table_args__ = (Index('ix_motif_infos_iteration_cluster', 'iteration', 'cluster'),)
 
     rowid = Column(Integer, primary_key=True)
-    iteration = Column(Integer)
+    iteration = Column(Integer, index=True)
     cluster = Column(Integer, index=True)
     seqtype = Column(String(30))
     motif_num = Column(Integer)
@@ -167,9 +173,9 @@ class MotifPSSMRow(Base):
     __tablename__ = 'motif_pssm_rows'
 
     rowid = Column(Integer, primary_key=True)
-    motif_info_id = Column(Integer, ForeignKey('motif_infos.rowid'))
+    motif_info_id = Column(Integer, ForeignKey('motif_infos.rowid'), index=True)
     motif_info = relationship('MotifInfo')
-    iteration = Column(Integer)
+    iteration = Column(Integer, index=True)
     row = Column(Integer)
     a = Column(Float)
     c = Column(Float)
@@ -187,7 +193,7 @@ class MemeMotifSite(Base):
     __tablename__ = 'meme_motif_sites'
 
     rowid = Column(Integer, primary_key=True)
-    motif_info_id = Column(Integer, ForeignKey('motif_infos.rowid'))
+    motif_info_id = Column(Integer, ForeignKey('motif_infos.rowid'), index=True)
     motif_info = relationship('MotifInfo')
     seq_name = Column(String(50))
     reverse = Column(Boolean)
@@ -222,7 +228,7 @@ class MotifAnnotation(Base):
     __tablename__ = 'motif_annotations'
 
     rowid = Column(Integer, primary_key=True)
-    motif_info_id = Column(Integer, ForeignKey('motif_infos.rowid'))
+    motif_info_id = Column(Integer, ForeignKey('motif_infos.rowid'), index=True)
     motif_info = relationship('MotifInfo')
     iteration = Column(Integer)
     gene_num = Column(Integer, ForeignKey('row_names.order_num'))
@@ -237,9 +243,50 @@ class MotifAnnotation(Base):
             self.pvalue)
 
 
-def make_session(dburl):
+def create_missing_indexes(engine):
+    """Migration path for result databases that were created by an older version:
+    create_all() only creates the indexes of tables it creates, so we add the
+    indexes that were introduced later to the existing tables"""
+    inspector = inspect(engine)
+    for table in Base.metadata.sorted_tables:
+        existing = {index['name'] for index in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name not in existing:
+                logging.info("creating index '%s' on table '%s'", index.name, table.name)
+                index.create(bind=engine)
+
+
+def optimize_database(engine, vacuum=False):
+    """Update the query planner statistics and optionally compact the
+    database. This is intended to be run after a cmonkey run has finished.
+    Only SQLite and PostgreSQL are supported, other databases are left alone"""
+    if engine.dialect.name not in {'sqlite', 'postgresql'}:
+        logging.info("database optimization not supported for '%s'", engine.dialect.name)
+        return
+    # VACUUM can not run inside a transaction
+    with engine.connect().execution_options(isolation_level='AUTOCOMMIT') as conn:
+        conn.execute(text('ANALYZE'))
+        if vacuum:
+            conn.execute(text('VACUUM'))
+
+
+def upgrade_database(engine):
+    """bring the schema of a result database up to date. This issues DDL on
+    existing tables, so it should only be run by the process that owns the
+    database: when a run creates it or from cm2dbupgrade"""
+    Base.metadata.create_all(engine)
+    create_missing_indexes(engine)
+
+
+def make_engine(dburl):
+    """create the engine, tables that do not exist yet are created"""
     engine = create_engine(dburl)
     Base.metadata.create_all(engine)
+    return engine
+
+
+def make_session(dburl):
+    engine = make_engine(dburl)
     Session = sessionmaker(bind=engine)
     session = Session()
     return session
@@ -4,14 +4,16 @@
 This file is part of cMonkey Python. Please see README and LICENSE for
 more information and licensing details.
 """
-import scipy
 import numpy as np
 import operator
 import cmonkey.util as util
 import logging
 import gzip
 import os
+import json
+import hashlib
 import random
+import warnings
 import pandas
 
 # Python2/Python3 compatibility
@@ -32,8 +34,10 @@ class DataMatrix:
 
     # pylint: disable-msg=R0913
     def __init__(self, nrows, ncols, row_names=None, col_names=None,
-                 values=None, init_value=None):
-        """create a DataMatrix instance"""
+                 values=None, init_value=None, dtype=np.float64, copy=True):
+        """create a DataMatrix instance. If copy is False and values is
+        a numpy array of the specified shape and type, e.g. a memory-mapped
+        ratios matrix, the matrix wraps it instead of copying it"""
         def check_values():
             """Sets values from a two-dimensional list"""
             if len(values) != nrows:
@@ -60,10 +64,14 @@ class DataMatrix:
             self.column_names = col_names
 
         if values is not None:
-            check_values()
-            self.values = np.array(values, dtype=np.float64)
+            if not (isinstance(values, np.ndarray) and values.shape == (nrows, ncols)):
+                check_values()
+            if copy:
+                self.values = np.array(values, dtype=dtype)
+            else:
+                self.values = np.asanyarray(values, dtype=dtype)
         else:
-            self.values = np.zeros((nrows, ncols))
+            self.values = np.zeros((nrows, ncols), dtype=dtype)
             if init_value is not None:
                 self.values.fill(init_value)
 
@@ -76,6 +84,11 @@ class DataMatrix:
         self.num_rows = nrows
         self.num_columns = 0 if nrows == 0 else ncols
 
+    @property
+    def nbytes(self):
+        """the size of the values buffer in bytes, like numpy's nbytes"""
+        return self.values.nbytes
+
     def row_indexes_for(self, row_names):
         """returns the row indexes with the matching names"""
         if self.row_indexes is None:
@@ -101,11 +114,11 @@ class DataMatrix:
     def submatrix_by_rows(self, row_indexes):
         """extract a submatrix with the specified rows.
         row_indexes needs to be sorted"""
-        new_values = self.values[[row_indexes]]
+        new_values = self.values[row_indexes]
         return DataMatrix(len(row_indexes), self.num_columns,
                           row_names=[self.row_names[index] for index in row_indexes],
                           col_names=self.column_names,
-                          values=new_values)
+                          values=new_values, dtype=self.values.dtype)
 
     def submatrix_by_name(self, row_names=None, column_names=None):
         """extract a submatrix with the specified rows and columns
@@ -147,7 +160,7 @@ class DataMatrix:
 
         new_values = make_values(row_indexes, col_indexes)
         return DataMatrix(len(row_names), len(column_names), row_names,
-                          column_names, values=new_values)
+                          column_names, values=new_values, dtype=self.values.dtype)
 
     def sorted_by_row_name(self):
         """returns a version of this table, sorted by row name"""
@@ -158,7 +171,7 @@ class DataMatrix:
         new_rows = [self.values[row_pair[1]] for row_pair in row_pairs]
         return DataMatrix(self.num_rows, self.num_columns,
                           new_row_names, self.column_names,
-                          values=new_rows)
+                          values=new_rows, dtype=self.values.dtype)
 
     ######################################################################
     #### Operations on the matrix values
@@ -287,52 +300,20 @@ COLUMN_THRESHOLD = 0.1
 def nochange_filter(dataframe):
     """returns a new filtered DataMatrix containing only the columns and
     rows that have large enough measurements"""
+    values = dataframe.values.astype('float64')
+    is_nan = np.isnan(values)
+    with np.errstate(invalid='ignore'):
+        abs_values = np.abs(values)
 
-    def nochange_filter_rows():
-        """subfunction of nochange_filter to filter row-wise"""
-        keep = []
-        dmvalues = dataframe.values
-        for row_index in xrange(dataframe.shape[0]):
-            count = 0
-            for col_index in xrange(dataframe.shape[1]):
-                value = dmvalues[row_index, col_index]
-                if np.isnan(value) or abs(value) <= ROW_THRESHOLD:
-                    count += 1
-            mean = float(count) / dataframe.shape[1]
-            if mean < FILTER_THRESHOLD:
-                keep.append(row_index)
-        return keep
-
-    def nochange_filter_columns():
-        """subfunction of nochange_filter to filter column-wise"""
-        keep = []
-        dmvalues = dataframe.values
-        for col_index in xrange(dataframe.shape[1]):
-            count = 0
-            for row_index in xrange(dataframe.shape[0]):
-                value = dmvalues[row_index, col_index]
-                if np.isnan(value) or abs(value) <= COLUMN_THRESHOLD:
-                    count += 1
-            mean = float(count) / dataframe.shape[0]
-            if mean < FILTER_THRESHOLD:
-                keep.append(col_index)
-        return keep
-
-    rows_to_keep = nochange_filter_rows()
-    cols_to_keep = nochange_filter_columns()
-    colnames = list(map(lambda col: dataframe.columns[col], cols_to_keep))
-    rownames = list(map(lambda row: dataframe.index[row], rows_to_keep))
-    numrows = len(rows_to_keep)
-    numcols = len(cols_to_keep)
-
-    rvalues = np.zeros((numrows, numcols))
-    mvalues = dataframe.values
-    for row_index in xrange(numrows):
-        for col_index in xrange(numcols):
-            value = mvalues[rows_to_keep[row_index], cols_to_keep[col_index]]
-            rvalues[row_index, col_index] = value
-    result = pandas.DataFrame(rvalues, rownames, colnames)
-    return result
+    # fraction of missing or small values in each row/column
+    row_nochange = np.mean(is_nan | (abs_values <= ROW_THRESHOLD), axis=1)
+    col_nochange = np.mean(is_nan | (abs_values <= COLUMN_THRESHOLD), axis=0)
+    rows_to_keep = np.where(row_nochange < FILTER_THRESHOLD)[0]
+    cols_to_keep = np.where(col_nochange < FILTER_THRESHOLD)[0]
+
+    return pandas.DataFrame(values[np.ix_(rows_to_keep, cols_to_keep)],
+                            list(dataframe.index[rows_to_keep]),
+                            list(dataframe.columns[cols_to_keep]))
 
 
 def row_filter(dataframe, fun):
@@ -347,38 +328,107 @@ def row_filter(dataframe, fun):
 
 def center_scale_filter(dataframe):
     """center the values of each row around their median and scale
-    by their standard deviation"""
-
-    def center_scale(row):
-        """centers the provided row around the median"""
-        filtered = row[np.isfinite(row)]
-        center = scipy.median(filtered)
-        scale = util.r_stddev(filtered)
-        nurow = [((value - center) / scale)
-                 if not np.isnan(value) else value for value in row]
-        return nurow
-
-    return row_filter(dataframe, center_scale)
-
-
-def create_from_csv(csvpath, filters=[], sep='\t', quotechar='"', case_sensitive=True):
-    """creates and returns an initialized, filtered DataMatrix instance"""
+    by their standard deviation. Non-finite values are ignored when
+    computing median and standard deviation, the standard deviation
+    matches util.r_stddev()"""
+    values = dataframe.values.astype('float64')
+    finite = np.where(np.isfinite(values), values, np.nan)
+    num_values = np.sum(np.isfinite(values), axis=1)
+    with np.errstate(invalid='ignore', divide='ignore'), warnings.catch_warnings():
+        # rows without finite values result in NaN rows
+        warnings.simplefilter('ignore', RuntimeWarning)
+        center = np.nanmedian(finite, axis=1)
+        scale = np.round(np.nanstd(finite, axis=1) /
+                         np.sqrt((num_values - 1.0) / num_values), 8)
+        result = (values - center[:, np.newaxis]) / scale[:, np.newaxis]
+    return pandas.DataFrame(result, dataframe.index, dataframe.columns)
+
+
+def create_from_csv(csvpath, filters=[], sep='\t', quotechar='"', case_sensitive=True,
+                    cache_dir=None, dtype=np.float64):
+    """creates and returns an initialized, filtered DataMatrix instance.
+    If cache_dir is specified, the filtered matrix is stored in a binary
+    ratios cache and subsequent calls with the same input file and
+    settings memory-map the cached matrix instead of parsing the file"""
     if csvpath.startswith('http://'):
         raise Exception('reading from URL temporarily disabled')
-
-    if os.path.exists(csvpath):
-        df = pandas.read_csv(csvpath, index_col=0, sep=sep, quotechar=quotechar)
-        df.index = map(str, df.index)
-    else:
+    if not os.path.exists(csvpath):
         raise Exception("File '%s' does not exist" % csvpath)
+
+    if cache_dir is not None:
+        cache_path = ratios_cache_path(cache_dir, csvpath, filters, case_sensitive, dtype)
+        if os.path.exists(cache_path):
+            start_time = util.current_millis()
+            result = read_binary_file(cache_path)
+            elapsed = util.current_millis() - start_time
+            logging.debug("mapped cached ratios '%s' in %f s.", cache_path, elapsed / 1000.0)
+            return result
+
+    df = pandas.read_csv(csvpath, index_col=0, sep=sep, quotechar=quotechar)
+    df.index = map(str, df.index)
     for matrix_filter in filters:
         df = matrix_filter(df)
     if not case_sensitive:
         df.index = df.index.str.upper()
     df = df.sort_index()
     # for now, we will make a DataMatrix object from the data frame for compatibility
-    return DataMatrix(df.shape[0], df.shape[1], list(df.index), list(df.columns),
-                      values=df.values)
+    result = DataMatrix(df.shape[0], df.shape[1], list(df.index), list(df.columns),
+                        values=df.to_numpy(dtype=dtype), dtype=dtype, copy=False)
+    if cache_dir is not None:
+        write_binary_file(result, cache_path)
+        # continue with the mapped version, so the parsed values can be freed
+        result = read_binary_file(cache_path)
+    return result
+
+
+RATIOS_CACHE_VERSION = 1
+
+
+def ratios_cache_path(cache_dir, csvpath, filters, case_sensitive, dtype):
+    """returns the path of the binary cache file for the ratios matrix in
+    csvpath. The name is derived from the input file's path, size and
+    modification time and the settings used to read it"""
+    stat = os.stat(csvpath)
+    key = repr((RATIOS_CACHE_VERSION, os.path.abspath(csvpath), stat.st_size, stat.st_mtime,
+                [matrix_filter.__name__ for matrix_filter in filters],
+                bool(case_sensitive), np.dtype(dtype).name))
+    return os.path.join(cache_dir, 'ratios',
+                        '%s.npy' % hashlib.sha1(key.encode('utf-8')).hexdigest())
+
+
+def binary_names_path(path):
+    """the row and column names of a binary matrix file are stored next to it"""
+    return path + '.names.json'
+
+
+def write_binary_file(matrix, path):
+    """writes the matrix values to path in .npy format and the row and column
+    names to a JSON file next to it. The files are written under temporary
+    names and renamed, so concurrent runs never see a partial matrix"""
+    dirname = os.path.dirname(path)
+    if dirname and not os.path.exists(dirname):
+        os.makedirs(dirname)
+    names_path = binary_names_path(path)
+    tmp_path = '%s.%d.tmp' % (path, os.getpid())
+    tmp_names_path = '%s.%d.tmp' % (names_path, os.getpid())
+    with open(tmp_path, 'wb') as outfile:
+        np.save(outfile, np.ascontiguousarray(matrix.values))
+    with open(tmp_names_path, 'w') as outfile:
+        json.dump({'rows': list(matrix.row_names), 'columns': list(matrix.column_names)},
+                  outfile)
+    os.rename(tmp_names_path, names_path)
+    os.rename(tmp_path, path)
+
+
+def read_binary_file(path, mmap=True):
+    """reads a matrix that was written with write_binary_file(). By default,
+    the values are memory-mapped read-only, so processes that read the same
+    file share its pages"""
+    with open(binary_names_path(path)) as infile:
+        names = json.load(infile)
+    values = np.load(path, mmap_mode='r' if mmap else None)
+    return DataMatrix(values.shape[0], values.shape[1], names['rows'], names['columns'],
+                      values=values, dtype=values.dtype, copy=False)
 
 
 def quantile_normalize_scores(matrices, weights=None):
@@ -484,4 +534,5 @@ def split_matrix(matrix, outdir, n, kmin, kmax):
         m.write_tsv_file(path)
 
 
-__all__ = ['DataMatrix', 'nochange_filter', 'center_scale_filter']
+__all__ = ['DataMatrix', 'nochange_filter', 'center_scale_filter', 'create_from_csv',
+           'write_binary_file', 'read_binary_file']
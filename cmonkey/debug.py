@@ -1,5 +1,6 @@
 import re
 import os
+from collections import defaultdict
 import cmonkey.database as cm2db
 from sqlalchemy import and_
 
@@ -34,6 +35,31 @@ def meme_to_str(outdir, iteration, cluster):
     return ''.join(lines)
 
 
+def cluster_member_names(session, member_class, name_class, iteration):
+    """returns a dictionary cluster -> [member names] of all clusters in the
+    iteration, retrieved with a single joined query"""
+    result = defaultdict(list)
+    query = session.query(member_class.cluster, name_class.name).join(
+        name_class, member_class.order_num == name_class.order_num).filter(
+            member_class.iteration == iteration).order_by(member_class.cluster, member_class.rowid)
+    for cluster, name in query:
+        result[cluster].append(name)
+    return result
+
+
+def iteration_score(session, category, name, iteration, default_value=1.0):
+    """returns the score of the specified iteration statistic or default_value
+    if it does not exist"""
+    score = session.query(cm2db.IterationStat.score).join(
+        cm2db.IterationStat.statstype_obj
+        ).filter(and_(cm2db.StatsType.category == category,
+                      cm2db.StatsType.name == name,
+                      cm2db.IterationStat.iteration == iteration)).first()
+    if score is None or score[0] is None:
+        return default_value
+    return score[0]
+
+
 def write_iteration(session, outfile, iteration, num_clusters, outdir, as_binary=True):
     """writes the iteration into a debug file"""
     HEADER = '"cols"\t"dens_string"\t"k"\t"meanp_meme"\t"meme_out"\t"resid"\t"rows"\n'
@@ -42,39 +68,25 @@ def write_iteration(session, outfile, iteration, num_clusters, outdir, as_binary
     else:
         outfile.write(HEADER)
 
+    colnames = cluster_member_names(session, cm2db.ColumnMember, cm2db.ColumnName, iteration)
+    rownames = cluster_member_names(session, cm2db.RowMember, cm2db.RowName, iteration)
+    residuals = {cluster: resid for cluster, resid in session.query(
+        cm2db.ClusterStat.cluster, cm2db.ClusterStat.residual).filter(
+            cm2db.ClusterStat.iteration == iteration)}
+
+    # these are the same for all clusters
+    string_dens = iteration_score(session, 'network', 'STRING', iteration)
+    meme_pval = iteration_score(session, 'seqtype', 'upstream', iteration)
+    last_meme_iteration = get_last_meme_iteration(outdir)
+
     for cluster in range(1, num_clusters + 1):
-        colnames = [colmemb.column_name.name
-                    for colmemb in session.query(cm2db.ColumnMember).filter(and_(cm2db.ColumnMember.cluster == cluster,
-                                                                                 cm2db.ColumnMember.iteration == iteration))]
-        cols_out = ','.join(colnames)
-
-        rownames = [rowmemb.row_name.name
-                    for rowmemb in session.query(cm2db.RowMember).filter(and_(cm2db.RowMember.cluster == cluster,
-                                                                              cm2db.RowMember.iteration == iteration))]
-        rows_out = ','.join(rownames)
-
-        string_dens = session.query(cm2db.IterationStat).join(
-            cm2db.IterationStat.statstype_obj
-            ).filter(and_(cm2db.StatsType.category == 'network',
-                          cm2db.StatsType.name == 'STRING',
-                          cm2db.IterationStat.iteration == iteration)).one().score
-        if string_dens is None:
-            string_dens = 1.0
-        try:
-            meme_pval = session.query(cm2db.IterationStat).join(
-                cm2db.IterationStat.statstype_obj
-                ).filter(and_(cm2db.StatsType.category == 'seqtype',
-                              cm2db.StatsType.name == 'upstream',
-                              cm2db.IterationStat.iteration == iteration)).one().score
-        except:
-            # no value found, set meme_pval to 1.0
-            meme_pval = 1.0
-
-        last_meme_iteration = get_last_meme_iteration(outdir)
-        meme_out = meme_to_str(outdir, last_meme_iteration, cluster)
-
-        resid = session.query(cm2db.ClusterStat).filter(and_(cm2db.ClusterStat.cluster == cluster,
-                                                             cm2db.ClusterStat.iteration == iteration)).one().residual
+        cols_out = ','.join(colnames[cluster])
+        rows_out = ','.join(rownames[cluster])
+        if last_meme_iteration is not None:
+            meme_out = meme_to_str(outdir, last_meme_iteration, cluster)
+        else:
+            meme_out = ''
+        resid = residuals.get(cluster)
         if resid is None:
             resid = 1.0
 
@@ -0,0 +1,300 @@
+# vi: sw=4 ts=4 et:
+"""instrumentation.py - timing and memory usage of the pipeline stages
+
+The stages of an iteration are wrapped in named spans:
+
+    with instrumentation.span('fuzzify'):
+        ...
+
+A span adds its duration to the process-wide span table. At the end of
+every iteration, the table is written to the run's metrics table
+(metrics.csv in the output directory) and reset, so the table contains
+the number of calls and the total time of each stage per iteration.
+
+Functions that run in a worker pool record their spans in the worker
+process. Wrapping them in Instrumented makes them return these spans
+together with their result, merge_results() adds them to the table
+of the main process.
+
+With memory sampling turned on, the end of a span also samples the
+resident set size of the process, and, if tracemalloc is tracing,
+the memory that was allocated and not released within the span. These
+samples, the sizes of the result matrices (see record_nbytes()) and
+the top allocation sites are stored as gauges, which keep the maximum
+value per iteration, and go into the same metrics table as the spans.
+Reading the resident set size is a single read of /proc/<pid>/statm,
+so sampling is cheap enough to keep on for long runs. tracemalloc
+slows down allocations considerably and should only be turned on
+for selected iterations.
+
+This file is part of cMonkey Python. Please see README and LICENSE for
+more information and licensing details.
+"""
+import os
+import time
+import threading
+import contextlib
+import multiprocessing as mp
+
+# tracemalloc does not exist in Python 2, allocations are not traced there
+try:
+    import tracemalloc
+except ImportError:
+    tracemalloc = None
+
+# the resource module does not exist on Windows
+try:
+    import resource
+except ImportError:
+    resource = None
+
+# Python2/Python3 compatibility
+try:
+    timer = time.perf_counter
+except AttributeError:
+    timer = time.time
+
+
+METRICS_FILE = 'metrics.csv'
+METRICS_HEADER = 'iteration,stage,metric,value'
+MEGABYTE = 1024.0 * 1024.0
+NUM_TOP_ALLOCATIONS = 10
+
+try:
+    PAGE_SIZE = os.sysconf('SC_PAGE_SIZE')
+except (AttributeError, ValueError, OSError):
+    PAGE_SIZE = 4096
+
+# set by enable_memory_sampling()
+MEMORY_SAMPLING = False
+
+
+class SpanTable:
+    """the number of calls and the total time of named spans. Spans can
+    be added from several threads, e.g. the result writer thread"""
+
+    def __init__(self):
+        self.__lock = threading.Lock()
+        self.__spans = {}
+        self.__gauges = {}
+
+    def add(self, name, seconds, calls=1):
+        with self.__lock:
+            entry = self.__spans.setdefault(name, [0, 0.0])
+            entry[0] += calls
+            entry[1] += seconds
+
+    def merge(self, spans):
+        """adds the spans of a dictionary name -> (calls, seconds)"""
+        for name, (calls, seconds) in spans.items():
+            self.add(name, seconds, calls)
+
+    def take(self):
+        """returns the recorded spans as a dictionary name -> [calls, seconds]
+        and resets the table"""
+        with self.__lock:
+            result = self.__spans
+            self.__spans = {}
+        return result
+
+    def gauge(self, name, metric, value):
+        """records a sample of a metric, the maximum value is kept"""
+        if value is None:
+            return
+        with self.__lock:
+            entry = self.__gauges.setdefault(name, {})
+            entry[metric] = max(entry.get(metric, value), value)
+
+    def take_gauges(self):
+        """returns the recorded gauges as a dictionary name -> {metric: value}
+        and resets them"""
+        with self.__lock:
+            result = self.__gauges
+            self.__gauges = {}
+        return result
+
+
+SPANS = SpanTable()
+
+
+def enable_memory_sampling(enabled=True):
+    global MEMORY_SAMPLING
+    MEMORY_SAMPLING = enabled
+
+
+def process_rss(pid='self'):
+    """the resident set size of a process in bytes, None if it can't be
+    determined, e.g. on systems without a /proc file system"""
+    try:
+        with open('/proc/%s/statm' % str(pid)) as infile:
+            return int(infile.read().split()[1]) * PAGE_SIZE
+    except (IOError, OSError, ValueError, IndexError):
+        return None
+
+
+def workers_rss():
+    """the total resident set size of the running worker processes in bytes"""
+    sizes = [process_rss(child.pid) for child in mp.active_children()]
+    return sum(size for size in sizes if size is not None)
+
+
+def peak_worker_rss():
+    """the peak resident set size of the largest finished worker process
+    in bytes, None if it can't be determined"""
+    if resource is None:
+        return None
+    maxrss = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    # ru_maxrss is in kilobytes on Linux and in bytes on Mac OS X
+    return maxrss if os.uname()[0] == 'Darwin' else maxrss * 1024
+
+
+def sample_memory(name):
+    """records the resident set sizes of the process and its workers"""
+    SPANS.gauge(name, 'rss_mb', megabytes(process_rss()))
+    SPANS.gauge(name, 'workers_rss_mb', megabytes(workers_rss()))
+    SPANS.gauge(name, 'peak_worker_rss_mb', megabytes(peak_worker_rss()))
+
+
+def megabytes(num_bytes):
+    return None if num_bytes is None else num_bytes / MEGABYTE
+
+
+def record_nbytes(name, obj):
+    """records the size of the buffers of obj, which implements the nbytes
+    protocol, i.e. has an nbytes attribute like numpy arrays and DataMatrix"""
+    if MEMORY_SAMPLING and obj is not None:
+        SPANS.gauge(name, 'nbytes_mb', megabytes(obj.nbytes))
+
+
+@contextlib.contextmanager
+def span(name):
+    """records the duration of the enclosed block under name"""
+    if MEMORY_SAMPLING and tracemalloc is not None and tracemalloc.is_tracing():
+        traced_start = tracemalloc.get_traced_memory()[0]
+    else:
+        traced_start = None
+    start = timer()
+    try:
+        yield
+    finally:
+        SPANS.add(name, timer() - start)
+        if MEMORY_SAMPLING:
+            SPANS.gauge(name, 'rss_mb', megabytes(process_rss()))
+            if traced_start is not None and tracemalloc.is_tracing():
+                SPANS.gauge(name, 'traced_mb',
+                            megabytes(tracemalloc.get_traced_memory()[0] - traced_start))
+
+
+@contextlib.contextmanager
+def trace_allocations(num_top=NUM_TOP_ALLOCATIONS):
+    """traces the allocations of the enclosed block with tracemalloc. The
+    spans within the block record the memory they allocated, the top
+    allocation sites are recorded as gauges named alloc:<file>:<line>.
+    Without tracemalloc, the block just runs"""
+    if tracemalloc is None:
+        yield
+        return
+    tracemalloc.start()
+    try:
+        yield
+    finally:
+        snapshot = tracemalloc.take_snapshot()
+        SPANS.gauge('tracemalloc', 'peak_traced_mb',
+                    megabytes(tracemalloc.get_traced_memory()[1]))
+        tracemalloc.stop()
+        for stat in snapshot.statistics('lineno')[:num_top]:
+            frame = stat.traceback[0]
+            SPANS.gauge('alloc:%s:%d' % (os.path.basename(frame.filename), frame.lineno),
+                        'traced_mb', megabytes(stat.size))
+
+
+class Instrumented:
+    """Wraps a function that is run in a worker pool, so it returns a pair
+    (result, spans) of its result and the spans that were recorded while
+    it was running. Spans that the worker process inherited from its parent
+    are excluded"""
+
+    def __init__(self, fun):
+        self.fun = fun
+
+    def __call__(self, arg):
+        outer_spans = SPANS.take()
+        try:
+            result = self.fun(arg)
+        finally:
+            spans = SPANS.take()
+            SPANS.merge(outer_spans)
+        return result, spans
+
+
+def merge_results(results):
+    """merges the spans of the results of an Instrumented function and
+    returns the list of the results"""
+    for _, spans in results:
+        SPANS.merge(spans)
+    return [result for result, _ in results]
+
+
+def metric_rows(iteration, spans, gauges={}):
+    """the metrics table rows of the spans and gauges of an iteration"""
+    rows = []
+    for name in sorted(spans.keys()):
+        calls, seconds = spans[name]
+        rows.append((iteration, name, 'calls', calls))
+        rows.append((iteration, name, 'seconds', '%f' % seconds))
+    for name in sorted(gauges.keys()):
+        for metric in sorted(gauges[name].keys()):
+            rows.append((iteration, name, metric, '%f' % gauges[name][metric]))
+    return rows
+
+
+def read_metrics(path, metric):
+    """reads the values of a metric from a metrics table. Returns a
+    dictionary stage -> list of (iteration, value) pairs"""
+    result = {}
+    with open(path) as infile:
+        infile.readline()
+        for line in infile:
+            row = line.strip().split(',')
+            if len(row) == 4 and row[2] == metric:
+                result.setdefault(row[1], []).append((int(row[0]), float(row[3])))
+    return result
+
+
+@contextlib.contextmanager
+def profiled(cpu_profile_path=None, trace_memory=False):
+    """runs the enclosed block under cpu_profile() if cpu_profile_path is
+    given and under trace_allocations() if trace_memory is True"""
+    if cpu_profile_path is not None:
+        with cpu_profile(cpu_profile_path):
+            if trace_memory:
+                with trace_allocations():
+                    yield
+            else:
+                yield
+    elif trace_memory:
+        with trace_allocations():
+            yield
+    else:
+        yield
+
+
+@contextlib.contextmanager
+def cpu_profile(path):
+    """profiles the enclosed block with cProfile and writes the statistics
+    to path, they can be inspected with the pstats module or snakeviz.
+    Work that is done in worker processes is not included"""
+    import cProfile
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        profiler.dump_stats(path)
+
+
+__all__ = ['SpanTable', 'SPANS', 'span', 'Instrumented', 'merge_results', 'metric_rows',
+           'read_metrics', 'cpu_profile', 'METRICS_FILE', 'METRICS_HEADER',
+           'enable_memory_sampling', 'process_rss', 'workers_rss', 'peak_worker_rss',
+           'sample_memory', 'record_nbytes', 'trace_allocations', 'profiled']
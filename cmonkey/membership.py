@@ -11,11 +11,12 @@ import random
 import logging
 import sys
 import numpy as np
-import rpy2.robjects as robjects
 from sqlalchemy import func
 
 import cmonkey.datamatrix as dm
 import cmonkey.util as util
+import cmonkey.database as cm2db
+import cmonkey.instrumentation as instrumentation
 
 # Python2/Python3 compatibility
 try:
@@ -120,6 +121,11 @@ class OrigMembership:
                 outfile.write('\t'.join(map(str, row)))
                 outfile.write('\n')
 
+    @property
+    def nbytes(self):
+        """the size of the membership tables in bytes"""
+        return self.row_membs.nbytes + self.col_membs.nbytes
+
     def num_clusters(self):
         """returns the number of clusters"""
         return self.__config_params[KEY_NUM_CLUSTERS]
@@ -256,9 +262,10 @@ class OrigMembership:
                num_iterations, iteration_result):
         """top-level update method"""
         start = util.current_millis()
-        row_scores, column_scores = fuzzify(self, row_scores, column_scores,
-                                            num_iterations, iteration_result,
-                                            self.__config_params['add_fuzz'])
+        with instrumentation.span('fuzzify'):
+            row_scores, column_scores = fuzzify(self, row_scores, column_scores,
+                                                num_iterations, iteration_result,
+                                                self.__config_params['add_fuzz'])
         elapsed = util.current_millis() - start
         logging.debug("fuzzify took %f s.", elapsed / 1000.0)
 
@@ -271,23 +278,27 @@ class OrigMembership:
                 pickle.dump(row_scores, outfile)
 
         start = util.current_millis()
-        rd_scores, cd_scores = get_density_scores(self, row_scores,
-                                                  column_scores)
+        with instrumentation.span('density'):
+            rd_scores, cd_scores = get_density_scores(self, row_scores,
+                                                      column_scores)
         elapsed = util.current_millis() - start
         logging.debug("GET_DENSITY_SCORES() took %f s.", elapsed / 1000.0)
 
         start = util.current_millis()
-        compensate_size(self, matrix, rd_scores, cd_scores)
+        with instrumentation.span('compensate_size'):
+            compensate_size(self, matrix, rd_scores, cd_scores)
         elapsed = util.current_millis() - start
         logging.debug("COMPENSATE_SIZE() took %f s.", elapsed / 1000.0)
 
         start_time = util.current_millis()
-        update_for_rows(self, rd_scores, self.__config_params['multiprocessing'])
+        with instrumentation.span('update_rows'):
+            update_for_rows(self, rd_scores, self.__config_params['multiprocessing'])
         elapsed = util.current_millis() - start_time
         logging.debug("update_for rdscores finished in %f s.", elapsed / 1000.0)
 
         start_time = util.current_millis()
-        update_for_cols(self, cd_scores, self.__config_params['multiprocessing'])
+        with instrumentation.span('update_columns'):
+            update_for_cols(self, cd_scores, self.__config_params['multiprocessing'])
         elapsed = util.current_millis() - start_time
         logging.debug("update_for cdscores finished in %f s.", elapsed / 1000.0)
 
@@ -659,6 +670,7 @@ def make_kmeans_row_seeder(num_clusters):
 
     def seed(row_membership, matrix):
         """uses k-means seeding to seed row membership"""
+        import rpy2.robjects as robjects
         flat_values = matrix.values.flatten()
         flat_values[np.isnan(flat_values)] = 0.0
         flat_values[np.isinf(flat_values)] = 0.0
@@ -776,6 +788,62 @@ def make_db_column_seeder(session):
         return result
     return seed
 
+def make_name_mapper(names):
+    """returns a function that maps a stored name to its index in names.
+    Like the database seeders, we fall back to upper/lower case names to
+    deal with name mismatches on resume"""
+    name_map = {name: idx for idx, name in enumerate(names)}
+
+    def index_for(name):
+        if name in name_map:
+            return name_map[name]
+        elif name.upper() in name_map:
+            return name_map[name.upper()]
+        elif name.lower() in name_map:
+            return name_map[name.lower()]
+        return None
+    return index_for
+
+
+def make_snapshot_row_seeder(store, iteration):
+    """seed the row memberships from a membership_store snapshot"""
+    def seed(row_membership, matrix):
+        snapshot = store.read(iteration)
+        index_for = make_name_mapper(matrix.row_names)
+        for row, row_name in enumerate(snapshot.row_names):
+            cur_map = index_for(row_name)
+            if cur_map is None:
+                continue
+            clusters = [int(cluster) for cluster in snapshot.row_membs[row] if cluster > 0]
+            for i, cluster in enumerate(clusters):
+                if i < len(row_membership[cur_map]):
+                    row_membership[cur_map][i] = cluster
+                else:   #A resumed job that has been finalized may have genes in additional clusters
+                    row_membership[cur_map].append(cluster)
+    return seed
+
+
+def make_snapshot_column_seeder(store, iteration):
+    """seed the column memberships from a membership_store snapshot"""
+    def seed(matrix, row_membership, num_clusters,
+             num_clusters_per_column):
+        snapshot = store.read(iteration)
+        index_for = make_name_mapper(matrix.column_names)
+        result = [[0] * num_clusters_per_column for col in matrix.column_names]
+        for col, col_name in enumerate(snapshot.col_names):
+            cur_map = index_for(col_name)
+            if cur_map is None:
+                continue
+            clusters = [int(cluster) for cluster in snapshot.col_membs[col] if cluster > 0]
+            for i, cluster in enumerate(clusters):
+                if i < len(result[cur_map]):
+                    result[cur_map][i] = cluster
+                elif not cluster in result[cur_map]:
+                    result[cur_map].append(cluster)
+        return result
+    return seed
+
+
 def fuzzify(membership, row_scores, column_scores, num_iterations, iteration_result,
             add_fuzz):
     """Provide an iteration-specific fuzzification"""
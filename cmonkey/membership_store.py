@@ -0,0 +1,118 @@
+# vi: sw=4 ts=4 et:
+"""membership_store.py - columnar per-iteration membership snapshots
+
+Storing memberships as one database row per (iteration, cluster, member)
+makes the result database grow quickly and readers have to reassemble the
+membership matrices. The MembershipStore keeps the row_membs/col_membs
+matrices of OrigMembership as compressed arrays, one .npz file per
+iteration in the output directory, so writing a snapshot is a single array
+write and loading it for resume a single array read.
+
+This module only depends on numpy, so it can be used by the viewer and the
+tools without pulling in the rest of cMonkey.
+
+This file is part of cMonkey Python. Please see README and LICENSE for
+more information and licensing details.
+"""
+import os
+import re
+import collections
+import numpy as np
+
+
+FILENAME_PATTERN = 'memberships-%04d.npz'
+FILENAME_REGEX = re.compile('memberships-(\\d+)\\.npz$')
+
+MembershipArrays = collections.namedtuple('MembershipArrays',
+                                          ['row_names', 'col_names', 'row_membs', 'col_membs'])
+
+
+def compact_dtype(num_clusters):
+    """cluster numbers usually fit into 16 bits"""
+    return np.int16 if num_clusters <= np.iinfo(np.int16).max else np.int32
+
+
+class MembershipStore:
+    """Reads and writes membership snapshots in a directory"""
+
+    def __init__(self, dirpath):
+        self.dirpath = dirpath
+
+    def path_for(self, iteration):
+        return os.path.join(self.dirpath, FILENAME_PATTERN % iteration)
+
+    def write(self, iteration, row_names, col_names, row_membs, col_membs):
+        """write the membership matrices of an iteration. The file is written
+        under a temporary name and renamed, so a crash never leaves a
+        truncated snapshot behind"""
+        num_clusters = max(int(np.max(row_membs)) if row_membs.size > 0 else 0,
+                           int(np.max(col_membs)) if col_membs.size > 0 else 0)
+        dtype = compact_dtype(num_clusters)
+        path = self.path_for(iteration)
+        tmp_path = path + '.tmp'
+        # use a file object, otherwise numpy appends another .npz suffix
+        with open(tmp_path, 'wb') as outfile:
+            np.savez_compressed(outfile,
+                                row_names=np.array(row_names, dtype=str),
+                                col_names=np.array(col_names, dtype=str),
+                                row_membs=np.asarray(row_membs, dtype=dtype),
+                                col_membs=np.asarray(col_membs, dtype=dtype))
+        os.rename(tmp_path, path)
+
+    def write_membership(self, iteration, membership):
+        """write the membership of an object that provides the OrigMembership
+        matrices, e.g. OrigMembership or persistence.MembershipSnapshot"""
+        self.write(iteration, membership.row_names, membership.col_names,
+                   membership.row_membs, membership.col_membs)
+
+    def iterations(self):
+        """returns the sorted list of iterations that have a snapshot"""
+        if not os.path.isdir(self.dirpath):
+            return []
+        result = []
+        for name in os.listdir(self.dirpath):
+            m = FILENAME_REGEX.match(name)
+            if m:
+                result.append(int(m.group(1)))
+        return sorted(result)
+
+    def last_iteration(self):
+        """the last iteration that has a snapshot or None"""
+        iterations = self.iterations()
+        return iterations[-1] if len(iterations) > 0 else None
+
+    def has_iteration(self, iteration):
+        return iteration is not None and os.path.exists(self.path_for(iteration))
+
+    def remove_after(self, iteration):
+        """removes the snapshots of all iterations after the specified one"""
+        for snapshot_iteration in self.iterations():
+            if snapshot_iteration > iteration:
+                os.remove(self.path_for(snapshot_iteration))
+
+    def read(self, iteration):
+        """returns the MembershipArrays of the specified iteration"""
+        with np.load(self.path_for(iteration)) as data:
+            return MembershipArrays(data['row_names'].tolist(), data['col_names'].tolist(),
+                                    data['row_membs'].astype(np.int32),
+                                    data['col_membs'].astype(np.int32))
+
+    def cluster_members(self, iteration):
+        """returns two dictionaries cluster -> [row names] and
+        cluster -> [column names] for the specified iteration"""
+        arrays = self.read(iteration)
+        return (members_by_cluster(arrays.row_names, arrays.row_membs),
+                members_by_cluster(arrays.col_names, arrays.col_membs))
+
+
+def members_by_cluster(names, membs):
+    """group the names by the clusters in the membership matrix"""
+    result = collections.defaultdict(list)
+    rows, slots = np.nonzero(membs)
+    clusters = membs[rows, slots]
+    for index in np.lexsort((rows, clusters)):
+        result[int(clusters[index])].append(names[rows[index]])
+    return result
+
+
+__all__ = ['MembershipStore', 'MembershipArrays', 'members_by_cluster']
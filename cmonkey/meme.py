@@ -12,6 +12,7 @@ import logging
 import os
 import shutil
 import re
+import json
 import collections
 import xml.etree.ElementTree as ET
 from pkg_resources import Requirement, resource_filename, DistributionNotFound
@@ -19,6 +20,7 @@ from pkg_resources import Requirement, resource_filename, DistributionNotFound
 import cmonkey.seqtools as st
 import cmonkey.util as util
 import cmonkey.database as cm2db
+import cmonkey.instrumentation as instrumentation
 from sqlalchemy import func
 
 try:
@@ -26,10 +28,19 @@ try:
 except NameError:
     xrange = range
 
+# Python 2 has no shutil.which()
+try:
+    from shutil import which
+except ImportError:
+    from distutils.spawn import find_executable as which
+
 
 MemeRunResult = collections.namedtuple('MemeRunResult',
                                        ['pe_values', 'annotations', 'motif_infos'])
 
+# sequence -> masked sequence, shared by all MemeSuite instances of a run
+DUST_CACHE = {}
+
 
 class MemeSuite:
     """Regard the meme suite as a unit of tools. This helps
@@ -60,41 +71,15 @@ class MemeSuite:
         return self.__background_file
 
     def remove_low_complexity(self, seqs):
-        """send sequences through dust filter, send only those
-        to dust that are larger than max_width"""
-        def process_with_dust(seqs):
-            """data conversion from and to dust tool"""
-            dust_tmp_file = None
-            with tempfile.NamedTemporaryFile(mode='w+',
-                                             prefix='dust',
-                                             delete=False) as dust_input:
-                for feature_id, seq in seqs.items():
-                    dust_input.write(">%s\n" % feature_id)
-                    if isinstance(seq, str):
-                        dust_input.write("%s\n" % seq)
-                    else:
-                        dust_input.write("%s\n" % seq)
-                dust_tmp_file = dust_input.name
-                #logging.info("DUST input written to: %s", dust_input.name)
-            seqpairs = st.read_sequences_from_fasta_string(
-                self.dust(dust_tmp_file))
-            os.remove(dust_tmp_file)
-            return {feature_id: seq for feature_id, seq in seqpairs}
-
-        seqs_for_dust = {}
+        """mask the low-complexity regions of the sequences with dust, only
+        the sequences that are larger than max_width are kept"""
+        result = {}
         for feature_id, seq in seqs.items():
-            if isinstance(seq, str):
-                if len(seq) > self.max_width:
-                    seqs_for_dust[feature_id] = seq
-            else:
-                if len(seq[1]) > self.max_width:
-                    seqs_for_dust[feature_id] = seq[1]
-        # only non-empty-input gets into dust, dust can not
-        # handle empty input
-        if len(seqs_for_dust) > 0:
-            return process_with_dust(seqs_for_dust)
-        else:
-            return {}
+            if not isinstance(seq, str):
+                seq = seq[1]
+            if len(seq) > self.max_width:
+                result[feature_id] = self.dust(seq)
+        return result
 
     def __call__(self, params):
         """Runs the meme tool. input_seqs is a dictionary of
@@ -129,8 +114,9 @@ class MemeSuite:
                 [(feature_id, input_seqs[feature_id])
                  for feature_id in params.feature_ids if feature_id in input_seqs])
             #logging.info("created sequence file in %s", seqfile)
-            motif_infos, output = self.meme(seqfile, bgfile, params.num_motifs,
-                                            previous_motif_infos=params.previous_motif_infos)
+            with instrumentation.span('meme'):
+                motif_infos, output = self.meme(seqfile, bgfile, params.num_motifs,
+                                                previous_motif_infos=params.previous_motif_infos)
 
             # run mast
             meme_outfile = None
@@ -157,7 +143,8 @@ class MemeSuite:
             return MemeRunResult([], [], [])
 
         try:
-            mast_output = self.mast(meme_outfile, dbfile, bgfile)
+            with instrumentation.span('mast'):
+                mast_output = self.mast(meme_outfile, dbfile, bgfile)
             # There is a bug in MAST, catch that here to report to MEME team
             # when it is fixed, we could remove it
             if mast_output is None:
@@ -221,12 +208,13 @@ class MemeSuite:
             st.write_sequences_to_fasta_file(outfile, seqs)
         return filename
 
-    def dust(self, fasta_file_path):  # pylint: disable-msg=R0201
-        """runs the dust command on the specified FASTA file and
-        returns a list of sequences. It is assumed that dust has
-        a very simple interface: FASTA in, output on stdout"""
-        output = subprocess.check_output(['dust', fasta_file_path])
-        return output.decode('utf-8')
+    def dust(self, seq):  # pylint: disable-msg=R0201
+        """returns the sequence with its low-complexity regions masked.
+        The same upstream sequences are masked for every cluster in every
+        motif iteration, so the results are kept for the whole run"""
+        if seq not in DUST_CACHE:
+            DUST_CACHE[seq] = st.dust(seq)
+        return DUST_CACHE[seq]
 
     # pylint: disable-msg=W0613,R0201
     def meme(self, infile_path, bgfile_path, num_motifs,
@@ -769,13 +757,16 @@ def make_background_file(bgseqs, use_revcomp, bgorder):
         This means only taking the unique sequences and their reverse
         complement if desired"""
         meme_input_seqs = []
+        seen = set()
         for locseq in seqs.values():
             seq = locseq[1]
-            if seq not in meme_input_seqs:
+            if seq not in seen:
+                seen.add(seq)
                 meme_input_seqs.append(seq)
             if use_revcomp:
                 revseq = st.revcomp(seq)
-                if revseq not in meme_input_seqs:
+                if revseq not in seen:
+                    seen.add(revseq)
                     meme_input_seqs.append(revseq)
         return meme_input_seqs
 
@@ -806,23 +797,73 @@ def global_background_file(organism, gene_aliases, seqtype, bgorder=3,
 
 
 USER_TEST_FASTA_PATH = 'cmonkey/default_config/fasta_test.fa'
+MEME_VERSION_FILE = 'meme_version.json'
 
-def check_meme_version():
-    logging.info('checking MEME...')
+
+def __meme_version_from_run(meme_path):
+    """determines the MEME version from the output of a MEME run, for
+    versions that do not support the -version option"""
     try:
         test_fasta = resource_filename(Requirement.parse("cmonkey2"), USER_TEST_FASTA_PATH)
     except DistributionNotFound:
         test_fasta = USER_TEST_FASTA_PATH
 
+    command = [meme_path, '-nostatus', '-text', test_fasta]
+    output = subprocess.check_output(command).decode('utf-8').split('\n')
+    for line in output:
+        if line.startswith('MEME version'):
+            return line.split(' ')[2]
+    return None
+
+
+def __meme_version(meme_path):
+    """runs meme -version and falls back to running MEME on a test file"""
     try:
-        command = ['meme', '-nostatus', '-text', test_fasta]
-        output = subprocess.check_output(command).decode('utf-8').split('\n')
-        for line in output:
-            if line.startswith('MEME version'):
-                return line.split(' ')[2]
-    except OSError:
+        output = subprocess.check_output([meme_path, '-version'],
+                                         stderr=subprocess.STDOUT).decode('utf-8').strip()
+        if re.match(r'^\d+(\.\d+)+$', output):
+            return output
+    except subprocess.CalledProcessError:
+        pass
+    return __meme_version_from_run(meme_path)
+
+
+def check_meme_version(cache_dir=None):
+    """returns the version of the meme binary in the PATH or None if it is
+    not installed. If cache_dir is specified, the version is stored there
+    for the path and modification time of the binary, so it only needs to
+    be determined once"""
+    logging.info('checking MEME...')
+    meme_path = which('meme')
+    if meme_path is None:
         logging.error("MEME does not exist in your PATH, please either install or check your PATH variable")
         return None
+    meme_path = os.path.realpath(meme_path)
+    mtime = os.path.getmtime(meme_path)
+
+    versions = {}
+    cache_path = os.path.join(cache_dir, MEME_VERSION_FILE) if cache_dir else None
+    if cache_path is not None and os.path.exists(cache_path):
+        try:
+            with open(cache_path) as infile:
+                versions = json.load(infile)
+        except ValueError:
+            logging.warn("ignoring invalid MEME version cache '%s'", cache_path)
+    if meme_path in versions and versions[meme_path]['mtime'] == mtime:
+        return versions[meme_path]['version']
+
+    try:
+        version = __meme_version(meme_path)
+    except (OSError, subprocess.CalledProcessError):
+        logging.error("MEME at '%s' could not be run", meme_path)
+        return None
+    if version is not None and cache_path is not None:
+        if not os.path.exists(cache_dir):
+            os.makedirs(cache_dir)
+        versions[meme_path] = {'mtime': mtime, 'version': version}
+        with open(cache_path, 'w') as outfile:
+            json.dump(versions, outfile)
+    return version
 
 ######################################################################
 ### Export
@@ -206,15 +206,23 @@ def __get_predictions(microbes_online, organism):
     return preds
 
 
-def get_network_factory(microbes_online, max_operon_size, weight):
-    """function to create a network factory method"""
+def get_operons(microbes_online, organism):
+    """returns the operons predicted for an organism by Microbes Online"""
+    operons, _ = __make_operons_from_predictions(
+        __get_predictions(microbes_online, organism), organism)
+    return operons
+
+
+def get_network_factory(microbes_online, max_operon_size, weight, operons=None):
+    """function to create a network factory method. If operons is
+    specified, they are used instead of retrieving the predictions from
+    Microbes Online"""
 
     def get_operon_edges(microbes_online, organism):
         """gets network edges"""
-        operons, _ = __make_operons_from_predictions(
-            __get_predictions(microbes_online, organism), organism)
         edges = []
-        for operon in operons:
+        for operon in (operons if operons is not None
+                       else get_operons(microbes_online, organism)):
             if len(operon) <= max_operon_size:
                 combs = util.kcombinations(operon, 2)
                 edges.extend([(comb[0], comb[1], 1000.0)
@@ -264,4 +272,4 @@ def mysql_synonyms(conn, taxonomy_id):
         row = cursor.fetchone()
 
 
-__all__ = ['MicrobesOnline', 'get_network_factory', 'get_operon_pairs']
+__all__ = ['MicrobesOnline', 'get_network_factory', 'get_operon_pairs', 'get_operons']
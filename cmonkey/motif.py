@@ -16,11 +16,12 @@ import subprocess
 
 import cmonkey.scoring as scoring
 import cmonkey.datamatrix as dm
-import cmonkey.weeder as weeder
 import cmonkey.meme as meme
 import cmonkey.seqtools as st
 import cmonkey.util as util
+import cmonkey.thesaurus as thesaurus
 import cmonkey.database as cm2db
+import cmonkey.instrumentation as instrumentation
 
 
 # Python2/Python3 compatibility
@@ -51,8 +52,10 @@ def unique_filter(seqs, feature_ids):
     """returns a map that contains only the keys that are in
     feature_ids and only contains unique sequences"""
     unique_seqs = {}
+    seen = set()
     for feature_id in feature_ids:
-        if feature_id in seqs and seqs[feature_id] not in unique_seqs.values():
+        if feature_id in seqs and seqs[feature_id] not in seen:
+            seen.add(seqs[feature_id])
             unique_seqs[feature_id] = seqs[feature_id]
     return unique_seqs
 
@@ -70,10 +73,9 @@ def get_remove_atgs_filter(distance):
     def remove_atgs_filter(seqs, feature_ids):
         """a filter removes the ATG's from the sequence, this
         just masks a window of 4 letters with N's"""
-        for feature_id in seqs:
-            chars = [c for c in seqs[feature_id]]
-            chars[distance[1]:distance[1] + 4] = "NNNN"
-            seqs[feature_id] = "".join(chars)
+        start = distance[1]
+        for feature_id, seq in seqs.items():
+            seqs[feature_id] = seq[:start] + 'NNNN' + seq[start + 4:]
         return seqs
     return remove_atgs_filter
 
@@ -93,6 +95,7 @@ def compute_mean_score(pvalue_matrix, membership, organism):
 # Readonly structure to avoid passing it to the forked child processes for efficiency.
 # non-serializable parameters go here, too
 SEQUENCE_FILTERS = None
+SEARCH_SEQS = None
 ORGANISM = None
 MEMBERSIP = None
 
@@ -186,6 +189,7 @@ class MotifScoringFunctionBase(scoring.ScoringFunctionBase):
                       util.current_millis() - start_time)
 
         self.__last_results = None  # caches the results of the previous meme run
+        self.__search_seqs = None  # search sequences of all genes, lazy loaded
 
     def run_logs(self):
         return [self.update_log, self.motif_log]
@@ -197,26 +201,34 @@ class MotifScoringFunctionBase(scoring.ScoringFunctionBase):
     def __build_reverse_map(self, ratios):
         """build a map that reconstructs the original row name from
         a feature id"""
-        def feature_id_for(gene):
-            """convenience method to return the feature id for a gene"""
-            feature_ids = self.organism.feature_ids_for([gene])
-            if len(feature_ids) > 0:
-                return feature_ids[0]
-            else:
-                return None
-
+        synonyms = thesaurus.as_thesaurus(self.organism.thesaurus())
         result = {}
         num_not_found = 0
-        for row_name in ratios.row_names:
-            feature_id = feature_id_for(row_name)
-            if feature_id is not None:
-                result[feature_id] = row_name
+        for row_name, gene_id in zip(ratios.row_names,
+                                     synonyms.resolve(ratios.row_names).tolist()):
+            if gene_id >= 0:
+                result[synonyms.names[gene_id]] = row_name
             else:
                 num_not_found += 1
         if num_not_found > 0:
             logging.warn("%d genes not found in synonyms.", num_not_found)
         return result
 
+    def search_seqs(self):
+        """returns the search sequences of all genes in the ratios matrix.
+        The clusters' sequences are taken from this table, and the low
+        complexity regions are masked once for all genes here, so the
+        filters of the clusters find them in the dust cache"""
+        if self.__search_seqs is None:
+            start_time = util.current_millis()
+            feature_ids = self.organism.feature_ids_for(sorted(self.ratios.row_names))
+            self.__search_seqs = self.organism.sequences_for_genes_search(
+                feature_ids, seqtype=self.seqtype)
+            self.meme_suite.remove_low_complexity(self.__search_seqs)
+            logging.debug("prepared and masked %d search sequences in %d ms.",
+                          len(self.__search_seqs), util.current_millis() - start_time)
+        return self.__search_seqs
+
     def compute(self, iteration_result, ref_matrix=None):
         """override base class compute() method, behavior is more complicated,
         since it nests Motif and MEME runs"""
@@ -234,6 +246,23 @@ class MotifScoringFunctionBase(scoring.ScoringFunctionBase):
     def last_cached(self):
         return self.last_result
 
+    def checkpoint_state(self):
+        """besides the last score matrix, we keep the MEME results, so a resumed
+        run can reuse the results of unchanged clusters and seed MEME with
+        the previous motifs"""
+        return {'cached_result': self.last_result,
+                'all_pvalues': self.all_pvalues,
+                'last_results': self.__last_results,
+                'last_motif_infos': self.__last_motif_infos,
+                'last_iteration_result': self.__last_iteration_result}
+
+    def restore_checkpoint_state(self, state):
+        self.last_result = state['cached_result']
+        self.all_pvalues = state['all_pvalues']
+        self.__last_results = state['last_results']
+        self.__last_motif_infos = state['last_motif_infos']
+        self.__last_iteration_result = state['last_iteration_result']
+
     def __compute(self, iteration_result, force, ref_matrix=None):
         """compute method for the specified iteration
         Note: will return None if not computed yet and the result of a previous
@@ -292,7 +321,7 @@ class MotifScoringFunctionBase(scoring.ScoringFunctionBase):
         (seqs, feature_ids, distance) -> seqs
         These filters are applied in the order they appear in the list.
         """
-        global SEQUENCE_FILTERS, ORGANISM, MEMBERSHIP
+        global SEQUENCE_FILTERS, SEARCH_SEQS, ORGANISM, MEMBERSHIP
 
         cluster_pvalues = {}
         min_cluster_rows_allowed = self.config_params['memb.min_cluster_rows_allowed']
@@ -302,17 +331,20 @@ class MotifScoringFunctionBase(scoring.ScoringFunctionBase):
         # extract the sequences for each cluster, slow
         start_time = util.current_millis()
         SEQUENCE_FILTERS = self.__sequence_filters
+        SEARCH_SEQS = self.search_seqs()
         ORGANISM = self.organism
         MEMBERSHIP = self.membership
 
         cluster_seqs_params = [(cluster, self.seqtype) for cluster in xrange(1, self.num_clusters() + 1)]
-        if use_multiprocessing:
-            with util.get_mp_pool(self.config_params) as pool:
-                seqs_list = pool.map(cluster_seqs, cluster_seqs_params)
-        else:
-            seqs_list = [cluster_seqs(p) for p in cluster_seqs_params]
+        with instrumentation.span('cluster_seqs'):
+            if use_multiprocessing:
+                with util.get_mp_pool(self.config_params) as pool:
+                    seqs_list = pool.map(cluster_seqs, cluster_seqs_params)
+            else:
+                seqs_list = [cluster_seqs(p) for p in cluster_seqs_params]
 
         SEQUENCE_FILTERS = None
+        SEARCH_SEQS = None
         ORGANISM = None
         MEMBERSHIP = None
         logging.debug("prepared sequences in %d ms.", util.current_millis() - start_time)
@@ -369,7 +401,9 @@ class MotifScoringFunctionBase(scoring.ScoringFunctionBase):
 
         if use_multiprocessing:
             with util.get_mp_pool(self.config_params) as pool:
-                results = pool.map(compute_cluster_score, params.values())
+                results = instrumentation.merge_results(
+                    pool.map(instrumentation.Instrumented(compute_cluster_score),
+                             params.values()))
                 results = {r[0]: r[1:] for r in results}  # indexed by cluster
 
                 for cluster in xrange(1, self.num_clusters() + 1):
@@ -405,12 +439,12 @@ class MotifScoringFunctionBase(scoring.ScoringFunctionBase):
 
 def cluster_seqs(params):
     """Retrieves the sequences for a cluster. Designed to run in in pool.map()"""
-    global SEQUENCE_FILTERS, ORGANISM, MEMBERSHIP
+    global SEQUENCE_FILTERS, SEARCH_SEQS, ORGANISM, MEMBERSHIP
     cluster, seqtype = params
     genes = sorted(MEMBERSHIP.rows_for_cluster(cluster))
     feature_ids = ORGANISM.feature_ids_for(genes)
-    seqs = ORGANISM.sequences_for_genes_search(
-        feature_ids, seqtype=seqtype)
+    seqs = {feature_id: SEARCH_SEQS[feature_id]
+            for feature_id in feature_ids if feature_id in SEARCH_SEQS}
     for sequence_filter in SEQUENCE_FILTERS:
         seqs = sequence_filter(seqs, feature_ids)
     if len(seqs) == 0:
@@ -526,6 +560,8 @@ class WeederRunner:
 
     def __call__(self, params):
         """call the runner like a function"""
+        # Weeder is only loaded in pipelines that use it
+        import cmonkey.weeder as weeder
         with tempfile.NamedTemporaryFile(prefix='weeder.fasta',
                                          delete=False) as outfile:
             filename = outfile.name
@@ -534,8 +570,9 @@ class WeederRunner:
 
         try:
             dbfile = None
-            meme_outfile, pssms = weeder.run_weeder(filename, params, self.config_params,
-                                                    self.meme_suite.bgmodel)
+            with instrumentation.span('weeder'):
+                meme_outfile, pssms = weeder.run_weeder(filename, params, self.config_params,
+                                                        self.meme_suite.bgmodel)
             if len(pssms) == 0:
                 logging.debug('no PSSMS generated, skipping cluster')
                 return meme.MemeRunResult([], {}, [])
@@ -554,8 +591,9 @@ class WeederRunner:
                                                       len(pssm.sites),
                                                       None, pssm.e_value,
                                                       pssm.sites))
-            mast_out = self.meme_suite.mast(meme_outfile, dbfile,
-                                            self.meme_suite.global_background_file())
+            with instrumentation.span('mast'):
+                mast_out = self.meme_suite.mast(meme_outfile, dbfile,
+                                                self.meme_suite.global_background_file())
             if 'keep_mastout' in self.config_params['debug']:
                 with open('%s.mast' % meme_outfile, 'w') as outfile:
                     outfile.write(mast_out)
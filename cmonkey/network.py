@@ -5,10 +5,12 @@ This file is part of cMonkey Python. Please see README and LICENSE for
 more information and licensing details.
 """
 import numpy as np
+import collections
 import logging
 import os.path
 
 import cmonkey.util as util
+import cmonkey.thesaurus as thesaurus
 import cmonkey.datamatrix as dm
 import cmonkey.scoring as scoring
 
@@ -54,25 +56,20 @@ class Network:
              Usage:
              self.validate(synonyms, genes)
         """
+        synonyms = thesaurus.as_thesaurus(synonyms)
+
         # remap first
-        new_edges = []
-        for n0, n1, score in self.edges:
-            n0 = synonyms[n0] if n0 in synonyms else n0
-            n1 = synonyms[n1] if n1 in synonyms else n1
-            new_edges.append((n0, n1, score))
-        self.edges = new_edges
+        nodes0 = synonyms.canonical_names([edge[0] for edge in self.edges])
+        nodes1 = synonyms.canonical_names([edge[1] for edge in self.edges])
+        self.edges = [(n0, n1, edge[2]) for n0, n1, edge in zip(nodes0, nodes1, self.edges)]
         self.__compute_edges_with_source()
 
-        # then validate
-        found = []
-        for g in genes:
-            primary = synonyms.get(g, g)
-            for n0, n1, score in self.edges:
-                if primary == n0 or primary == n1:
-                    found.append(primary)
-        if len(found) < len(genes) / 2:
-            print(edges)
-            raise(Exception("only %d genes found in edges" % len(found)))
+        # then validate: count the edges each gene is found in
+        num_edges = collections.Counter(nodes0)
+        num_edges.update([n1 for n0, n1 in zip(nodes0, nodes1) if n0 != n1])
+        num_found = sum([num_edges[primary] for primary in synonyms.canonical_names(genes)])
+        if num_found < len(genes) / 2:
+            raise(Exception("only %d genes found in edges" % num_found))
 
     def num_edges(self):
         """returns the number of edges in this graph"""
@@ -125,14 +122,15 @@ class Network:
         """
         num_nodes_orig = len(nodes)
         if organism:
-            thesaurus = organism.thesaurus()
-            nodes = {n for n in nodes if n in thesaurus}
+            synonyms = thesaurus.as_thesaurus(organism.thesaurus())
+            node_list = list(nodes)
+            node_ids = synonyms.resolve(node_list)
+            keep = node_ids >= 0
             if ratios:
-                cano_nodes = {thesaurus[n] for n in nodes}
-                cano_genes = {thesaurus[row] for row in ratios.row_names
-                              if row in thesaurus}
-                probes_in = [gene for gene in cano_genes if gene in cano_nodes]
-                nodes = {n for n in nodes if thesaurus[n] in probes_in}
+                # keep the nodes whose genes are in the ratios matrix
+                row_ids = synonyms.resolve(ratios.row_names)
+                keep &= np.isin(node_ids, row_ids[row_ids >= 0])
+            nodes = {n for n, keep_node in zip(node_list, keep.tolist()) if keep_node}
 
         logging.debug("# nodes in network '%s': %d (of %d)", name, len(nodes), num_nodes_orig)
 
@@ -220,6 +218,19 @@ class ScoringFunction(scoring.ScoringFunctionBase):
 
         return result
 
+    def checkpoint_state(self):
+        """the retrieved and validated networks are part of the state, so
+        resuming does not have to read and normalize them again"""
+        state = scoring.ScoringFunctionBase.checkpoint_state(self)
+        state['networks'] = self.__networks
+        state['score_means'] = getattr(self, 'score_means', {})
+        return state
+
+    def restore_checkpoint_state(self, state):
+        scoring.ScoringFunctionBase.restore_checkpoint_state(self, state)
+        self.__networks = state['networks']
+        self.score_means = state['score_means']
+
     def networks(self):
         """networks are cached"""
         if self.__networks is None:
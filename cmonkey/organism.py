@@ -15,9 +15,6 @@ import cmonkey.seqtools as st
 import cmonkey.microbes_online as mo
 import cmonkey.patches as patches
 
-# requires biopython
-from Bio import SeqIO
-
 
 class RsatSpeciesInfo:
     """RSAT description of the organism"""
@@ -63,6 +60,9 @@ class OrganismBase:
     """The organism base class contains functionality that is likely to
     be the same among Organism implementations"""
 
+    # the Thesaurus made from a thesaurus() dictionary, as a pair (dictionary, Thesaurus)
+    __converted_thesaurus = None
+
     def __init__(self, code, network_factories, ratios=None):
         """Initialize the base class instance"""
         self.code = code
@@ -80,11 +80,21 @@ class OrganismBase:
         """Returns a map containing the alias -> gene mappings"""
         raise Exception("please implement me")
 
+    def __interned_thesaurus(self):
+        """thesaurus() as a Thesaurus, a dictionary is only converted once"""
+        synonyms = self.thesaurus()
+        if isinstance(synonyms, thesaurus.Thesaurus):
+            return synonyms
+        if self.__converted_thesaurus is None or self.__converted_thesaurus[0] is not synonyms:
+            self.__converted_thesaurus = (synonyms, thesaurus.as_thesaurus(synonyms))
+        return self.__converted_thesaurus[1]
+
     def feature_ids_for(self, gene_aliases):
         """Helper method to retrieve a list of feature_ids for the
         specified alias list"""
-        synonyms = self.thesaurus()
-        return [synonyms[alias] for alias in gene_aliases if alias in synonyms]
+        synonyms = self.__interned_thesaurus()
+        return [synonyms.names[gene_id] for gene_id in synonyms.resolve(gene_aliases).tolist()
+                if gene_id >= 0]
 
 
 class DummyOrganism(OrganismBase):
@@ -94,7 +104,7 @@ class DummyOrganism(OrganismBase):
         OrganismBase.__init__(self, 0, [])
 
     def thesaurus(self):
-        return {}
+        return thesaurus.Thesaurus()
 
     def species(self):
         return "Dummy organism"
@@ -107,12 +117,13 @@ class RSATOrganism(OrganismBase):
     # pylint: disable-msg=R0913,R0902
     def __init__(self, code, kegg_organism, rsat_info, go_taxonomy_id,
                  network_factories, search_distances, scan_distances,
-                 ratios=None, synonyms=None, fasta_file=None):
+                 ratios=None, synonyms=None, fasta_file=None, features=None):
         """create an Organism instance"""
         # microbe-specific network factories need access to synonyms
         # and rsat info, so initialize them here before the base class
         # init
-        self.__synonyms = synonyms
+        self.__synonyms = thesaurus.as_thesaurus(synonyms) if synonyms else synonyms
+        self.__features = features
         self.__rsat_info = rsat_info
         OrganismBase.__init__(self, code, network_factories, ratios=ratios)
         self.kegg_organism = kegg_organism
@@ -156,9 +167,9 @@ class RSATOrganism(OrganismBase):
             self.thesaurus(),
             self.read_features(self.feature_ids_for(genes)))
 
-    def read_features(self, feature_ids):
-        """Returns a list containing the features for the specified feature
-        ids"""
+    def feature_table(self):
+        """reads all features from the RSAT features file. The features
+        are cached, because they are used many times"""
 
         def read_feature(line):
             """Creates and adds a feature and associated contig from current
@@ -176,13 +187,22 @@ class RSATOrganism(OrganismBase):
                                           int(line[5].lstrip('<>')),
                                           is_reverse))
 
-        features = {}
-        dfile = util.dfile_from_text(self.__rsat_info.get_features(), comment='--')
-        for line in dfile.lines:
-            feature_id = line[0]
-            if feature_id in feature_ids:
-                features[feature_id] = read_feature(line)
-        return features
+        if self.__features is None:
+            rows = util.dfile_rows(self.__rsat_info.get_features().split('\n'),
+                                   comment='--')
+            self.__features = {line[0]: read_feature(line) for line in rows}
+        return self.__features
+
+    def read_features(self, feature_ids):
+        """Returns a list containing the features for the specified feature
+        ids"""
+        feature_ids = set(feature_ids)
+        return {feature_id: feature for feature_id, feature in self.feature_table().items()
+                if feature_id in feature_ids}
+
+    def contig_sequence(self, contig):
+        """returns the sequence of the specified contig"""
+        return self.__rsat_info.get_contig_sequence(contig)
 
     def read_sequences(self, features, distance, extractor):
         """for each feature, extract and set its sequence"""
@@ -236,21 +256,22 @@ class Microbe(RSATOrganism):
                  go_taxonomy_id, microbes_online_db,
                  network_factories,
                  search_distances, scan_distances,
-                 use_operons=True, ratios=None, synonyms=None, fasta_file=None):
+                 use_operons=True, ratios=None, synonyms=None, fasta_file=None,
+                 features=None, operon_mappings=None):
         """create an Organism instance"""
         RSATOrganism.__init__(self, code, kegg_organism,
                               rsat_info, go_taxonomy_id, network_factories,
                               search_distances, scan_distances, ratios, synonyms,
-                              fasta_file)
+                              fasta_file, features)
         self.use_operons = use_operons
         self.__microbes_online_db = microbes_online_db
-        self.__operon_mappings = None  # lazy loaded
+        self.__operon_mappings = operon_mappings  # lazy loaded if None
 
     def operon_map(self):
         """Returns the operon map for this particular organism.
         Microbes Online works on VNG names, but RSAT is working on
         feature ids, so this function also maps VNG names to feature ids"""
-        if not self.__operon_mappings:
+        if self.__operon_mappings is None:
             pairs = mo.get_operon_pairs(self.__microbes_online_db, self)
             synonyms = self.thesaurus()
             self.__operon_mappings = {synonyms[gene]: synonyms[head] for head, gene in pairs}
@@ -263,6 +284,8 @@ class FASTASequenceSource:
     def __init__(self, organism, filepath):
         self.organism = organism
         self.seqmap = None
+        # BioPython is only needed for organisms with a FASTA file
+        from Bio import SeqIO
         with open(filepath) as infile:
             self.fasta_records = [r for r in SeqIO.parse(infile, 'fasta')]
 
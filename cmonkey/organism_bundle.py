@@ -0,0 +1,191 @@
+# vi: sw=4 ts=4 et:
+"""organism_bundle.py - cached organism metadata
+
+Setting up an organism means reading and parsing the KEGG taxonomy, the
+proteome2taxid file, the RSAT features, feature names and contig sequences,
+the operon predictions and the STRING network. An organism bundle stores
+the result of all this in a single file per organism code, so runs that
+use the same organism and input files can skip the parsing.
+
+A bundle stores the sources it was built from (configuration values and
+the sizes and modification times of the input files). It is only used if
+these match the current run, otherwise the organism is set up from the
+sources as usual.
+Networks are stored as the parsed STRING links and operons, because the
+edges that end up in a run's networks depend on its ratios matrix.
+
+File format: an 8 byte magic string, followed by the format version as a
+little-endian 32 bit integer and the length of the pickled metadata as
+a little-endian 64 bit integer, followed by the pickled metadata. The
+contig sequences are stored as ASCII bytes after that, starting at an
+8 byte aligned offset, and are memory-mapped when the bundle is loaded.
+
+This file is part of cMonkey Python. Please see README and LICENSE for
+more information and licensing details.
+"""
+import os
+import struct
+import logging
+import numpy as np
+
+import cmonkey.util as util
+
+# Python2/Python3 compatibility
+try:
+    import cPickle as pickle
+except ImportError:
+    import pickle
+
+
+MAGIC = b'CMBUNDLE'
+# version 2: the synonyms are stored as a thesaurus.Thesaurus
+FORMAT_VERSION = 2
+HEADER_FORMAT = '<iQ'
+
+# the configuration values that determine the contents of a bundle
+SOURCE_PARAMS = ['organism_code', 'ncbi_code', 'rsat_base_url', 'rsat_dir', 'rsat_organism',
+                 'rsat_features', 'synonym_file', 'case_sensitive', 'operon_file',
+                 'string_file', 'use_string', 'use_operons', 'nonetworks']
+
+
+def bundle_path(cache_dir, organism_code):
+    return os.path.join(cache_dir, 'bundles', '%s.bundle' % organism_code)
+
+
+def file_signature(path):
+    """the size and modification time of a file, None if it doesn't exist"""
+    if path is None or not os.path.exists(path):
+        return None
+    stat = os.stat(path)
+    return (stat.st_size, stat.st_mtime)
+
+
+def source_signature(config_params, paths):
+    """describes the sources of an organism: the relevant configuration
+    values and the signatures of the input files. If an input path is a
+    directory, the signatures of all files in it are included"""
+    files = {}
+    for path in paths:
+        if path is not None and os.path.isdir(path):
+            for filename in sorted(os.listdir(path)):
+                filepath = os.path.join(path, filename)
+                files[filepath] = file_signature(filepath)
+        elif path is not None:
+            files[path] = file_signature(path)
+    return {'version': FORMAT_VERSION,
+            'params': {key: config_params.get(key) for key in SOURCE_PARAMS},
+            'files': files}
+
+
+class OrganismBundle:
+    """Organism metadata loaded from a bundle file. The bundle implements
+    the parts of the RSAT database interface that are needed by
+    RsatSpeciesInfo, so organisms can be created on top of it.
+
+    info -- a dictionary containing kegg_species, ncbi_code, go_taxonomy_id,
+            rsat_species, taxonomy_id, string_file, thesaurus, features,
+            operon_mappings, operons and string_links
+    """
+    def __init__(self, path, info, sequences):
+        self.path = path
+        self.info = info
+        self.__sequences = sequences
+
+    def contigs(self):
+        return sorted(self.info['contigs'].keys())
+
+    def get_rsat_organism(self, kegg_organism):
+        return self.info['rsat_species']
+
+    def get_taxonomy_id(self, organism):
+        return self.info['taxonomy_id']
+
+    def get_features(self, organism):
+        raise Exception("features are stored as a table in organism bundle '%s'" % self.path)
+
+    def get_feature_names(self, organism):
+        raise Exception("feature names are stored as a thesaurus in organism bundle '%s'" %
+                        self.path)
+
+    def get_contig_sequence(self, organism, contig):
+        if contig not in self.info['contigs']:
+            raise Exception("contig '%s' not in organism bundle '%s'" % (contig, self.path))
+        start, length = self.info['contigs'][contig]
+        return self.__sequences[start:start + length].tobytes().decode('ascii')
+
+
+def read_header(infile):
+    magic = infile.read(len(MAGIC))
+    if magic != MAGIC:
+        raise Exception("not a cMonkey organism bundle")
+    return struct.unpack(HEADER_FORMAT, infile.read(struct.calcsize(HEADER_FORMAT)))
+
+
+def write_bundle(path, info, contig_sequences):
+    """writes the info dictionary and the contig sequences (a dictionary
+    contig -> sequence string) to a bundle file. The file is written under a
+    temporary name and renamed, so concurrent runs never see a partial
+    bundle"""
+    info = dict(info)
+    info['contigs'] = {}
+    offset = 0
+    for contig in sorted(contig_sequences.keys()):
+        info['contigs'][contig] = (offset, len(contig_sequences[contig]))
+        offset += len(contig_sequences[contig])
+    metadata = pickle.dumps(info, pickle.HIGHEST_PROTOCOL)
+
+    dirname = os.path.dirname(path)
+    if dirname and not os.path.exists(dirname):
+        os.makedirs(dirname)
+    tmp_path = '%s.%d.tmp' % (path, os.getpid())
+    with open(tmp_path, 'wb') as outfile:
+        outfile.write(MAGIC)
+        outfile.write(struct.pack(HEADER_FORMAT, FORMAT_VERSION, len(metadata)))
+        outfile.write(metadata)
+        outfile.write(b'\0' * (-outfile.tell() % 8))
+        for contig in sorted(contig_sequences.keys()):
+            outfile.write(contig_sequences[contig].encode('ascii'))
+    os.rename(tmp_path, path)
+
+
+def read_bundle(path):
+    """reads the bundle at path, the contig sequences are memory-mapped"""
+    with open(path, 'rb') as infile:
+        version, metadata_length = read_header(infile)
+        if version != FORMAT_VERSION:
+            raise Exception("unsupported organism bundle format version: %d (expected %d)" %
+                            (version, FORMAT_VERSION))
+        info = pickle.loads(infile.read(metadata_length))
+        data_offset = infile.tell() + (-infile.tell() % 8)
+
+    num_bytes = sum(length for _, length in info['contigs'].values())
+    if num_bytes > 0:
+        sequences = np.memmap(path, dtype=np.uint8, mode='r', offset=data_offset,
+                              shape=(num_bytes,))
+    else:
+        sequences = np.zeros(0, dtype=np.uint8)
+    return OrganismBundle(path, info, sequences)
+
+
+def load_bundle(path, signature):
+    """returns the bundle at path if it exists and was built from the sources
+    described by signature, None otherwise"""
+    if not os.path.exists(path):
+        return None
+    start_time = util.current_millis()
+    with open(path, 'rb') as infile:
+        version, _ = read_header(infile)
+    if version != FORMAT_VERSION:
+        logging.info("organism bundle '%s' has format version %d, ignoring it", path, version)
+        return None
+    bundle = read_bundle(path)
+    if bundle.info['signature'] != signature:
+        logging.info("organism bundle '%s' is out of date, ignoring it", path)
+        return None
+    elapsed = util.current_millis() - start_time
+    logging.debug("loaded organism bundle '%s' in %f s.", path, elapsed / 1000.0)
+    return bundle
+
+
+__all__ = ['OrganismBundle', 'bundle_path', 'source_signature', 'write_bundle', 'read_bundle',
+           'load_bundle']
@@ -0,0 +1,398 @@
+# vi: sw=4 ts=4 et:
+"""persistence.py - writing iteration results to the result database
+
+Results, statistics and debug dumps of an iteration are written from a
+snapshot of the iteration's state. This allows us to hand them off to a
+background writer thread, so the next iteration's scoring can overlap with
+the persistence of the current one.
+
+This file is part of cMonkey Python. Please see README and LICENSE for
+more information and licensing details.
+"""
+import bz2
+import copy
+import logging
+import os
+import threading
+import numpy as np
+from sqlalchemy import and_
+
+import cmonkey.database as cm2db
+import cmonkey.debug as debug
+import cmonkey.instrumentation as instrumentation
+import cmonkey.membership_store as mstore
+import cmonkey.util as util
+
+# Python2/Python3 compatibility
+try:
+    import queue
+except ImportError:
+    import Queue as queue
+
+try:
+    xrange
+except NameError:
+    xrange = range
+
+
+# the iteration result entries that are written to the database
+RESULT_KEYS = ['iteration', 'score_means', 'networks', 'motif-pvalue', 'fuzzy-coeff', 'motifs']
+
+
+class MembershipSnapshot:
+    """A read-only copy of the cluster memberships at the end of an iteration.
+    It supports the subset of the membership interface that is needed to write
+    results."""
+    def __init__(self, membership):
+        self.row_names = membership.row_names
+        self.col_names = membership.col_names
+        self.row_membs = np.copy(membership.row_membs)
+        self.col_membs = np.copy(membership.col_membs)
+        self.row_membs.flags.writeable = False
+        self.col_membs.flags.writeable = False
+
+    def rows_for_cluster(self, cluster):
+        idx = np.where(self.row_membs == cluster)[0]
+        return {self.row_names[i] for i in idx}
+
+    def columns_for_cluster(self, cluster):
+        idx = np.where(self.col_membs == cluster)[0]
+        return {self.col_names[i] for i in idx}
+
+
+class IterationSnapshot:
+    """Everything the writer needs to know about an iteration. The
+    iteration result is deep-copied, so the scoring functions are free to
+    modify their state while the snapshot is waiting to be written.
+
+    write_results -- write memberships and motifs
+    write_stats   -- write cluster and iteration statistics and mark the
+                     iteration as the last complete one
+    dump_path     -- if not None, write a cmresults dump to this path
+    """
+    def __init__(self, iteration_result, membership, write_results=False,
+                 write_stats=False, dump_path=None):
+        self.iteration = iteration_result['iteration']
+        self.result = {key: copy.deepcopy(iteration_result[key])
+                       for key in RESULT_KEYS if key in iteration_result}
+        self.membership = MembershipSnapshot(membership)
+        self.write_results = write_results
+        self.write_stats = write_stats
+        self.dump_path = dump_path
+
+
+def residual_for(ratios, row_names, column_names):
+    if len(column_names) <= 1 or len(row_names) <= 1:
+        return 1.0
+    else:
+        matrix = ratios.submatrix_by_name(row_names, column_names)
+        return matrix.residual()
+
+
+def write_memberships(session, ratios, membership, iteration, num_clusters):
+    """adds the row and column members of all clusters to the session"""
+    for cluster in range(1, num_clusters + 1):
+        column_names = membership.columns_for_cluster(cluster)
+        column_members = [cm2db.ColumnMember(iteration=iteration, cluster=cluster, order_num=order_num)
+                          for order_num in ratios.column_indexes_for(column_names)]
+        session.add_all(column_members)
+
+        row_names = membership.rows_for_cluster(cluster)
+        row_members = [cm2db.RowMember(iteration=iteration, cluster=cluster, order_num=order_num)
+                       for order_num in ratios.row_indexes_for(row_names)]
+        session.add_all(row_members)
+
+
+def write_motifs(session, iteration, motifs, gene_indexes):
+    """adds the motif infos of an iteration result to the session"""
+    for seqtype in motifs:
+        for cluster in motifs[seqtype]:
+            motif_infos = motifs[seqtype][cluster]['motif-info']
+            for motif_info in motif_infos:
+                db_motif_info = cm2db.MotifInfo(iteration=iteration, cluster=cluster, seqtype=seqtype,
+                                                motif_num=motif_info['motif_num'], evalue=motif_info['evalue'])
+                session.add(db_motif_info)
+                session.flush()
+
+                pssm_rows = motif_info['pssm']
+                db_pssm_rows = [cm2db.MotifPSSMRow(motif_info_id=db_motif_info.rowid, iteration=iteration, row=row,
+                                                   a=pssm_rows[row][0], c=pssm_rows[row][1],
+                                                   g=pssm_rows[row][2], t=pssm_rows[row][3])
+                                for row in xrange(len(pssm_rows))]
+                session.add_all(db_pssm_rows)
+
+                annotations = motif_info['annotations']
+                db_annotations = [cm2db.MotifAnnotation(motif_info_id=db_motif_info.rowid, iteration=iteration,
+                                                        gene_num=gene_indexes[annotation['gene']],
+                                                        position=annotation['position'],
+                                                        reverse=annotation['reverse'],
+                                                        pvalue=annotation['pvalue'])
+                                  for annotation in annotations]
+                session.add_all(db_annotations)
+
+                sites = motif_info['sites']
+                if len(sites) > 0 and isinstance(sites[0], tuple):
+                    db_sites = [cm2db.MemeMotifSite(motif_info_id=db_motif_info.rowid,
+                                                    seq_name=seqname, reverse=(strand == '-'),
+                                                    start=start, pvalue=pval,
+                                                    flank_left=flank_left, seq=seq, flank_right=flank_right)
+                                for seqname, strand, start, pval, flank_left, seq, flank_right in sites]
+                    session.add_all(db_sites)
+
+
+def write_results(session, ratios, membership, iteration_result, num_clusters, gene_indexes):
+    """adds memberships and motifs of the iteration result to the session"""
+    iteration = iteration_result['iteration']
+    write_memberships(session, ratios, membership, iteration, num_clusters)
+    if 'motifs' in iteration_result:
+        write_motifs(session, iteration, iteration_result['motifs'], gene_indexes)
+
+
+def write_stats(session, ratios, membership, iteration_result, num_clusters):
+    """adds the cluster and iteration statistics to the session"""
+    iteration = iteration_result['iteration']
+
+    network_scores = iteration_result['networks'] if 'networks' in iteration_result else {}
+    motif_pvalues = iteration_result['motif-pvalue'] if 'motif-pvalue' in iteration_result else {}
+    fuzzy_coeff = iteration_result['fuzzy-coeff'] if 'fuzzy-coeff' in iteration_result else 0.0
+
+    residuals = []
+    for cluster in range(1, num_clusters + 1):
+        row_names = membership.rows_for_cluster(cluster)
+        column_names = membership.columns_for_cluster(cluster)
+        residual = residual_for(ratios, row_names, column_names)
+        residuals.append(residual)
+        if np.isnan(residual) or np.isinf(residual):
+            residual = 1.0
+        session.add(cm2db.ClusterStat(iteration=iteration, cluster=cluster, num_rows=len(row_names),
+                                      num_cols=len(column_names), residual=residual))
+
+    session.add(cm2db.IterationStat(statstype=1, iteration=iteration, score=fuzzy_coeff))
+
+    median_residual = np.median(residuals)
+    if np.isnan(median_residual) or np.isinf(median_residual):
+        median_residual = 1.0
+    session.add(cm2db.IterationStat(statstype=2, iteration=iteration, score=median_residual))
+
+    # insert the score means
+    for fun_id in iteration_result['score_means']:
+        statstype = session.query(cm2db.StatsType).filter(and_(cm2db.StatsType.category == 'scoring',
+                                                               cm2db.StatsType.name == fun_id)).one()
+        session.add(cm2db.IterationStat(statstype=statstype.rowid, iteration=iteration,
+                                        score=iteration_result['score_means'][fun_id]))
+
+    for network, score in network_scores.items():
+        statstype = session.query(cm2db.StatsType).filter(and_(cm2db.StatsType.category == 'network',
+                                                               cm2db.StatsType.name == network)).one()
+        session.add(cm2db.IterationStat(statstype=statstype.rowid, iteration=iteration, score=score))
+
+    for seqtype, pval in motif_pvalues.items():
+        statstype = session.query(cm2db.StatsType).filter(and_(cm2db.StatsType.category == 'seqtype',
+                                                               cm2db.StatsType.name == seqtype)).one()
+        session.add(cm2db.IterationStat(statstype=statstype.rowid, iteration=iteration, score=pval))
+
+
+def update_iteration(session, iteration):
+    """marks the iteration as the last complete one, used by --resume"""
+    session.query(cm2db.RunInfo).first().last_iteration = iteration
+
+
+def delete_iterations_after(session, iteration):
+    """removes the results of all iterations after the specified one and makes
+    it the last complete iteration. This is used when a run is resumed from a
+    checkpoint that is older than the database"""
+    motif_info_ids = session.query(cm2db.MotifInfo.rowid).filter(
+        cm2db.MotifInfo.iteration > iteration)
+    for model in [cm2db.MemeMotifSite, cm2db.MotifAnnotation, cm2db.MotifPSSMRow]:
+        session.query(model).filter(model.motif_info_id.in_(motif_info_ids)).delete(
+            synchronize_session=False)
+    for model in [cm2db.MotifInfo, cm2db.RowMember, cm2db.ColumnMember,
+                  cm2db.ClusterStat, cm2db.IterationStat]:
+        session.query(model).filter(model.iteration > iteration).delete(
+            synchronize_session=False)
+    update_iteration(session, iteration)
+
+
+def dump_iteration(session, path, iteration, num_clusters, outdir):
+    """write complete result into a cmresults.tsv.bz2"""
+    with bz2.BZ2File(path, 'w') as outfile:
+        debug.write_iteration(session, outfile, iteration, num_clusters, outdir)
+
+
+class AppendLog:
+    """A diagnostic text file in the output directory that is appended to in
+    every iteration. The file is opened once and kept open for the run, rows
+    are buffered until flush() is called.
+
+    The header is written when the file is created. Rows are written with a
+    leading line break, so the file never ends with an incomplete line.
+    """
+    def __init__(self, path, header):
+        self.path = path
+        self.header = header
+        self.__outfile = None
+
+    def __open(self):
+        if os.path.exists(self.path):
+            self.__outfile = open(self.path, 'a')
+        else:
+            self.__outfile = open(self.path, 'w')
+            self.__outfile.write(self.header)
+
+    def write_row(self, values):
+        if self.__outfile is None:
+            self.__open()
+        self.__outfile.write('\n' + ','.join([str(value) for value in values]))
+
+    def flush(self):
+        if self.__outfile is not None:
+            self.__outfile.flush()
+
+    def close(self):
+        if self.__outfile is not None:
+            self.__outfile.close()
+            self.__outfile = None
+
+    def remove_after(self, iteration):
+        """removes the rows of all iterations after the specified one. The
+        iteration is expected in the first column. The file is rewritten to a
+        temporary file first, so it is never left truncated"""
+        if not os.path.exists(self.path):
+            return
+        self.close()
+        with open(self.path) as infile:
+            header = infile.readline().rstrip('\n')
+            rows = [line.rstrip('\n') for line in infile]
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w') as outfile:
+            outfile.write(header)
+            for row in rows:
+                if row and int(row.split(',', 1)[0]) <= iteration:
+                    outfile.write('\n' + row)
+        os.rename(tmp_path, self.path)
+
+
+class ResultWriter:
+    """Writes IterationSnapshot objects to the result database.
+
+    In threaded mode, snapshots are put on a bounded queue and written by a
+    dedicated thread with its own database session. When the queue is full,
+    submit() blocks until the writer catches up, so a slow database can't
+    make us accumulate an unbounded number of snapshots in memory.
+
+    All data of an iteration is committed in a single transaction together
+    with RunInfo.last_iteration, so after a crash, last_iteration always
+    points to an iteration that was completely written and --resume stays
+    correct.
+    """
+    def __init__(self, config_params, ratios, gene_indexes, session=None,
+                 threaded=True, queue_size=2):
+        self.config_params = config_params
+        self.ratios = ratios
+        self.gene_indexes = gene_indexes
+        self.threaded = threaded
+        self.__session = session
+        if config_params.get('membership_snapshots', False):
+            self.membership_store = mstore.MembershipStore(config_params['output_dir'])
+        else:
+            self.membership_store = None
+        self.__error = None
+
+        if threaded:
+            self.__queue = queue.Queue(maxsize=queue_size)
+            self.__thread = threading.Thread(target=self.__run, name='cmonkey-result-writer')
+            self.__thread.daemon = True
+            self.__thread.start()
+        else:
+            self.__queue = None
+            self.__thread = None
+
+    def __check_error(self):
+        if self.__error is not None:
+            error = self.__error
+            self.__error = None
+            raise Exception("writing results failed: %s" % str(error))
+
+    def submit(self, snapshot):
+        """write the snapshot, in threaded mode this blocks if the queue is full"""
+        self.__check_error()
+        if self.threaded:
+            start_time = util.current_millis()
+            with instrumentation.span('submit_results'):
+                self.__queue.put(snapshot)
+            elapsed = util.current_millis() - start_time
+            if elapsed > 1000:
+                logging.debug("waited for result writer for %f s.", elapsed / 1000.0)
+        else:
+            self.write(self.__session, snapshot)
+
+    def flush(self):
+        """block until all submitted snapshots are written"""
+        if self.threaded:
+            self.__queue.join()
+        self.__check_error()
+
+    def close(self):
+        """write all pending snapshots and stop the writer thread"""
+        if self.__thread is not None:
+            self.__queue.put(None)
+            self.__thread.join()
+            self.__thread = None
+        self.__check_error()
+
+    def write(self, session, snapshot):
+        """write a single snapshot to the database"""
+        start_time = util.current_millis()
+        num_clusters = self.config_params['num_clusters']
+        try:
+            # the snapshot file is written before the iteration is committed,
+            # so last_iteration always has a membership snapshot
+            if (self.membership_store is not None and
+                (snapshot.write_results or snapshot.write_stats)):
+                self.membership_store.write_membership(snapshot.iteration, snapshot.membership)
+            if snapshot.write_results:
+                write_results(session, self.ratios, snapshot.membership, snapshot.result,
+                              num_clusters, self.gene_indexes)
+            if snapshot.write_stats:
+                write_stats(session, self.ratios, snapshot.membership, snapshot.result,
+                            num_clusters)
+                update_iteration(session, snapshot.iteration)
+            session.commit()
+        except:
+            session.rollback()
+            raise
+
+        if snapshot.dump_path is not None:
+            dump_iteration(session, snapshot.dump_path, snapshot.iteration, num_clusters,
+                           self.config_params['output_dir'])
+
+        elapsed = util.current_millis() - start_time
+        instrumentation.SPANS.add('write_results', elapsed / 1000.0)
+        logging.debug("wrote results of iteration %d in %f s.", snapshot.iteration,
+                      elapsed / 1000.0)
+
+    def __run(self):
+        """writer thread main loop. The session is created here, because
+        database connections can not be shared between threads"""
+        session = cm2db.make_session_from_config(self.config_params)
+        try:
+            while True:
+                snapshot = self.__queue.get()
+                try:
+                    if snapshot is None:
+                        break
+                    # after a failure, we keep draining the queue, so the
+                    # producer does not block forever
+                    if self.__error is None:
+                        self.write(session, snapshot)
+                except Exception as e:
+                    logging.exception("writing results of iteration %d failed",
+                                      snapshot.iteration)
+                    self.__error = e
+                finally:
+                    self.__queue.task_done()
+        finally:
+            session.close()
+
+
+__all__ = ['MembershipSnapshot', 'IterationSnapshot', 'ResultWriter', 'AppendLog']
@@ -13,6 +13,7 @@ import cmonkey.datamatrix as dm
 import cmonkey.util as util
 import cmonkey.membership as memb
 import cmonkey.BSCM as BSCM
+import cmonkey.instrumentation as instrumentation
 import numpy as np
 import gc
 
@@ -93,6 +94,11 @@ class ScoringFunctionBase:
     def run_in_iteration(self, i):
         return self.config_params[self.id]['schedule'](i)
 
+    def cleanup(self):
+        """release resources that are held for the duration of the run,
+        e.g. worker pools"""
+        pass
+
     def pickle_path(self):
         """returns the function-specific pickle-path"""
         return '%s/%s_last.pkl' % (self.config_params['output_dir'], self.id)
@@ -116,6 +122,17 @@ class ScoringFunctionBase:
             with open(self.pickle_path(), 'wb') as outfile:
                 pickle.dump(result, outfile)
 
+    def checkpoint_state(self):
+        """returns the state that is needed to continue a run without
+        recomputing this function. Scoring functions that keep state beyond
+        their last result should override this and restore_checkpoint_state()"""
+        return {'cached_result': self.last_cached()}
+
+    def restore_checkpoint_state(self, state):
+        """restores the state returned by checkpoint_state()"""
+        if state['cached_result'] is not None:
+            self.store_result(state['cached_result'])
+
     def current_score_means(self, result_matrix):
         """This function can be overridden by custom functions to provide their
         own score means. The default version computes the means of the result
@@ -216,7 +233,10 @@ class ColumnScoringFunction(ScoringFunctionBase):
         #BSCM.  Danziger et al. 2015
         self.BSCM_obj = None
         if config_params['use_BSCM']:
-            self.BSCM_obj = BSCM.BSCM(ratios, verbose=False, useChi2=config_params['use_chi2']) #How to pass verbose and so on? More parameters?
+            # backgrounds are shared between runs on the same ratios matrix
+            store = BSCM.BackgroundStore(os.path.join(config_params['cache_dir'], 'bscm'), ratios)
+            self.BSCM_obj = BSCM.BSCM(ratios, verbose=False, useChi2=config_params['use_chi2'],
+                                      store=store) #How to pass verbose and so on? More parameters?
             #Note: Ratios normalized upstream during loading by config.py module
         self.run_log = RunLog("column_scoring", config_params)
 
@@ -230,6 +250,10 @@ class ColumnScoringFunction(ScoringFunctionBase):
         """Return the background sampled coherence matrix object"""
         return self.BSCM_obj
 
+    def cleanup(self):
+        if self.BSCM_obj is not None:
+            self.BSCM_obj.close()
+
 
 def compute_column_scores(membership, matrix, num_clusters,
                           config_params, BSCM_obj=None):
@@ -432,6 +456,10 @@ class ScoringFunctionCombiner:
         for fun in self.scoring_functions:
             fun.check_requirements()
 
+    def cleanup(self):
+        for fun in self.scoring_functions:
+            fun.cleanup()
+
     def compute_force(self, iteration_result, ref_matrix=None):
         """compute scores for one iteration, recursive force"""
         result_matrices = []
@@ -445,15 +473,18 @@ class ScoringFunctionCombiner:
             if reference_matrix is None and len(result_matrices) > 0:
                 reference_matrix = result_matrices[0]
 
-            matrix = scoring_function.compute_force(iteration_result, reference_matrix)
+            with instrumentation.span('score:%s' % scoring_function.id):
+                matrix = scoring_function.compute_force(iteration_result, reference_matrix)
+            instrumentation.record_nbytes('score:%s' % scoring_function.id, matrix)
             if matrix is not None:
                 result_matrices.append(matrix)
                 score_scalings.append(scoring_function.scaling(iteration))
 
                 if self.config_params['log_subresults']:
                     self.log_subresult(scoring_function, matrix)
-        return combine(result_matrices, score_scalings, self.membership,
-                       iteration, self.config_params)
+        with instrumentation.span('combine'):
+            return combine(result_matrices, score_scalings, self.membership,
+                           iteration, self.config_params)
 
     def compute(self, iteration_result, ref_matrix=None):
         """compute scores for one iteration"""
@@ -471,7 +502,9 @@ class ScoringFunctionCombiner:
             if reference_matrix is None and len(result_matrices) > 0:
                 reference_matrix = result_matrices[0]
 
-            matrix = scoring_function.compute(iteration_result, reference_matrix)
+            with instrumentation.span('score:%s' % scoring_function.id):
+                matrix = scoring_function.compute(iteration_result, reference_matrix)
+            instrumentation.record_nbytes('score:%s' % scoring_function.id, matrix)
             if matrix is not None:
                 result_matrices.append(matrix)
                 score_scalings.append(scoring_function.scaling(iteration))
@@ -479,8 +512,9 @@ class ScoringFunctionCombiner:
                 if self.config_params['log_subresults']:
                     self.log_subresult(scoring_function, matrix)
 
-        return combine(result_matrices, score_scalings, self.membership,
-                       iteration, self.config_params)
+        with instrumentation.span('combine'):
+            return combine(result_matrices, score_scalings, self.membership,
+                           iteration, self.config_params)
 
     def combine_cached(self, iteration):
         """Combine the cached results of the contained scoring function.
@@ -493,9 +527,21 @@ class ScoringFunctionCombiner:
                 result_matrices.append(matrix)
                 score_scalings.append(scoring_function.scaling(iteration))
 
-        return combine(result_matrices, score_scalings, self.membership,
-                       iteration, self.config_params)
-
+        with instrumentation.span('combine'):
+            return combine(result_matrices, score_scalings, self.membership,
+                           iteration, self.config_params)
+
+    def checkpoint_state(self):
+        """the states of the contained scoring functions, in pipeline order"""
+        return [scoring_function.checkpoint_state()
+                for scoring_function in self.scoring_functions]
+
+    def restore_checkpoint_state(self, state):
+        if len(state) != len(self.scoring_functions):
+            raise Exception("checkpoint has %d scoring functions, pipeline has %d" %
+                            (len(state), len(self.scoring_functions)))
+        for scoring_function, fun_state in zip(self.scoring_functions, state):
+            scoring_function.restore_checkpoint_state(fun_state)
 
     def log_subresult(self, score_function, matrix):
         """output an accumulated subresult to the log"""
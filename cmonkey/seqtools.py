@@ -10,6 +10,7 @@ import logging
 import random
 import string
 import collections
+import numpy as np
 from cmonkey.util import DelimitedFile
 
 try:
@@ -115,45 +116,94 @@ def subsequence(sequence, start, stop, reverse=False):
 
 
 REV_DICT = {'A': 'T', 'G': 'C', 'C': 'G', 'T': 'A'}
+try:
+    REVCOMP_TABLE = str.maketrans('ACGT', 'TGCA')
+except AttributeError:
+    REVCOMP_TABLE = string.maketrans('ACGT', 'TGCA')
 
 
 def revcomp(sequence):
-    """compute the reverse complement of the input string"""
-    return "".join([__revchar(c) for c in sequence[::-1]])
-
-
-def __revchar(nucleotide):
-    """for a nucleotide character, return its complement"""
-    nucleotide = nucleotide.upper()
-    if nucleotide in REV_DICT:
-        return REV_DICT[nucleotide]
-    else:
-        return nucleotide
+    """compute the reverse complement of the input string. The result
+    is in upper case, characters other than ACGT are left unchanged"""
+    return sequence[::-1].upper().translate(REVCOMP_TABLE)
+
+
+def __encode_sequences(seqs):
+    """encodes the input sequences as one uint8 array of indexes into their
+    sorted alphabet. Returns the alphabet as a uint8 array of characters,
+    the codes and for each position the end of the sequence it belongs to"""
+    lengths = np.array([len(seq) for seq in seqs], dtype=np.int64)
+    data = np.frombuffer(''.join(seqs).encode('latin-1'), dtype=np.uint8)
+    alphabet = np.flatnonzero(np.bincount(data, minlength=256)).astype(np.uint8)
+    lookup = np.zeros(256, dtype=np.uint8)
+    lookup[alphabet] = np.arange(len(alphabet), dtype=np.uint8)
+    return alphabet, lookup[data], np.repeat(np.cumsum(lengths), lengths)
+
+
+def __decode_kmers(kmers, subseq_len, alphabet):
+    """turns the hash values of k-mers back into strings"""
+    base = len(alphabet)
+    powers = base ** np.arange(subseq_len - 1, -1, -1, dtype=np.int64)
+    chars = np.ascontiguousarray(alphabet[(kmers[:, np.newaxis] // powers) % base])
+    return [kmer.decode('latin-1') for kmer in chars.view('S%d' % subseq_len).ravel()]
+
+
+# above this number of possible k-mers, counting uses np.unique instead of np.bincount
+MAX_BINCOUNT_SIZE = 2 ** 24
+
+
+def kmer_counts(seqs, subseq_lens):
+    """returns a list containing a dictionary subsequence -> count for each
+    of the specified subsequence lengths.
+    The sequences are encoded as arrays of alphabet indexes, so the k-mers
+    of all lengths can be computed as rolling hashes in base |alphabet|
+    (base 4 for pure ACGT sequences) and counted with np.bincount()"""
+    result = [{} for _ in subseq_lens]
+    if len(seqs) == 0:
+        return result
+    alphabet, codes, ends = __encode_sequences(seqs)
+    base = len(alphabet)
+    hashes = np.zeros(len(codes), dtype=np.int64)
+
+    for subseq_len in xrange(1, max(subseq_lens) + 1):
+        num_kmers = len(codes) - subseq_len + 1
+        if num_kmers <= 0:
+            break
+        hashes = hashes[:num_kmers] * base + codes[subseq_len - 1:]
+        if subseq_len not in subseq_lens:
+            continue
+
+        # only count the k-mers that do not cross sequence boundaries
+        starts = np.arange(num_kmers, dtype=np.int64)
+        kmers = hashes[starts + subseq_len <= ends[:num_kmers]]
+        if base ** subseq_len <= MAX_BINCOUNT_SIZE:
+            counts = np.bincount(kmers)
+            kmers = np.flatnonzero(counts)
+            counts = counts[kmers]
+        else:
+            kmers, counts = np.unique(kmers, return_counts=True)
+        result[subseq_lens.index(subseq_len)] = dict(
+            zip(__decode_kmers(kmers, subseq_len, alphabet), counts.tolist()))
+    return result
 
 
 def subseq_counts(seqs, subseq_len):
     """return a dictionary containing for each subsequence of length
     subseq_len their respective count in the input sequences"""
-    counts = {}
-    for seq in seqs:
-        for index in xrange(0, len(seq) - subseq_len + 1):
-            subseq = seq[index:index + subseq_len]
-            if not subseq in counts:
-                counts[subseq] = 0
-            counts[subseq] += 1
-    return counts
+    return kmer_counts(seqs, [subseq_len])[0]
+
+
+def __frequencies(counts):
+    """turns a dictionary of subsequence counts into frequencies"""
+    total = float(sum(counts.values()))
+    return {subseq: count / total for subseq, count in counts.items()}
 
 
 def subseq_frequencies(seqs, subseq_len):
     """return a dictionary containing for each subsequence of
     length subseq_len their respective frequency within the
     input sequences"""
-    result = {}
-    counts = subseq_counts(seqs, subseq_len)
-    total = sum([count for count in counts.values()])
-    for subseq, count in counts.items():
-        result[subseq] = float(count) / float(total)
-    return result
+    return __frequencies(subseq_counts(seqs, subseq_len))
 
 
 def markov_background(seqs, order):
@@ -161,11 +211,9 @@ def markov_background(seqs, order):
     order for the given input sequences. This is implemented
     by gathering the frequencies of subsequences of length
     1,..,(order + 1)"""
-    result = []
     seqs = replace_degenerate_residues(seqs)
-    for subseq_len in xrange(1, (order + 2)):
-        result.append(subseq_frequencies(seqs, subseq_len))
-    return result
+    return [__frequencies(counts)
+            for counts in kmer_counts(seqs, list(xrange(1, order + 2)))]
 
 
 def all_kmers(length, seqs, seq=[], pos=0, choices=['A', 'C', 'G', 'T']):
@@ -184,25 +232,98 @@ def all_kmers(length, seqs, seq=[], pos=0, choices=['A', 'C', 'G', 'T']):
             all_kmers(length, seqs, seq, pos + 1, choices)
 
 
+DEGENERATE_REPLACEMENTS = {'R': 'GA', 'Y': 'TC', 'K': 'GT', 'M': 'AC', 'S': 'GC',
+                           'W': 'AT', 'N': 'GATC'}
+
+
 def replace_degenerate_residues(seqs):
     """gets rid of funny characters in gene sequences by employing a
-    replacement strategy"""
-    replacements = {'R': ['G', 'A'], 'Y': ['T', 'C'], 'K': ['G', 'T'],
-                    'M': ['A', 'C'], 'S': ['G', 'C'], 'W': ['A', 'T'],
-                    'N': ['G', 'A', 'T', 'C'],
-                    ' ': [' ']}
-
-    pat = re.compile('[ACGTX]*([^ACGTX])[ACGTX]*')
-    result = []
-    for seq in seqs:
-        seq = seq.strip()  # For some reasons, there were cases with newlines in the beginning
-        for match in pat.finditer(seq):
-            replace_chars = replacements[seq[match.start(1)]]
-            replace_char = replace_chars[random.randint(
-                0, len(replace_chars) - 1)]
-            seq = seq[:match.start(1)] + replace_char + seq[match.end(1):]
-        result.append(seq)
-    return result
+    replacement strategy: each degenerate residue is replaced with a
+    randomly chosen residue that it represents"""
+    # For some reasons, there were cases with newlines in the beginning
+    seqs = [seq.strip() for seq in seqs]
+    data = np.frombuffer(''.join(seqs).encode('latin-1'), dtype=np.uint8).copy()
+    rand = None
+    for residue, replace_chars in DEGENERATE_REPLACEMENTS.items():
+        positions = np.flatnonzero(data == ord(residue))
+        if len(positions) > 0:
+            if rand is None:
+                # seeded from the random module, so runs with a fixed seed are reproducible
+                rand = np.random.RandomState(random.getrandbits(32))
+            choices = np.frombuffer(replace_chars.encode('latin-1'), dtype=np.uint8)
+            data[positions] = choices[rand.randint(0, len(choices), len(positions))]
+    if rand is None:
+        return seqs
+
+    replaced = data.tobytes().decode('latin-1')
+    ends = np.cumsum([len(seq) for seq in seqs]).tolist()
+    return [replaced[end - len(seq):end] for seq, end in zip(seqs, ends)]
+
+
+# DUST parameters: triplets are scored in windows of 64 residues that
+# overlap by half, regions scoring above the level are masked
+DUST_WORD = 3
+DUST_WINDOW = 64
+DUST_WINDOW2 = 32
+DUST_LEVEL = 20
+
+
+def __dust_window(window):
+    """scores the low-complexity region of a window (a uint8 array of
+    characters), returns (score, start, end) of the best scoring region.
+    For every start position, the score of the region up to position j
+    is 10 * (number of repeated triplet pairs) / (j - start), ties are
+    resolved in favor of the first start and end position"""
+    length = len(window)
+    if length < DUST_WORD:
+        return 0, 0, 0
+    is_alpha = ((window >= 65) & (window <= 90)) | ((window >= 97) & (window <= 122))
+    letters = ((window | 0x20).astype(np.int64) - 97) & 31
+    codes = (letters[:-2] << 10) | (letters[1:-1] << 5) | letters[2:]
+    valid = is_alpha[:-2] & is_alpha[1:-1] & is_alpha[2:]
+
+    # repeats[k, j]: the triplets ending at k < j are equal
+    triplets = np.full(length, -1, dtype=np.int64)
+    triplets[2:] = np.where(valid, codes, -1)
+    repeats = np.triu(triplets[:, np.newaxis] == triplets[np.newaxis, :], 1)
+    repeats[triplets < 0] = False
+
+    # counts[a, j]: occurrences of triplet j in [a + 2, j), for each start a
+    counts = np.cumsum(repeats[::-1], axis=0)[::-1][2:]
+    sums = np.cumsum(counts, axis=1)
+    offsets = np.arange(length)[np.newaxis, :] - np.arange(length - 2)[:, np.newaxis]
+    scores = np.where(counts > 0, 10 * sums // np.maximum(offsets, 1), 0)
+    best = np.argmax(scores)
+    start, end = divmod(best, length)
+    if scores[start, end] == 0:
+        return 0, 0, 0
+    return int(scores[start, end]), int(start), int(end)
+
+
+def dust(sequence, level=DUST_LEVEL):
+    """masks the low-complexity regions in the sequence with N's, using
+    the DUST algorithm as implemented in the dust tool that comes with
+    MEME"""
+    seq = np.frombuffer(sequence.encode('latin-1'), dtype=np.uint8).copy()
+    is_alpha = ((seq >= 65) & (seq <= 90)) | ((seq >= 97) & (seq <= 122))
+    length = len(seq)
+    mask_from, mask_to = 0, -1
+    for offset in xrange(0, length, DUST_WINDOW2):
+        # mask the remainder of a region found in the previous window
+        mask_from -= DUST_WINDOW2
+        mask_to -= DUST_WINDOW2
+        score, start, end = __dust_window(seq[offset:offset + DUST_WINDOW])
+        if mask_to >= mask_from:
+            positions = np.arange(offset + mask_from, offset + mask_to + 1)
+            seq[positions[is_alpha[positions]]] = ord('N')
+        if score > level:
+            end_first_half = min(end + 1, DUST_WINDOW2)
+            positions = np.arange(offset + start, offset + max(start, end_first_half))
+            seq[positions[is_alpha[positions]]] = ord('N')
+            mask_from, mask_to = max(start, end_first_half), end
+        else:
+            mask_from, mask_to = 0, -1
+    return seq.tobytes().decode('latin-1')
 
 
 def read_sequences_from_fasta_string(fasta_string):
@@ -242,7 +363,7 @@ def write_sequences_to_fasta_file(outputfile, seqs):
         outputfile.write('%s\n' % seq[1])
 
 
-__all__ = ['subsequence', 'extract_upstream', 'markov_background',
+__all__ = ['subsequence', 'extract_upstream', 'markov_background', 'kmer_counts', 'dust',
            'read_sequences_from_fasta_string',
            'read_sequences_from_fasta_file',
            'write_sequences_to_fasta_file', 'Feature', 'read_features_from_file']
@@ -9,12 +9,15 @@ import os
 import json
 import logging
 import numpy as np
-import multiprocessing as mp
+import scipy.sparse
+import scipy.stats
 from collections import defaultdict
 
 import cmonkey.util as util
 import cmonkey.scoring as scoring
 import cmonkey.datamatrix as dm
+import cmonkey.persistence as persistence
+import cmonkey.thesaurus as thesaurus
 
 # Python2/Python3 compatibility
 try:
@@ -91,16 +94,121 @@ class SetType:
         return result
 
 
-# global variables that are shared by the child processe
-# when running in multiprocessing. This is an attempt to avoid
-# that the scoring function slows itself down by using to much
-# memory
-SET_MATRIX = None
-SET_MEMBERSHIP = None
-SET_SET_TYPE = None
-SET_SYNONYMS = None
-CANONICAL_ROWNAMES = None
-CANONICAL_ROW_INDEXES = None
+class CompiledSetType:
+    """A set type compiled into a sparse gene x set incidence matrix over the
+    rows of the ratios matrix. The overlaps of all clusters with all sets are
+    then a single sparse matrix product.
+    Sets are numbered in the sorted order of their names.
+    """
+    def __init__(self, set_type, num_rows, canonical_rownames, canonical_row_indexes):
+        self.set_type = set_type
+        self.set_names = sorted(set_type.sets.keys())
+        self.num_genes = len(set_type.genes())
+
+        # incidence matrix of the genes that are used to compute overlaps
+        rows = []
+        cols = []
+        self.set_sizes = np.zeros(len(self.set_names), dtype='int64')
+        # rows that get a score if the set is the most enriched one
+        self.score_rows = []
+        for set_index, set_name in enumerate(self.set_names):
+            eset = set_type.sets[set_name]
+            if eset.cutoff != 'discrete':
+                raise Exception("set '%s': only discrete enrichment sets are supported" % set_name)
+            set_genes = eset.genes_above_cutoff()
+            self.set_sizes[set_index] = len(set_genes)
+            set_rows = [canonical_row_indexes[gene] for gene in set_genes
+                        if gene in canonical_row_indexes]
+            rows.extend(set_rows)
+            cols.extend([set_index] * len(set_rows))
+            self.score_rows.append(np.array(sorted({canonical_row_indexes[gene]
+                                                    for gene in eset.genes()
+                                                    if gene in canonical_rownames}),
+                                            dtype='int64'))
+        # stored as set x gene, which is the orientation we multiply with
+        self.incidence = scipy.sparse.csr_matrix((np.ones(len(rows)), (cols, rows)),
+                                                 shape=(len(self.set_names), num_rows))
+
+        # the rows that are in any of the sets
+        self.in_type = np.zeros(num_rows, dtype=bool)
+        self.in_type[[canonical_row_indexes[gene] for gene in set_type.genes()
+                      if gene in canonical_row_indexes]] = True
+
+
+def canonical_cluster_rows(membership, clusters, synonyms, canonical_row_indexes):
+    """returns a list that contains the canonical row indexes of each of the
+    specified clusters"""
+    synonyms = thesaurus.as_thesaurus(synonyms)
+    result = []
+    for cluster in clusters:
+        canonical_names = synonyms.canonical_names(membership.rows_for_cluster(cluster))
+        result.append({canonical_row_indexes[canonical] for canonical in canonical_names
+                       if canonical in canonical_row_indexes})
+    return result
+
+
+def compute_cluster_scores(compiled, cluster_rows, cutoff, ref_min_score, num_rows):
+    """Computes the enrichment scores of all clusters for a compiled set type.
+    cluster_rows contains the canonical row indexes for each cluster.
+    Returns a list of (scores, min_set, min_pvalue) tuples, one for each cluster"""
+    num_clusters = len(cluster_rows)
+
+    # cluster x gene indicator, restricted to the genes of the set type
+    rows = []
+    cols = []
+    for cluster_index, crows in enumerate(cluster_rows):
+        crows = [row for row in crows if compiled.in_type[row]]
+        rows.extend(crows)
+        cols.extend([cluster_index] * len(crows))
+    cluster_genes = scipy.sparse.csr_matrix((np.ones(len(rows)), (rows, cols)),
+                                            shape=(num_rows, num_clusters))
+    cluster_sizes = np.asarray(cluster_genes.sum(axis=0)).ravel()
+
+    # overlap sizes of all sets with all clusters, p-values are only
+    # computed for the non-zero overlaps
+    overlaps = compiled.incidence.dot(cluster_genes).tocoo()
+    set_indexes = overlaps.row
+    clusters = overlaps.col
+    overlap_sizes = np.rint(overlaps.data)
+    # P[X > overlap], same as R's phyper(overlap, m, n, k, lower.tail=F)
+    pvalues = scipy.stats.hypergeom.sf(overlap_sizes, compiled.num_genes,
+                                       compiled.set_sizes[set_indexes],
+                                       cluster_sizes[clusters])
+
+    # the most enriched set of each cluster is the one with the smallest
+    # p-value, the first set in name order on ties
+    finite = np.isfinite(pvalues)
+    set_indexes, clusters, pvalues = set_indexes[finite], clusters[finite], pvalues[finite]
+    order = np.lexsort((set_indexes, pvalues, clusters))
+    is_first = np.ones(len(order), dtype=bool)
+    is_first[1:] = clusters[order][1:] != clusters[order][:-1]
+    best = order[is_first]
+    min_sets = {clusters[i]: (set_indexes[i], pvalues[i]) for i in best}
+
+    result = []
+    for cluster_index in xrange(num_clusters):
+        scores = np.zeros(num_rows)
+        if cluster_index not in min_sets:
+            result.append((scores, 'NA', np.nan))
+            continue
+
+        set_index, min_pvalue = min_sets[cluster_index]
+        min_indexes = compiled.score_rows[set_index]
+        overlap_indexes = [row for row in cluster_rows[cluster_index]
+                           if compiled.in_type[row]]
+        scores[min_indexes] = 0.5
+        overlap_indexes = np.intersect1d(min_indexes, overlap_indexes)
+        scores[overlap_indexes] = 1.0
+
+        if min_pvalue <= cutoff:
+            dampened_pvalue = 1
+        else:
+            dampened_pvalue = math.log10(min_pvalue) / math.log10(cutoff)
+
+        scores[scores != 0.0] = scores[scores != 0.0] / dampened_pvalue
+        scores *= ref_min_score
+        result.append((scores, compiled.set_names[set_index], min_pvalue))
+    return result
 
 
 def read_set_types(config_params, thesaurus, input_genes):
@@ -184,6 +292,11 @@ class ScoringFunction(scoring.ScoringFunctionBase):
                                              ratios, config_params)
         self.__set_types = read_set_types(config_params, organism.thesaurus(),
                                           ratios.row_names)
+        self.__compiled_set_types = None
+        self.__set_log = None
+        self.__pvalue_log = None
+        self.__canonical_rownames = None
+        self.__canonical_row_indexes = None
         self.run_log = scoring.RunLog('set_enrichment', config_params)
 
     def bonferroni_cutoff(self):
@@ -195,169 +308,85 @@ class ScoringFunction(scoring.ScoringFunctionBase):
         Note: will return None if not computed yet and the result of a previous
         scoring if the function is not supposed to actually run in this iteration
         """
-        global SET_MATRIX, SET_MEMBERSHIP, SET_SET_TYPE, SET_SYNONYMS, CANONICAL_ROWNAMES, CANONICAL_ROW_INDEXES
         logging.info("Compute scores for set enrichment...")
         start_time = util.current_millis()
         matrix = dm.DataMatrix(len(self.gene_names()), self.num_clusters(),
                                self.gene_names())
-        use_multiprocessing = self.config_params[scoring.KEY_MULTIPROCESSING]
-        SET_MATRIX = self.ratios
-        SET_MEMBERSHIP = self.membership
-        SET_SYNONYMS = self.organism.thesaurus()
-
-        if CANONICAL_ROWNAMES is None:
-            CANONICAL_ROWNAMES = set(map(lambda n: SET_SYNONYMS[n] if n in SET_SYNONYMS else n,
-                                         self.ratios.row_names))
-
-        if CANONICAL_ROW_INDEXES is None:
-            CANONICAL_ROW_INDEXES = {}
-            for index, row in enumerate(self.ratios.row_names):
-                if row in SET_SYNONYMS:
-                    CANONICAL_ROW_INDEXES[SET_SYNONYMS[row]] = index
-                else:
-                    CANONICAL_ROW_INDEXES[row] = index
+        synonyms = self.organism.thesaurus()
+        if self.__compiled_set_types is None:
+            self.__compile_set_types(synonyms)
 
+        cluster_rows = canonical_cluster_rows(self.membership,
+                                              xrange(1, self.num_clusters() + 1),
+                                              synonyms, self.__canonical_row_indexes)
         ref_min_score = np.nanpercentile(ref_matrix.values, 10.0)
         logging.info('REF_MIN_SCORE: %f', ref_min_score)
 
-        set_filepath = os.path.join(self.config_params['output_dir'],
-                                    'setEnrichment_set.csv')
-        pval_filepath = os.path.join(self.config_params['output_dir'],
-                                     'setEnrichment_pvalue.csv')
-
-        for set_type in self.__set_types:
-            SET_SET_TYPE = set_type
+        if self.__set_log is None:
+            header = ',' + ','.join([str(i) for i in xrange(1, self.num_clusters() + 1)])
+            output_dir = self.config_params['output_dir']
+            self.__set_log = persistence.AppendLog(os.path.join(output_dir, 'setEnrichment_set.csv'),
+                                                   header)
+            self.__pvalue_log = persistence.AppendLog(os.path.join(output_dir, 'setEnrichment_pvalue.csv'),
+                                                      header)
+
+        iteration = iteration_result['iteration']
+        for compiled in self.__compiled_set_types:
+            set_type = compiled.set_type
             logging.info("PROCESSING SET TYPE '%s'", set_type.name)
             start1 = util.current_millis()
             cutoff = self.bonferroni_cutoff()
-            if use_multiprocessing:
-                with util.get_mp_pool(self.config_params) as pool:
-                    results = pool.map(compute_cluster_score,
-                                       [(cluster, cutoff, ref_min_score)
-                                        for cluster in xrange(1, self.num_clusters() + 1)])
-            else:
-                results = []
-                for cluster in xrange(1, self.num_clusters() + 1):
-                    results.append(compute_cluster_score((cluster, cutoff, ref_min_score)))
+            results = compute_cluster_scores(compiled, cluster_rows, cutoff, ref_min_score,
+                                             self.ratios.num_rows)
 
             elapsed1 = util.current_millis() - start1
             logging.info("ENRICHMENT SCORES COMPUTED in %f s, STORING...",
                          elapsed1 / 1000.0)
 
-            if not os.path.exists(set_filepath):
-                setFile = open(set_filepath, 'w')
-                setFile.write(',' + ','.join([str(i) for i in xrange(1, self.num_clusters() + 1)]))
-                pvFile = open(pval_filepath, 'w')
-                pvFile.write(',' + ','.join([str(i) for i in xrange(1, self.num_clusters() + 1)]))
-            else:
-                setFile = open(set_filepath, 'a')
-                pvFile = open(pval_filepath, 'a')
-
-            minSets = []
-            pValues = []
-            for cluster in xrange(1, self.num_clusters() + 1):
-                # store the best enriched set determined
-                scores, min_set, min_pvalue = results[cluster - 1]
-                minSets.append(min_set)
-                pValues.append(min_pvalue)
-
-                for row in xrange(len(self.gene_names())):
-                    matrix.values[row][cluster - 1] += scores[row] * set_type.weight
-            setFile.write('\n'+str(iteration_result['iteration'])+','+','.join([str(i) for i in minSets]))
-            pvFile.write('\n'+str(iteration_result['iteration'])+','+','.join([str(i) for i in pValues]))
-            setFile.close()
-            pvFile.close()
+            # results are in cluster order, so the scores are the matrix columns
+            matrix.values += np.column_stack([scores for scores, _, _ in results]) * set_type.weight
 
+            # store the best enriched set determined
+            self.__set_log.write_row([iteration] + [min_set for _, min_set, _ in results])
+            self.__pvalue_log.write_row([iteration] + [min_pvalue for _, _, min_pvalue in results])
+
+        self.__set_log.flush()
+        self.__pvalue_log.flush()
         logging.info("SET ENRICHMENT FINISHED IN %f s.\n",
                      (util.current_millis() - start_time) / 1000.0)
-        # cleanup
-        SET_SET_TYPE = None
-        SET_MATRIX = None
-        SET_MEMBERSHIP = None
-        SET_SYNONYMS = None
-
         return matrix
 
+    def __compile_set_types(self, synonyms):
+        """build the incidence matrices of the set types, this is done once per run"""
+        start_time = util.current_millis()
+        canonical_names = thesaurus.as_thesaurus(synonyms).canonical_names(self.ratios.row_names)
+        self.__canonical_rownames = set(canonical_names)
+        self.__canonical_row_indexes = {name: index for index, name in enumerate(canonical_names)}
+        self.__compiled_set_types = [CompiledSetType(set_type, self.ratios.num_rows,
+                                                     self.__canonical_rownames,
+                                                     self.__canonical_row_indexes)
+                                     for set_type in self.__set_types]
+        elapsed = util.current_millis() - start_time
+        logging.debug("compiled set types in %f s.", elapsed / 1000.0)
+
+    def cleanup(self):
+        """close the diagnostic files"""
+        if self.__set_log is not None:
+            self.__set_log.close()
+            self.__pvalue_log.close()
+
     def run_logs(self):
         """return the run logs"""
         return [self.run_log]
 
 
-def compute_cluster_score(args):
-    """Computes the cluster score for a given set type"""
-    global SET_MATRIX, SET_MEMBERSHIP, SET_SET_TYPE, SET_SYNONYMS, CANONICAL_ROWNAMES, CANONICAL_ROW_INDEXES
-    cluster, cutoff, ref_min_score = args
-    return compute_cluster_score_plain(cluster, cutoff, ref_min_score, SET_MATRIX, SET_MEMBERSHIP,
-                                       SET_SET_TYPE, SET_SYNONYMS, CANONICAL_ROWNAMES, CANONICAL_ROW_INDEXES)
-
 def compute_cluster_score_plain(cluster, cutoff, ref_min_score, SET_MATRIX, SET_MEMBERSHIP, SET_SET_TYPE,
                                 SET_SYNONYMS, CANONICAL_ROWNAMES, CANONICAL_ROW_INDEXES):
-    """This version is the real implementation, that can be tested without using global variables"""
-    set_type = SET_SET_TYPE
-    matrix = SET_MATRIX
-    cluster_rows = set()
-    for gene in SET_MEMBERSHIP.rows_for_cluster(cluster):
-        if gene in SET_SYNONYMS:
-            cluster_rows.add(SET_SYNONYMS[gene])
-        else:
-            cluster_rows.add(gene)
-    set_type_genes = set_type.genes()
-
-    cluster_genes = {gene for gene in cluster_rows if gene in set_type_genes}
-    overlap_sizes = []
-    set_sizes = []
-    set_names = []
-    for set_name in sorted(set_type.sets.keys()):
-        eset = set_type.sets[set_name]
-        set_genes = eset.genes_above_cutoff()
-        intersect = len(cluster_genes.intersection(set_genes))
-        if intersect > 0:
-            set_names.append(set_name)
-            set_sizes.append(len(set_genes))
-            overlap_sizes.append(intersect)
-
-    num_sets = len(overlap_sizes)
-    scores = np.zeros(matrix.num_rows)
-    if not num_sets==0:
-        num_genes = len(set_type_genes)
-        phyper_n = list(np.array([num_genes] * num_sets) - np.array(set_sizes))
-        phyper_k = [len(cluster_genes)] * num_sets
-
-        enrichment_pvalues = np.array(util.phyper(overlap_sizes, set_sizes, phyper_n, phyper_k))
-        min_pvalue = enrichment_pvalues[np.isfinite(enrichment_pvalues)].min()
-        min_index = np.where(enrichment_pvalues == min_pvalue)[0][0]
-        min_set = set_names[min_index]
-        min_set_overlap = overlap_sizes[min_index]
-
-        min_genes = set_type.sets[min_set].genes()
-        # ensure all row names are in canonical form
-        min_genes = [gene for gene in min_genes if gene in CANONICAL_ROWNAMES]
-        min_indexes = [CANONICAL_ROW_INDEXES[gene] for gene in min_genes]
-
-        if set_type.sets[min_set].cutoff == 'discrete':
-            overlap_genes = cluster_genes.intersection(set(min_genes))
-            overlap_indexes = [CANONICAL_ROW_INDEXES[gene] for gene in overlap_genes]
-            scores[min_indexes] = 0.5
-            scores[overlap_indexes] = 1.0
-        else:
-            # scaling
-            for index in min_indexes:
-                scores[index] = set_type.sets[min_set].weights[index]
-            min_weight = min_set_weights.min()
-            max_weight = min_set_weights.max()
-            weight_range = max_weight - min_weight
-            scores[min_indexes] -= min_weight
-            scores[min_indexes] /= weight_range
-
-        if min_pvalue <= cutoff:
-            dampened_pvalue = 1
-        else:
-            dampened_pvalue = math.log10(min_pvalue) / math.log10(cutoff)
-
-        scores[scores != 0.0] = scores[scores != 0.0] / dampened_pvalue
-        scores *= ref_min_score
-    else:
-        min_set = 'NA'
-        min_pvalue = np.nan
-
-    return scores, min_set, min_pvalue
+    """Computes the enrichment score of a single cluster for a set type, this
+    can be tested without setting up a scoring function"""
+    compiled = CompiledSetType(SET_SET_TYPE, SET_MATRIX.num_rows, CANONICAL_ROWNAMES,
+                               CANONICAL_ROW_INDEXES)
+    cluster_rows = canonical_cluster_rows(SET_MEMBERSHIP, [cluster], SET_SYNONYMS,
+                                          CANONICAL_ROW_INDEXES)
+    return compute_cluster_scores(compiled, cluster_rows, cutoff, ref_min_score,
+                                  SET_MATRIX.num_rows)[0]
@@ -25,12 +25,26 @@ def normalize_edges_to_max_score(edges, max_score):
     return [(edge[0], edge[1], normalize(edge[2])) for edge in edges]
 
 
+def read_links(organism_code, filename, sep='\t'):
+    """reads the (protein1, protein2, combined_score) links from a
+    preprocessed STRING file, protein names are patched for the organism"""
+    logging.info("stringdb.read_links()")
+    links = [(patches.patch_string_gene(organism_code, node1),
+              patches.patch_string_gene(organism_code, node2),
+              float(score))
+             for node1, node2, score in util.iter_dfile(filename, sep, columns=[0, 1, 2])]
+    logging.info("Finished loading %s", filename)
+    return links
+
+
 def get_network_factory(organism_code, filename, weight, sep='\t',
-                        normalized=False):
+                        normalized=False, links=None):
     """STRING network factory from preprocessed edge file
     (protein1, protein2, combined_score), scores are already
     normalized to 1000.
     This is the standard factory method used for Microbes.
+    If links is specified, it is used instead of reading the file, e.g. when
+    the links were loaded from an organism bundle.
     """
     def can_add_edge(node1, node2, thesaurus, cano_genes):
         """check whether we can add the edge
@@ -47,8 +61,7 @@ def get_network_factory(organism_code, filename, weight, sep='\t',
     def read_edges2(filename, organism, ratios):
         """just read a preprocessed file, much faster to debug"""
         logging.info("stringdb.read_edges2()")
-        dfile = util.read_dfile(filename, sep)
-        logging.info("Finished loading %s", filename)
+        string_links = links if links is not None else read_links(organism_code, filename, sep)
         result = []
         max_score = 0.0
         thesaurus = organism.thesaurus()
@@ -70,15 +83,13 @@ def get_network_factory(organism_code, filename, weight, sep='\t',
         nodes_not_in_thesaurus = 0
         nodes_not_in_cano_genes = 0
 
-        for line in dfile.lines:
+        for node1, node2, score in string_links:
             #This can be slow, display progress every 5%
-            frac = idx % (len(dfile.lines)/20)
+            frac = idx % (len(string_links)/20)
             idx += 1
             if frac == 0:
-                logging.info("Processing network %d%%", round(100*float(idx)/len(dfile.lines)))
+                logging.info("Processing network %d%%", round(100*float(idx)/len(string_links)))
 
-            node1 = patches.patch_string_gene(organism_code, line[0])
-            node2 = patches.patch_string_gene(organism_code, line[1])
             for node in (node1, node2):
                 if not node in keep_node:
                     if cano_genes is not None:
@@ -98,7 +109,6 @@ def get_network_factory(organism_code, filename, weight, sep='\t',
                             gene_lut[thesaurus[node]] = node
                     total_nodes += 1
 
-            score = float(line[2])
             max_score = max(score, max_score)
 
             if keep_node[node1] and keep_node[node2]:
@@ -137,4 +147,4 @@ def get_network_factory(organism_code, filename, weight, sep='\t',
     return make_network
 
 
-__all__ = ['get_network_factory']
+__all__ = ['read_links', 'get_network_factory']
@@ -5,14 +5,114 @@ This file is part of cMonkey Python. Please see README and LICENSE for
 more information and licensing details.
 """
 import re
+import sys
+import numpy as np
 import cmonkey.util as util
 
+# Python2/Python3 compatibility
+try:
+    from collections.abc import Mapping
+except ImportError:
+    from collections import Mapping
+
+try:
+    intern = sys.intern
+except AttributeError:
+    pass
+
+
+class Thesaurus(Mapping):
+    """A map from gene aliases to primary gene names.
+    Primary names are interned and numbered, each alias maps to the integer
+    id of its primary name, so the primary names are stored only once
+    regardless of the number of aliases. Bulk lookups can be done with
+    resolve(), which returns an array of gene ids.
+    If case_sensitive is False, aliases are stored upper case and lookups
+    are case-insensitive.
+
+    The thesaurus is read-only to its users and behaves like the dictionary
+    alias -> primary name it replaces.
+    """
+    def __init__(self, case_sensitive=True):
+        self.case_sensitive = case_sensitive
+        self.names = []  # gene id -> primary name
+        self.__name_ids = {}
+        self.__ids = {}
+
+    def __key(self, alias):
+        return alias if self.case_sensitive else alias.upper()
+
+    def add(self, alias, primary):
+        """maps alias to primary, an alias that was added before is remapped"""
+        gene_id = self.__name_ids.get(primary)
+        if gene_id is None:
+            gene_id = len(self.names)
+            primary = intern(primary)
+            self.__name_ids[primary] = gene_id
+            self.names.append(primary)
+        self.__ids[intern(self.__key(alias))] = gene_id
+
+    def gene_id(self, alias):
+        """the gene id of alias, -1 if the alias is unknown"""
+        return self.__ids.get(self.__key(alias), -1)
+
+    def resolve(self, aliases):
+        """returns the gene ids for a sequence of aliases as an integer array,
+        unknown aliases are marked with -1"""
+        if not self.case_sensitive:
+            aliases = [alias.upper() for alias in aliases]
+        elif not isinstance(aliases, list):
+            aliases = list(aliases)
+        return np.fromiter(map(self.__ids.get, aliases, [-1] * len(aliases)),
+                           dtype=np.int32, count=len(aliases))
+
+    def canonical_names(self, aliases):
+        """returns the primary names for a sequence of aliases, unknown
+        aliases are returned unchanged"""
+        aliases = list(aliases)
+        names = self.names
+        return [names[gene_id] if gene_id >= 0 else alias
+                for gene_id, alias in zip(self.resolve(aliases).tolist(), aliases)]
+
+    def __getitem__(self, alias):
+        return self.names[self.__ids[self.__key(alias)]]
+
+    def __contains__(self, alias):
+        return self.__key(alias) in self.__ids
+
+    def get(self, alias, default=None):
+        gene_id = self.__ids.get(self.__key(alias))
+        return default if gene_id is None else self.names[gene_id]
+
+    def __iter__(self):
+        return iter(self.__ids)
+
+    def __len__(self):
+        return len(self.__ids)
+
+    def __repr__(self):
+        return "Thesaurus: %d aliases, %d genes" % (len(self.__ids), len(self.names))
+
+
+def as_thesaurus(synonyms):
+    """returns synonyms as a Thesaurus, synonyms can be a Thesaurus or a
+    dictionary alias -> primary name"""
+    if isinstance(synonyms, Thesaurus):
+        return synonyms
+    result = Thesaurus()
+    for alias, primary in synonyms.items():
+        result.add(alias, primary)
+    return result
+
 
 def create_from_delimited_file1(dfile):
     """creates a thesaurus from a delimited file where the format is
     <alternative>SEPARATOR<original>
     ..."""
-    return {line[0]: line[1] for line in dfile.lines}
+    result = Thesaurus()
+    for line in dfile.lines:
+        result.add(line[0], line[1])
+    return result
 
 
 def create_from_delimited_file2(dfile, case_sensitive):
@@ -23,13 +123,15 @@ def create_from_delimited_file2(dfile, case_sensitive):
         return s if case_sensitive else s.upper()
 
     if isinstance(dfile, str):
-        dfile = util.read_dfile(dfile, sep=',', has_header=False)
-    result = {}
-    for line in dfile.lines:
+        rows = util.iter_dfile(dfile, sep=',', columns=[0, 1])
+    else:
+        rows = dfile.lines
+    result = Thesaurus(case_sensitive)
+    for line in rows:
         original = fix_case(line[0])  # original should map to itself
-        result[original] = original
+        result.add(original, original)
         for alternative in line[1].split(';'):
-            result[fix_case(alternative)] = original
+            result.add(alternative, original)
     return result
 
 
@@ -43,16 +145,16 @@ def create_from_rsat_feature_names(dfile, key_transforms=None):
     e.g. the feature_names.tab file stores VNG names with a modification
     suffix that can be removed
     """
-    result = {}
+    result = Thesaurus()
     for line in dfile.lines:
         key = line[1]
         alternative = line[0]
         if key_transforms:
             for transform in key_transforms:
                 for transform_key in transform(key):
-                    result[transform_key] = alternative
+                    result.add(transform_key, alternative)
         else:
-            result[key] = alternative
+            result.add(key, alternative)
     return result
 
 
@@ -64,5 +166,5 @@ def strip_vng_modification(gene):
         return [gene]
 
 
-__all__ = ['create_from_delimited_file1', 'create_from_delimited_file2',
-           'create_from_rsat_feature_names']
+__all__ = ['Thesaurus', 'as_thesaurus', 'create_from_delimited_file1',
+           'create_from_delimited_file2', 'create_from_rsat_feature_names']
@@ -3,7 +3,7 @@ import os
 import string
 from sqlalchemy import func, and_
 
-from cmonkey.tools.util import read_ratios
+from cmonkey.tools.util import read_ratios, cluster_members, last_iteration
 import cmonkey.database as cm2db
 
 GAGGLE_TEMPLATE = """
@@ -20,9 +20,9 @@ GAGGLE_TEMPLATE = """
 
 def export_to_gaggle_microformats(session, result_dir, output_dir):
 
-    iteration = session.query(func.max(cm2db.RowMember.iteration))
-    clusters = [r[0] for r in session.query(cm2db.RowMember.cluster).distinct().filter(
-        cm2db.RowMember.iteration == iteration)]
+    iteration = last_iteration(session, result_dir)
+    cluster_rows, cluster_cols = cluster_members(session, result_dir, iteration)
+    clusters = sorted(cluster_rows.keys())
     runinfo = session.query(cm2db.RunInfo).one()
     species = runinfo.species
 
@@ -34,9 +34,7 @@ def export_to_gaggle_microformats(session, result_dir, output_dir):
         rm_string += '<span class="gaggle-species">' + species + '</span>\n'
         rm_string += '<div class="gaggle-namelist"><ol>\n'
 
-        row_names = [r.row_name.name for r in session.query(cm2db.RowMember).filter(
-            and_(cm2db.RowMember.cluster == cluster, cm2db.RowMember.iteration == iteration))]
-        for row_name in row_names:
+        for row_name in cluster_rows[cluster]:
             rm_string += "<li>" + row_name + "</li>\n"
         rm_string += "</ol></div>"
 
@@ -46,9 +44,7 @@ def export_to_gaggle_microformats(session, result_dir, output_dir):
         cm_string += '<span class="gaggle-species">' + species + '</span>\n'
         cm_string += '<div class="gaggle-namelist"><ol>\n'
 
-        cluster_conds = [c.column_name.name for c in session.query(cm2db.ColumnMember).filter(
-            and_(cm2db.ColumnMember.cluster == cluster, cm2db.ColumnMember.iteration == iteration))]
-        for col_name in cluster_conds:
+        for col_name in cluster_cols[cluster]:
             cm_string += "<li>" + col_name + "</li>\n"
         cm_string += "</ol></div>"
 
@@ -75,16 +71,13 @@ def export_to_gaggle_microformats(session, result_dir, output_dir):
 def cluster_expressions_to_json_file(session, result_dir, output_dir):
     ratios = read_ratios(result_dir)
 
-    iteration = session.query(func.max(cm2db.RowMember.iteration))
-    clusters = [r[0] for r in session.query(cm2db.RowMember.cluster).distinct().filter(
-        cm2db.RowMember.iteration == iteration)]
+    iteration = last_iteration(session, result_dir)
+    cluster_rows, cluster_cols = cluster_members(session, result_dir, iteration)
 
     result = {}
-    for cluster in clusters:
-        genes = [r.row_name.name for r in session.query(cm2db.RowMember).filter(
-            and_(cm2db.RowMember.cluster == cluster, cm2db.RowMember.iteration == iteration))]
-        cluster_conds = [c.column_name.name for c in session.query(cm2db.ColumnMember).filter(
-            and_(cm2db.ColumnMember.cluster == cluster, cm2db.ColumnMember.iteration == iteration))]
+    for cluster in sorted(cluster_rows.keys()):
+        genes = cluster_rows[cluster]
+        cluster_conds = cluster_cols[cluster]
         cluster_data = ratios.loc[genes, cluster_conds]
         values = [{'gene': gene, 'condition': cond, 'value': cluster_data.values[rindex, cindex]}
                   for rindex, gene in enumerate(genes) for cindex, cond in enumerate(cluster_conds)]
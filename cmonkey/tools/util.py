@@ -1,6 +1,11 @@
 """util,py - reusable functionality"""
 import os
 import pandas
+from sqlalchemy import func
+
+import cmonkey.database as cm2db
+import cmonkey.debug as debug
+import cmonkey.membership_store as mstore
 
 
 def read_ratios(result_dir):
@@ -9,3 +14,22 @@ def read_ratios(result_dir):
     df.index = map(str, df.index)
     return df
 
+
+def last_iteration(session, result_dir):
+    """the last iteration that has memberships, either in the database or
+    as a membership snapshot"""
+    iterations = [session.query(func.max(cm2db.RowMember.iteration)).scalar(),
+                  mstore.MembershipStore(result_dir).last_iteration()]
+    iterations = [iteration for iteration in iterations if iteration is not None]
+    return max(iterations) if len(iterations) > 0 else None
+
+
+def cluster_members(session, result_dir, iteration):
+    """returns two dictionaries cluster -> [row names] and cluster -> [column names]
+    for the iteration, read from the membership snapshot if available"""
+    store = mstore.MembershipStore(result_dir)
+    if store.has_iteration(iteration):
+        return store.cluster_members(iteration)
+
+    return (debug.cluster_member_names(session, cm2db.RowMember, cm2db.RowName, iteration),
+            debug.cluster_member_names(session, cm2db.ColumnMember, cm2db.ColumnName, iteration))
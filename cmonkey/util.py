@@ -9,7 +9,6 @@ import collections
 from collections import defaultdict
 import math
 import numpy as np
-import scipy.stats
 
 # Python2 - Python3 compatibility
 try:
@@ -24,64 +23,66 @@ except NameError:
 
 
 import os
-import rpy2.robjects as robjects
 import gzip
 import shelve
 import time
 import logging
 import multiprocessing as mp
 
-# RSAT organism finding is an optional feature, which we can skip in case that
-# the user imports all the features through own text files
-import bs4
-
 # this tuple structure holds data of a delimited file
 DelimitedFile = collections.namedtuple('DelimitedFile', ['lines', 'header'])
 
 
-def make_delimited_file_from_lines(lines, sep, has_header, comment, quote):
-    """Creates a delimited file from a list of lines"""
-
-    def remove_quotes(astring, quote):
-        """removes the quote character from the input string if given"""
+def __data_lines(lines, comment, quote):
+    """filters comment lines and removes quote characters. Without a comment
+    prefix, empty lines are passed through, the row reader skips them"""
+    for line in lines:
+        if comment:
+            stripped = line.lstrip()
+            if len(stripped) == 0 or stripped.startswith(comment):
+                continue
         if quote:
-            return astring.replace(quote, "")
-        else:
-            return astring
+            line = line.replace(quote, "")
+        yield line
+
+
+def dfile_rows(lines, sep='\t', has_header=False, comment=None, quote=None,
+               columns=None):
+    """Generator that splits an iterable of lines into rows of a delimited
+    file. If has_header is True, the header is skipped. Rows are produced
+    lazily, so a file object can be passed in without reading it into
+    memory first.
+    If columns is a list of column indexes, only those columns are returned
+    for each row, as a tuple in the order of the list.
+    Quote characters are removed anywhere in a field"""
+    if comment or quote:
+        lines = __data_lines(lines, comment, quote)
+    lines = iter(lines)
+    if has_header:
+        next(lines, None)
 
-    def next_non_comment_index(lines, comment, line_index):
-        """utility method that takes a list of strings and returns the next
-        line index of a non-comment line. it also skips empty lines
-        """
-        if comment:
-            num_lines = len(lines)
-            line = lines[line_index].lstrip()
-            while line_index < num_lines and (len(line) == 0 or
-                                              line.startswith(comment)):
-                line_index += 1
-                if (line_index < num_lines):
-                    line = lines[line_index].lstrip()
-        return line_index
+    rows = (line.rstrip('\r\n').split(sep) for line in lines)
 
+    if columns is None:
+        for row in rows:
+            if len(row) > 0 and (len(row) > 1 or len(row[0]) > 0):
+                yield row
+    else:
+        getter = operator.itemgetter(*columns)
+        single = len(columns) == 1
+        for row in rows:
+            if len(row) > 0 and (len(row) > 1 or len(row[0]) > 0):
+                yield (getter(row),) if single else getter(row)
+
+
+def make_delimited_file_from_lines(lines, sep, has_header, comment, quote):
+    """Creates a delimited file from a list of lines"""
     file_header = None
-    file_lines = []
-    line_index = next_non_comment_index(lines, comment, 0)
     if has_header:
-        file_header = lines[line_index].rstrip().split(sep)
-        file_header = [remove_quotes(elem, quote) for elem in file_header]
-        line_index += 1
-
-    num_lines = len(lines)
-    while line_index < num_lines:
-        line_index = next_non_comment_index(lines, comment, line_index)
-        if line_index < num_lines:
-            stripped_line = lines[line_index].rstrip('\r\n')
-            if len(stripped_line) > 0:  # to catch newline at the end of file
-                line = stripped_line.split(sep)
-                line = [remove_quotes(elem, quote) for elem in line]
-                file_lines.append(line)
-            line_index += 1
-
+        lines = iter(__data_lines(lines, comment, quote))
+        file_header = next(lines, '').rstrip().split(sep)
+        comment = quote = None
+    file_lines = list(dfile_rows(lines, sep, False, comment, quote))
     return DelimitedFile(file_lines, file_header)
 
 
@@ -92,26 +93,51 @@ def dfile_from_text(text, sep='\t', has_header=False,
                                           has_header, comment, quote)
 
 
+def open_dfile(filepath):
+    """opens a delimited file for reading text lines, gzip compressed
+    files are decompressed on the fly"""
+    if filepath.endswith('.gz'):
+        return gzip.open(filepath, 'rt', encoding='utf-8')
+    else:
+        return open(filepath, 'r')
+
+
+def iter_dfile(filepath, sep='\t', has_header=False, comment=None,
+               quote=None, columns=None):
+    """Generator for the rows of a delimited file that streams the file
+    instead of reading it into memory. See dfile_rows() for the
+    parameters"""
+    with open_dfile(filepath) as inputfile:
+        for row in dfile_rows(inputfile, sep, has_header, comment, quote,
+                              columns):
+            yield row
+
+
 def read_dfile(filepath, sep='\t', has_header=False, comment=None,
                quote=None):
     """Creates the reader object"""
-    lines = None
-    if filepath.endswith('.gz'):
-        with gzip.open(filepath) as inputfile:
-            lines = [line.decode('utf-8') for line in inputfile.readlines()]
-    else:
-        with open(filepath, 'r') as inputfile:
-            lines = inputfile.readlines()
-    return make_delimited_file_from_lines(lines, sep, has_header,
-                                          comment, quote)
+    with open_dfile(filepath) as inputfile:
+        return make_delimited_file_from_lines(inputfile, sep, has_header,
+                                              comment, quote)
 
 
 def make_dfile_map(dfile, key_column, value_column):
+    """creates a map from the key column to the value column of a
+    DelimitedFile"""
     return collections.defaultdict(lambda : None,
                                    [(line[key_column], line[value_column])
                                     for line in dfile.lines])
 
 
+def read_dfile_map(filepath, key_column, value_column, sep='\t',
+                   comment=None):
+    """same as make_dfile_map(), but only the key and value columns are
+    extracted while streaming the file"""
+    return collections.defaultdict(lambda : None,
+                                   iter_dfile(filepath, sep, comment=comment,
+                                              columns=[key_column, value_column]))
+
+
 def levenshtein_distance(str1, str2):
     """computes the Levenshtein distance. This is used in order
     to make approximate string comparisons"""
@@ -142,6 +168,9 @@ RankedAnchor = collections.namedtuple('RankedAnchor', ['score', 'anchor'])
 def best_matching_links(search_string, html):
     """given a search string and an HTML text, extract the best matching
     href"""
+    # RSAT organism finding is an optional feature, which we can skip in case that
+    # the user imports all the features through own text files
+    import bs4
     try:
         soup = bs4.BeautifulSoup(html, "lxml")
     except:
@@ -170,7 +199,7 @@ def quantile(values, probability):
     values = np.array(values)
     values = values[np.isfinite(values)]
     if len(values):
-        return scipy.stats.scoreatpercentile(values, probability * 100)
+        return np.percentile(values, probability * 100)
     else:
         return np.nan
 
@@ -331,8 +360,17 @@ def trim_mean(values, trim):
 ######################################################################
 ### RPY2 abstraction
 ######################################################################
+def __robjects():
+    """returns the rpy2.robjects module. Importing it starts an embedded R,
+    which takes a while, so it is only imported when a function that is
+    backed by R is actually used"""
+    import rpy2.robjects as robjects
+    return robjects
+
+
 def density(kvalues, cluster_values, bandwidth, dmin, dmax):
     """generic function to compute density scores"""
+    robjects = __robjects()
     kwargs = {'bw': bandwidth, 'adjust': 2, 'from': dmin,
               'to': dmax, 'n': 256, 'na.rm': True}
     rdens = robjects.r("""
@@ -347,18 +385,37 @@ def density(kvalues, cluster_values, bandwidth, dmin, dmax):
 
 def r_set_seed(value):
     """calls R's set.seed()"""
+    robjects = __robjects()
     set_seed = robjects.r['set.seed']
     set_seed(value)
 
 
+def r_random_state():
+    """returns R's .Random.seed as a list of integers or None if R's random
+    number generator was not used yet"""
+    robjects = __robjects()
+    if not robjects.r('exists(".Random.seed", envir=globalenv())')[0]:
+        return None
+    return list(robjects.r('.Random.seed'))
+
+
+def r_set_random_state(state):
+    """restores a state returned by r_random_state()"""
+    robjects = __robjects()
+    if state is not None:
+        robjects.globalenv['.Random.seed'] = robjects.IntVector(state)
+
+
 def r_runif(value):
     """calls R's set.seed()"""
+    robjects = __robjects()
     runif = robjects.r['runif']
     return runif(value)
 
 
 def rnorm(num_values, std_deviation):
     """returns the result of R's rnorm function"""
+    robjects = __robjects()
     r_rnorm = robjects.r['rnorm']
     kwargs = {'sd': std_deviation}
     return r_rnorm(num_values, **kwargs)
@@ -366,6 +423,7 @@ def rnorm(num_values, std_deviation):
 
 def phyper(q, m, n, k, lower_tail=False):
     """calls the R function phyper"""
+    robjects = __robjects()
     r_phyper = robjects.r['phyper']
     kwargs = {'lower.tail': lower_tail}
     return r_phyper(robjects.FloatVector(q),
@@ -376,6 +434,7 @@ def phyper(q, m, n, k, lower_tail=False):
 
 def rrank(values):
     """invokes the R function rank"""
+    robjects = __robjects()
     r_rank = robjects.r['rank']
     kwargs = {'ties': 'min', 'na': 'keep'}
     return r_rank(robjects.FloatVector(values), **kwargs)
@@ -383,6 +442,7 @@ def rrank(values):
 
 def mad(values):
     """invokes the R function mad"""
+    robjects = __robjects()
     r_mad = robjects.r['mad']
     kwargs = {'na.rm': False}
     return r_mad(robjects.FloatVector(values), **kwargs)
@@ -392,6 +452,7 @@ def sd_rnorm(values, num_rnorm_values, fuzzy_coeff):
     """computes standard deviation on values and then calls rnorm to
     generate the num_rnorm_values. This combines stddev and rnorm
     in one function for reducing rpy2 call overhead"""
+    robjects = __robjects()
     func = robjects.r("""
       sd_rnorm <- function(values, num_out_values, fuzzy_coeff) {
         sdval <- sd(values, na.rm=T) * fuzzy_coeff
@@ -403,6 +464,7 @@ def sd_rnorm(values, num_rnorm_values, fuzzy_coeff):
 
 
 def rrank_matrix(npmatrix):
+    robjects = __robjects()
     func = robjects.r("""
       rank_mat <- function(values, nrow, ncol) {
         xr <- t(matrix(values, nrow=nrow, ncol=ncol, byrow=T))
@@ -425,6 +487,7 @@ def order_fast(values, result_size, reverse=True):
 
 def rorder(values, result_size):
     """call the R version of order"""
+    robjects = __robjects()
     r_order = robjects.r['order']
     kwargs = {'decreasing': True}
     res = r_order(robjects.FloatVector(values), **kwargs)
@@ -433,6 +496,7 @@ def rorder(values, result_size):
 
 def get_rvec_fun(rvecstr):
     """make scaling function based on an R vector expression string"""
+    robjects = __robjects()
     def scale(iteration):
         rvec = robjects.r(rvecstr)
         if iteration > len(rvec):
@@ -508,6 +572,7 @@ class get_mp_pool:
         self.pool.close()
         self.pool.join()
 
-__all__ = ['DelimitedFile', 'best_matching_links', 'quantile',
+__all__ = ['DelimitedFile', 'dfile_rows', 'iter_dfile', 'read_dfile_map',
+           'best_matching_links', 'quantile',
            'DocumentNotFound', 'CMonkeyURLopener', 'read_url',
            'read_url_cached', 'ThesaurusBasedMap', 'trim_mean']
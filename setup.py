@@ -63,4 +63,5 @@ if __name__ == '__main__':
           classifiers=CLASSIFIERS,
           install_requires=INSTALL_REQUIRES,
           include_package_data=True, package_data=PACKAGE_DATA,
-          scripts=['bin/cmonkey2', 'bin/cm2view', 'bin/cm2plot', 'bin/cm2export'])
+          scripts=['bin/cmonkey2', 'bin/cm2view', 'bin/cm2plot', 'bin/cm2export', 'bin/cm2dbupgrade',
+                   'bin/cm2bundle'])
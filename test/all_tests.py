@@ -13,6 +13,7 @@ import datamatrix_test as dmtest
 import util_test as ut
 import organism_test as ot
 import seqtools_test as stt
+import motif_test as mott
 import thesaurus_test as tht
 import operon_nw_test as opnwt
 import network_test as nwt
@@ -29,6 +30,15 @@ import microbes_online_test as mo_test
 import iteration_test
 import postproc_test
 import setenrichment_test as se_test
+import persistence_test as pst
+import organism_bundle_test as obt
+import database_test as dbt
+import debug_test
+import membership_store_test as mst
+import checkpoint_test as cpt
+import instrumentation_test as it
+import bscm_test
+import webapp_test
 
 # pylint: disable-msg=C0301
 if __name__ == '__main__':
@@ -36,6 +46,8 @@ if __name__ == '__main__':
     SUITE.append(unittest.TestLoader().loadTestsFromTestCase(dmtest.DataMatrixTest))
     SUITE.append(unittest.TestLoader().loadTestsFromTestCase(dmtest.DataMatrixReadWriteTest))
     SUITE.append(unittest.TestLoader().loadTestsFromTestCase(dmtest.NoChangeFilterTest))
+    SUITE.append(unittest.TestLoader().loadTestsFromTestCase(dmtest.RatiosFilterTest))
+    SUITE.append(unittest.TestLoader().loadTestsFromTestCase(dmtest.RatiosCacheTest))
     SUITE.append(unittest.TestLoader().loadTestsFromTestCase(dmtest.CenterScaleFilterTest))
     SUITE.append(unittest.TestLoader().loadTestsFromTestCase(dmtest.QuantileNormalizeTest))
 
@@ -46,12 +58,16 @@ if __name__ == '__main__':
     SUITE.append(unittest.TestLoader().loadTestsFromTestCase(ut.Order2StringTest))
 
     SUITE.append(unittest.TestLoader().loadTestsFromTestCase(ot.MicrobeTest))
+    SUITE.append(unittest.TestLoader().loadTestsFromTestCase(ot.FeatureIdsTest))
 
     SUITE.append(unittest.TestLoader().loadTestsFromTestCase(stt.SeqtoolsTest))
+    SUITE.append(unittest.TestLoader().loadTestsFromTestCase(stt.DustTest))
     SUITE.append(unittest.TestLoader().loadTestsFromTestCase(stt.FastaTest))
     SUITE.append(unittest.TestLoader().loadTestsFromTestCase(stt.LocationTest))
+    SUITE.append(unittest.TestLoader().loadTestsFromTestCase(mott.SequenceFilterTest))
 
     SUITE.append(unittest.TestLoader().loadTestsFromTestCase(tht.DelimitedFileFactoryTest))
+    SUITE.append(unittest.TestLoader().loadTestsFromTestCase(tht.ThesaurusTest))
 
     SUITE.append(unittest.TestLoader().loadTestsFromTestCase(opnwt.ReadOperonNetworkTest))
     SUITE.append(unittest.TestLoader().loadTestsFromTestCase(opnwt.GetOperonPairsTest))
@@ -62,6 +78,8 @@ if __name__ == '__main__':
     SUITE.append(unittest.TestLoader().loadTestsFromTestCase(mat.ComputeArrayScoresTest))
 
     SUITE.append(unittest.TestLoader().loadTestsFromTestCase(met.MemeTest))
+    SUITE.append(unittest.TestLoader().loadTestsFromTestCase(met.MemeVersionTest))
+    SUITE.append(unittest.TestLoader().loadTestsFromTestCase(met.MemeStubTest))
 
     SUITE.append(unittest.TestLoader().loadTestsFromTestCase(pt.PssmTest))
     SUITE.append(unittest.TestLoader().loadTestsFromTestCase(ct.CombinerTest))
@@ -70,6 +88,20 @@ if __name__ == '__main__':
     SUITE.append(unittest.TestLoader().loadTestsFromTestCase(se_test.CutoffEnrichmentSetTest))
     SUITE.append(unittest.TestLoader().loadTestsFromTestCase(se_test.SetTypeTest))
     SUITE.append(unittest.TestLoader().loadTestsFromTestCase(se_test.SetEnrichmentComputeClusterScoreTest))
+    SUITE.append(unittest.TestLoader().loadTestsFromTestCase(pst.PersistenceTest))
+    SUITE.append(unittest.TestLoader().loadTestsFromTestCase(pst.AppendLogTest))
+    SUITE.append(unittest.TestLoader().loadTestsFromTestCase(obt.OrganismBundleTest))
+    SUITE.append(unittest.TestLoader().loadTestsFromTestCase(dbt.DatabaseMigrationTest))
+    SUITE.append(unittest.TestLoader().loadTestsFromTestCase(debug_test.WriteIterationTest))
+    SUITE.append(unittest.TestLoader().loadTestsFromTestCase(mst.MembershipStoreTest))
+    SUITE.append(unittest.TestLoader().loadTestsFromTestCase(cpt.CheckpointTest))
+    SUITE.append(unittest.TestLoader().loadTestsFromTestCase(cpt.ResumeTest))
+    SUITE.append(unittest.TestLoader().loadTestsFromTestCase(it.InstrumentationTest))
+    SUITE.append(unittest.TestLoader().loadTestsFromTestCase(bscm_test.BackgroundSamplingTest))
+    SUITE.append(unittest.TestLoader().loadTestsFromTestCase(bscm_test.BackgroundStoreTest))
+    SUITE.append(unittest.TestLoader().loadTestsFromTestCase(bscm_test.GetPvalsTest))
+    SUITE.append(unittest.TestLoader().loadTestsFromTestCase(webapp_test.RatiosTest))
+    SUITE.append(unittest.TestLoader().loadTestsFromTestCase(webapp_test.LRUCacheTest))
 
     # web based tests
     SUITE.append(unittest.TestLoader().loadTestsFromTestCase(
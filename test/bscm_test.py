@@ -0,0 +1,143 @@
+"""bscm_test.py - unit test module for BSCM module
+
+This file is part of cMonkey Python. Please see README and LICENSE for
+more information and licensing details.
+"""
+import unittest
+import shutil
+import tempfile
+import numpy as np
+
+import cmonkey.BSCM as BSCM
+import cmonkey.datamatrix as dm
+
+
+class BackgroundSamplingTest(unittest.TestCase):
+    """Test class for the BSCM background sampling"""
+
+    def test_sample_without_replacement(self):
+        """each row of the sample is drawn without replacement"""
+        rng = np.random.default_rng(42)
+        values = np.arange(10, dtype='float64')
+        perm = np.tile(np.arange(10), (50, 1))
+        for _ in range(3):
+            variances = BSCM.sampleVariances(values, perm, 4, rng)
+            for row in range(50):
+                self.assertEquals(10, len(set(perm[row])))
+                self.assertAlmostEquals(np.var(values[perm[row, :4]]), variances[row])
+
+    def test_sample_all(self):
+        """sampling all values always returns the variance of all values"""
+        rng = np.random.default_rng(42)
+        values = np.array([1.0, 2.0, 4.0, 8.0])
+        perm = np.tile(np.arange(4), (5, 1))
+        variances = BSCM.sampleVariances(values, perm, 4, rng)
+        self.assertTrue(np.allclose(np.var(values), variances))
+
+    def test_variance_background(self):
+        """the background converges to the expected mean of the sample variance"""
+        values = np.random.RandomState(0).randn(500)
+        values[[3, 17]] = np.nan
+        result = BSCM.getVarianceMeanSDvect(values, 10, tolerance=0.001, chunkSize=100, seed=1)
+        self.assertEquals(0, len(result) % 100)
+        self.assertFalse(np.any(np.isnan(result)))
+        expected = np.nanvar(values) * 9.0 / 10.0
+        self.assertTrue(abs(result.mean() - expected) < 0.05 * expected)
+
+    def test_variance_background_reproducible(self):
+        values = np.random.RandomState(0).randn(100)
+        result1 = BSCM.getVarianceMeanSDvect(values, 5, chunkSize=50, seed=7)
+        result2 = BSCM.getVarianceMeanSDvect(values, 5, chunkSize=50, seed=7)
+        self.assertTrue(np.array_equal(result1, result2))
+
+    def test_too_few_values(self):
+        result = BSCM.getVarianceMeanSDvect([1.0, np.nan, 2.0], 3)
+        self.assertTrue(np.isnan(result[0]))
+        result = BSCM.getVarianceMeanSDvect([1.0, 2.0, 3.0], 1)
+        self.assertTrue(np.isnan(result[0]))
+
+
+class BackgroundStoreTest(unittest.TestCase):
+    """Test class for the on-disk background store"""
+
+    def setUp(self):
+        self.dirpath = tempfile.mkdtemp()
+        values = np.random.RandomState(0).randn(20, 2)
+        self.ratios = dm.DataMatrix(20, 2, ['G%d' % i for i in range(20)], ['C1', 'C2'],
+                                    values=values)
+
+    def tearDown(self):
+        shutil.rmtree(self.dirpath)
+
+    def test_put_get(self):
+        store = BSCM.BackgroundStore(self.dirpath, self.ratios)
+        self.assertIsNone(store.get('C1', 3, 0.001, False))
+        store.put('C1', 3, 0.001, False, np.array([0.5, 0.25]))
+        background = store.get('C1', 3, 0.001, False)
+        self.assertEquals(np.float32, background.dtype)
+        self.assertTrue(np.array_equal([0.5, 0.25], background))
+        self.assertIsNone(store.get('C1', 3, 0.01, False))
+        self.assertIsNone(store.get('C2', 3, 0.001, False))
+
+        store.put('C1', 3, 0.001, True, (3.0, 0.5, 1.5))
+        self.assertEquals((3.0, 0.5, 1.5), store.get('C1', 3, 0.001, True))
+
+    def test_different_ratios(self):
+        """backgrounds are not shared between different ratios matrices"""
+        BSCM.BackgroundStore(self.dirpath, self.ratios).put('C1', 3, 0.001, False, [1.0])
+        ratios = dm.DataMatrix(20, 2, self.ratios.row_names, self.ratios.column_names,
+                               values=self.ratios.values * 2.0)
+        self.assertIsNone(BSCM.BackgroundStore(self.dirpath, ratios).get('C1', 3, 0.001, False))
+
+    def test_get_pvals_uses_store(self):
+        """getPvals stores computed backgrounds and reuses stored ones"""
+        store = BSCM.BackgroundStore(self.dirpath, self.ratios)
+        genes = ['G1', 'G2', 'G3']
+        bscm = BSCM.BSCM(self.ratios, maxTime=1, chunkSize=20, store=store)
+        bscm.getPvals(genes)
+        self.assertTrue(np.array_equal(bscm.allVars['C1']['3'], store.get('C1', 3, 0.001, False)))
+
+        # replace the background, so we can tell that a new BSCM loaded it
+        store.put('C1', 3, 0.001, False, np.full(10, 1000.0))
+        store.put('C2', 3, 0.001, False, np.zeros(10))
+        pvals = BSCM.BSCM(self.ratios, maxTime=1, chunkSize=20, store=store).getPvals(genes)
+        self.assertEquals(0.0, pvals['C1'])
+        self.assertEquals(1.0, pvals['C2'])
+
+
+class GetPvalsTest(unittest.TestCase):
+    """Test class for the BSCM p-value computation"""
+
+    def setUp(self):
+        values = np.random.RandomState(0).randn(20, 3)
+        values[2, 0] = np.nan
+        values[5, 1] = np.nan
+        self.ratios = dm.DataMatrix(20, 3, ['G%d' % i for i in range(20)], ['C1', 'C2', 'C3'],
+                                    values=values)
+
+    def test_pvals(self):
+        """p-values match a direct computation on the backgrounds"""
+        genes = ['G1', 'G2', 'G5', 'G7', 'G11', 'unknown']
+        bscm = BSCM.BSCM(self.ratios, maxTime=1, chunkSize=50)
+        pvals = bscm.getPvals(genes)
+        for col, cn in enumerate(self.ratios.column_names):
+            column = self.ratios.values[[1, 2, 5, 7, 11], col]
+            column = column[~np.isnan(column)]
+            background = bscm.allVars[cn][str(len(column))]
+            self.assertTrue(np.all(background[1:] >= background[:-1]))
+            self.assertAlmostEquals(np.mean(background < np.var(column)), pvals[cn])
+        self.assertEquals(['4', '4', '5'], [list(bscm.allVars[cn].keys())[0]
+                                            for cn in self.ratios.column_names])
+
+    def test_single_gene(self):
+        """clusters with less than 2 values in a column have a p-value of 1"""
+        pvals = BSCM.BSCM(self.ratios, maxTime=1, chunkSize=50).getPvals(['G2'])
+        self.assertEquals({'C1': 1, 'C2': 1, 'C3': 1}, pvals)
+
+    def test_pool_reuse(self):
+        bscm = BSCM.BSCM(self.ratios)
+        try:
+            pool = bscm.getPool(2)
+            self.assertTrue(pool is bscm.getPool(2))
+        finally:
+            bscm.close()
@@ -0,0 +1,185 @@
+"""checkpoint_test.py - unit test module for checkpoint module
+
+This file is part of cMonkey Python. Please see README and LICENSE for
+more information and licensing details.
+"""
+import unittest
+import os
+import random
+import shutil
+import struct
+import sys
+import tempfile
+import numpy as np
+
+import cmonkey.checkpoint as checkpoint
+import cmonkey.cmonkey_run as cmonkey_run
+import cmonkey.config as config
+import cmonkey.database as cm2db
+import cmonkey.scoring as scoring
+import cmonkey.membership as memb
+import cmonkey.datamatrix as dm
+
+CONFIG_PARAMS = {
+    'memb.clusters_per_row': 2,
+    'memb.clusters_per_col': 2,
+    'num_clusters': 2,
+    'output_dir': None
+}
+
+
+class DummyScoringFunction(scoring.ScoringFunctionBase):
+    """a scoring function that only holds a result"""
+    def __init__(self, id, membership, ratios, config_params):
+        scoring.ScoringFunctionBase.__init__(self, id, None, membership, ratios,
+                                             config_params=config_params)
+
+
+class CheckpointTest(unittest.TestCase):
+    """Test class for checkpoints"""
+
+    def setUp(self):
+        self.outdir = tempfile.mkdtemp()
+        self.config_params = dict(CONFIG_PARAMS)
+        self.config_params['output_dir'] = self.outdir
+        self.ratios = dm.DataMatrix(3, 2, ['R1', 'R2', 'R3'], ['C1', 'C2'],
+                                    values=[[1.0, 2.0], [3.0, 4.0], [5.0, 6.0]])
+        self.membership = memb.OrigMembership(['R1', 'R2', 'R3'], ['C1', 'C2'],
+                                              {'R1': [1], 'R2': [1, 2], 'R3': [2]},
+                                              {'C1': [1, 2], 'C2': [1]},
+                                              self.config_params)
+
+    def tearDown(self):
+        shutil.rmtree(self.outdir)
+
+    def make_scoring(self):
+        row_scoring = scoring.ScoringFunctionCombiner(
+            None, self.membership,
+            [DummyScoringFunction('Rows', self.membership, self.ratios, self.config_params),
+             DummyScoringFunction('Other', self.membership, self.ratios, self.config_params)],
+            config_params=self.config_params)
+        column_scoring = DummyScoringFunction('Columns', self.membership, self.ratios,
+                                              self.config_params)
+        return row_scoring, column_scoring
+
+    def test_write_read(self):
+        """the state and iteration survive a round trip"""
+        path = checkpoint.checkpoint_path(self.outdir)
+        self.assertIsNone(checkpoint.read_iteration(path))
+        checkpoint.write_checkpoint(path, 42, {'key': [1, 2, 3]})
+        self.assertEquals(42, checkpoint.read_iteration(path))
+        iteration, state = checkpoint.read_checkpoint(path)
+        self.assertEquals(42, iteration)
+        self.assertEquals({'key': [1, 2, 3]}, state)
+        self.assertFalse(os.path.exists(path + '.tmp'))
+
+    def test_unsupported_version(self):
+        """checkpoints of other format versions are rejected"""
+        path = checkpoint.checkpoint_path(self.outdir)
+        with open(path, 'wb') as outfile:
+            outfile.write(checkpoint.MAGIC)
+            outfile.write(struct.pack(checkpoint.HEADER_FORMAT, checkpoint.FORMAT_VERSION + 1, 1))
+        self.assertRaises(Exception, checkpoint.read_checkpoint, path)
+
+    def test_not_a_checkpoint(self):
+        path = checkpoint.checkpoint_path(self.outdir)
+        with open(path, 'wb') as outfile:
+            outfile.write(b'something else')
+        self.assertRaises(Exception, checkpoint.read_iteration, path)
+
+    def test_restore(self):
+        """memberships, scoring results and random states are restored"""
+        row_scoring, column_scoring = self.make_scoring()
+        rows_result = dm.DataMatrix(3, 2, values=[[1.0, 2.0], [3.0, 4.0], [5.0, 6.0]])
+        row_scoring.scoring_functions[0].store_result(rows_result)
+        random.seed(17)
+        state = checkpoint.make_state(self.membership, row_scoring, column_scoring)
+        expected_random = random.random()
+
+        path = checkpoint.checkpoint_path(self.outdir)
+        checkpoint.write_checkpoint(path, 3, state)
+        random.random()
+        _, state = checkpoint.read_checkpoint(path)
+
+        membership = checkpoint.make_membership(state, self.ratios, self.config_params)
+        self.assertEquals({'R1', 'R2'}, membership.rows_for_cluster(1))
+        self.assertEquals({'C1'}, membership.columns_for_cluster(2))
+
+        row_scoring, column_scoring = self.make_scoring()
+        checkpoint.restore_state(state, row_scoring, column_scoring)
+        self.assertTrue(np.array_equal(rows_result.values,
+                                       row_scoring.scoring_functions[0].last_cached().values))
+        self.assertIsNone(row_scoring.scoring_functions[1].last_cached())
+        self.assertIsNone(column_scoring.last_cached())
+        self.assertEquals(expected_random, random.random())
+
+    def test_restore_other_matrix(self):
+        """a checkpoint can't be restored for a different input matrix"""
+        row_scoring, column_scoring = self.make_scoring()
+        state = checkpoint.make_state(self.membership, row_scoring, column_scoring)
+        ratios = dm.DataMatrix(2, 2, ['R1', 'R2'], ['C1', 'C2'])
+        self.assertRaises(Exception, checkpoint.make_membership, state, ratios,
+                          self.config_params)
+
+
+class ResumeTest(unittest.TestCase):
+    """Test class for resuming a run from its checkpoint"""
+
+    def setUp(self):
+        self.workdir = tempfile.mkdtemp()
+        self.outdir = os.path.join(self.workdir, 'out')
+        self.ratios_path = os.path.join(self.workdir, 'ratios.tsv')
+        random_state = np.random.RandomState(42)
+        genes = ['G%d' % index for index in range(30)]
+        conds = ['C%d' % index for index in range(8)]
+        ratios = dm.DataMatrix(30, 8, genes, conds, values=random_state.normal(size=(30, 8)))
+        ratios.write_tsv_file(self.ratios_path, compressed=False)
+        self.config_path = os.path.join(self.workdir, 'resume.ini')
+        with open(self.config_path, 'w') as outfile:
+            outfile.write('[General]\n')
+            outfile.write('checkpoint_frequency = 2\n')
+            outfile.write('organism_bundle = False\n')
+
+    def tearDown(self):
+        shutil.rmtree(self.workdir)
+
+    def make_run(self, *args):
+        """creates a gene expression-only run of 2 iterations through the
+        regular configuration"""
+        argv = ['cmonkey2', self.ratios_path, '--organism', 'syn', '--out', self.outdir,
+                '--cachedir', os.path.join(self.workdir, 'cache'), '--nomotifs', '--nonetworks',
+                '--numclusters', '3', '--num_iterations', '2', '--config', self.config_path]
+        orig_argv = sys.argv
+        sys.argv = argv + list(args)
+        try:
+            _, params, ratios = config.setup()
+        finally:
+            sys.argv = orig_argv
+        # use the dummy organism
+        params['organism_code'] = None
+        params['multiprocessing'] = False
+        return cmonkey_run.CMonkeyRun(ratios, params)
+
+    def test_resume_last_iteration(self):
+        """a run interrupted after the checkpoint of the last iteration only
+        runs the post processing when resumed"""
+        run = self.make_run()
+        run.config_params['postadjust'] = False
+        run.prepare_run()
+        run.run_iterations()
+        self.assertEquals(2, checkpoint.read_iteration(checkpoint.checkpoint_path(self.outdir)))
+
+        run = self.make_run('--resume')
+        run.config_params['postadjust'] = True
+        run.prepare_run()
+        self.assertEquals(3, run.config_params['start_iteration'])
+        run.run_iterations()
+
+        session = cm2db.make_session(cm2db.make_sqlite_url(os.path.join(self.outdir,
+                                                                        'cmonkey_run.db')))
+        try:
+            self.assertEquals(2, session.query(cm2db.RunInfo).first().last_iteration)
+            self.assertEquals(3, session.query(cm2db.ClusterStat).filter(
+                cm2db.ClusterStat.iteration == 3).count())
+        finally:
+            session.close()
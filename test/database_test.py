@@ -0,0 +1,72 @@
+"""database_test.py - unit test module for database module
+
+This file is part of cMonkey Python. Please see README and LICENSE for
+more information and licensing details.
+"""
+import unittest
+import os
+import shutil
+import tempfile
+import sqlite3
+from sqlalchemy import inspect
+
+import cmonkey.database as cm2db
+
+
+class DatabaseMigrationTest(unittest.TestCase):
+    """Test class for upgrading existing result databases"""
+
+    def setUp(self):
+        self.outdir = tempfile.mkdtemp()
+        self.dbpath = os.path.join(self.outdir, 'cmonkey_run.db')
+
+    def tearDown(self):
+        shutil.rmtree(self.outdir)
+
+    def __index_names(self, engine, table):
+        return {index['name'] for index in inspect(engine).get_indexes(table)}
+
+    def test_new_database(self):
+        """a new database has the composite indexes"""
+        engine = cm2db.make_engine(cm2db.make_sqlite_url(self.dbpath))
+        self.assertTrue('ix_cluster_stats_iteration_cluster' in
+                        self.__index_names(engine, 'cluster_stats'))
+        self.assertTrue('ix_motif_pssm_rows_motif_info_id' in
+                        self.__index_names(engine, 'motif_pssm_rows'))
+        engine.dispose()
+
+    def test_upgrade_existing_database(self):
+        """indexes are added to tables that already exist"""
+        conn = sqlite3.connect(self.dbpath)
+        conn.execute('create table column_members (rowid integer primary key, iteration int, cluster int, order_num int)')
+        conn.execute('insert into column_members (iteration, cluster, order_num) values (1, 2, 3)')
+        conn.commit()
+        conn.close()
+
+        engine = cm2db.make_engine(cm2db.make_sqlite_url(self.dbpath))
+        cm2db.upgrade_database(engine)
+        self.assertEquals({'ix_column_members_iteration', 'ix_column_members_cluster',
+                           'ix_column_members_iteration_cluster'},
+                          self.__index_names(engine, 'column_members'))
+        cm2db.optimize_database(engine, vacuum=True)
+        engine.dispose()
+
+        session = cm2db.make_session(cm2db.make_sqlite_url(self.dbpath))
+        try:
+            self.assertEquals(1, session.query(cm2db.ColumnMember).count())
+        finally:
+            session.close()
+
+    def test_session_does_not_upgrade(self):
+        """opening a session leaves the indexes of existing tables alone"""
+        conn = sqlite3.connect(self.dbpath)
+        conn.execute('create table column_members (rowid integer primary key, iteration int, cluster int, order_num int)')
+        conn.commit()
+        conn.close()
+
+        session = cm2db.make_session(cm2db.make_sqlite_url(self.dbpath))
+        try:
+            self.assertEquals(0, session.query(cm2db.ColumnMember).count())
+            self.assertEquals(set(), self.__index_names(session.get_bind(), 'column_members'))
+        finally:
+            session.close()
@@ -9,6 +9,7 @@ import cmonkey.datamatrix as dm
 import numpy as np
 import cmonkey.util as util
 import os
+import shutil
 import pandas
 
 
@@ -389,6 +390,58 @@ class DataMatrixReadWriteTest(unittest.TestCase):  # pylint: disable-msg=R0904
         self.assertAlmostEquals(ratios.values[0][0], 1.0)
 
 
+class RatiosCacheTest(unittest.TestCase):  # pylint: disable-msg=R0904
+    """Test class for the binary ratios cache"""
+    CACHE_DIR = '/tmp/cm_ratios_cache'
+
+    def tearDown(self):
+        if os.path.exists(self.CACHE_DIR):
+            shutil.rmtree(self.CACHE_DIR)
+
+    def test_wrap_without_copy(self):
+        values = np.array([[1.0, 2.0], [3.0, 4.0]])
+        matrix = dm.DataMatrix(2, 2, values=values, copy=False)
+        self.assertTrue(matrix.values is values)
+        matrix = dm.DataMatrix(2, 2, values=values)
+        self.assertFalse(matrix.values is values)
+
+    def test_write_read_binary(self):
+        ratios = dm.create_from_csv('testdata/row_scores_testratios.tsv')
+        path = os.path.join(self.CACHE_DIR, 'ratios.npy')
+        dm.write_binary_file(ratios, path)
+        mapped = dm.read_binary_file(path)
+        self.assertTrue(isinstance(mapped.values, np.memmap))
+        self.assertFalse(mapped.values.flags.writeable)
+        self.assertEquals(ratios.row_names, mapped.row_names)
+        self.assertEquals(ratios.column_names, mapped.column_names)
+        self.assertTrue(np.array_equal(ratios.values, mapped.values, equal_nan=True))
+
+    def test_create_from_csv_cached(self):
+        filters = [dm.nochange_filter, dm.center_scale_filter]
+        ratios = dm.create_from_csv('testdata/row_scores_testratios.tsv', filters=filters)
+        cached1 = dm.create_from_csv('testdata/row_scores_testratios.tsv', filters=filters,
+                                     cache_dir=self.CACHE_DIR)
+        self.assertEquals(1, len(os.listdir(os.path.join(self.CACHE_DIR, 'ratios'))) // 2)
+        cached2 = dm.create_from_csv('testdata/row_scores_testratios.tsv', filters=filters,
+                                     cache_dir=self.CACHE_DIR)
+        for cached in [cached1, cached2]:
+            self.assertTrue(isinstance(cached.values, np.memmap))
+            self.assertEquals(ratios.row_names, cached.row_names)
+            self.assertEquals(ratios.column_names, cached.column_names)
+            self.assertTrue(np.array_equal(ratios.values, cached.values, equal_nan=True))
+
+        # different settings result in a separate cache entry
+        dm.create_from_csv('testdata/row_scores_testratios.tsv', cache_dir=self.CACHE_DIR)
+        self.assertEquals(2, len(os.listdir(os.path.join(self.CACHE_DIR, 'ratios'))) // 2)
+
+    def test_create_from_csv_float32(self):
+        ratios = dm.create_from_csv('testdata/row_scores_testratios.tsv')
+        ratios32 = dm.create_from_csv('testdata/row_scores_testratios.tsv',
+                                      cache_dir=self.CACHE_DIR, dtype=np.float32)
+        self.assertEquals(np.float32, ratios32.values.dtype)
+        self.assertTrue(np.allclose(ratios.values, ratios32.values, equal_nan=True))
+
+
 class CenterScaleFilterTest(unittest.TestCase):  # pylint: disable-msg=R0904
     """Test class for center_median_filter"""
 
@@ -403,6 +456,66 @@ class CenterScaleFilterTest(unittest.TestCase):  # pylint: disable-msg=R0904
 
 
 
+def reference_nochange_filter(dataframe):
+    """cell by cell version of nochange_filter to compare against"""
+    values = dataframe.values
+    rows = [row for row in range(values.shape[0])
+            if float(len([value for value in values[row]
+                          if np.isnan(value) or abs(value) <= dm.ROW_THRESHOLD])) /
+            values.shape[1] < dm.FILTER_THRESHOLD]
+    cols = [col for col in range(values.shape[1])
+            if float(len([value for value in values[:, col]
+                          if np.isnan(value) or abs(value) <= dm.COLUMN_THRESHOLD])) /
+            values.shape[0] < dm.FILTER_THRESHOLD]
+    result = np.zeros((len(rows), len(cols)))
+    for row_index, row in enumerate(rows):
+        for col_index, col in enumerate(cols):
+            result[row_index, col_index] = values[row, col]
+    return pandas.DataFrame(result, [dataframe.index[row] for row in rows],
+                            [dataframe.columns[col] for col in cols])
+
+
+def reference_center_scale_filter(dataframe):
+    """row by row version of center_scale_filter to compare against"""
+    def center_scale(row):
+        filtered = row[np.isfinite(row)]
+        center = np.median(filtered)
+        scale = util.r_stddev(filtered)
+        return [((value - center) / scale) if not np.isnan(value) else value for value in row]
+    return dm.row_filter(dataframe, center_scale)
+
+
+class RatiosFilterTest(unittest.TestCase):  # pylint: disable-msg=R0904
+    """the vectorized ratio filters return the same results as the reference
+    implementations on real data"""
+
+    def setUp(self):  # pylint: disable-msg=C0103
+        self.dataframes = [pandas.read_csv(path, index_col=0, sep='\t')
+                           for path in ['testdata/simple_ratios.tsv',
+                                        'testdata/row_scores_testratios.tsv']]
+        df = pandas.read_csv('testdata/acc_rnaseq.tsv.gz', index_col=0, sep='\t')
+        df = np.log2(df.iloc[:1000] + 1.0)
+        df.iloc[3, 2] = np.inf
+        df.iloc[7, 1:] = np.nan
+        df.iloc[8, :] = 0.01
+        self.dataframes.append(df)
+
+    def test_nochange_filter(self):
+        for df in self.dataframes:
+            expected = reference_nochange_filter(df)
+            filtered = dm.nochange_filter(df)
+            self.assertEquals(list(expected.index), list(filtered.index))
+            self.assertEquals(list(expected.columns), list(filtered.columns))
+            self.assertTrue(np.array_equal(expected.values, filtered.values, equal_nan=True))
+
+    def test_center_scale_filter(self):
+        for df in self.dataframes:
+            expected = reference_center_scale_filter(df)
+            filtered = dm.center_scale_filter(df)
+            self.assertEquals(list(expected.index), list(filtered.index))
+            self.assertTrue(np.array_equal(expected.values, filtered.values, equal_nan=True))
+
+
 def as_sorted_flat_values(matrices):
     """this method is now inlined into quantile_normalize_scores
     we keep it here with its tests to demonstrate how it works
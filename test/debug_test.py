@@ -0,0 +1,55 @@
+"""debug_test.py - unit test module for debug module
+
+This file is part of cMonkey Python. Please see README and LICENSE for
+more information and licensing details.
+"""
+import unittest
+import io
+import os
+import shutil
+import tempfile
+
+import cmonkey.debug as debug
+import cmonkey.database as cm2db
+
+
+class WriteIterationTest(unittest.TestCase):
+    """Test class for write_iteration"""
+
+    def setUp(self):
+        self.outdir = tempfile.mkdtemp()
+        self.session = cm2db.make_session(cm2db.make_sqlite_url(
+            os.path.join(self.outdir, 'cmonkey_run.db')))
+        session = self.session
+        session.add_all([cm2db.RowName(order_num=i, name='G%d' % i) for i in range(3)])
+        session.add_all([cm2db.ColumnName(order_num=i, name='C%d' % i) for i in range(2)])
+        string_type = cm2db.StatsType(category='network', name='STRING')
+        session.add(string_type)
+        session.commit()
+        session.add_all([cm2db.RowMember(iteration=2, cluster=1, order_num=2),
+                         cm2db.RowMember(iteration=2, cluster=1, order_num=0),
+                         cm2db.RowMember(iteration=2, cluster=2, order_num=1),
+                         cm2db.RowMember(iteration=1, cluster=2, order_num=2),
+                         cm2db.ColumnMember(iteration=2, cluster=1, order_num=1),
+                         cm2db.ColumnMember(iteration=2, cluster=2, order_num=0),
+                         cm2db.ClusterStat(iteration=2, cluster=1, num_rows=2, num_cols=1,
+                                           residual=0.5),
+                         cm2db.IterationStat(statstype=string_type.rowid, iteration=2,
+                                             score=0.25)])
+        session.commit()
+        with open(os.path.join(self.outdir, 'meme-out-0002-0001'), 'w') as outfile:
+            outfile.write('line1\nline2\n')
+
+    def tearDown(self):
+        self.session.close()
+        shutil.rmtree(self.outdir)
+
+    def test_write_iteration(self):
+        """all clusters are written, missing statistics are set to 1.0"""
+        outfile = io.StringIO()
+        debug.write_iteration(self.session, outfile, 2, 2, self.outdir, as_binary=False)
+        lines = outfile.getvalue().split('\n')
+        self.assertEquals(4, len(lines))
+        self.assertEquals('"C1"\t0.250000\t1\t1.000000\t"line1<<<<>>>>line2<<<<>>>>"\t0.500000\t"G2,G0"',
+                          lines[1])
+        self.assertEquals('"C0"\t0.250000\t2\t1.000000\t""\t1.000000\t"G1"', lines[2])
@@ -0,0 +1,167 @@
+"""instrumentation_test.py - unit test module for instrumentation module
+
+This file is part of cMonkey Python. Please see README and LICENSE for
+more information and licensing details.
+"""
+import unittest
+import os
+import shutil
+import tempfile
+import pstats
+import numpy as np
+
+import cmonkey.instrumentation as instrumentation
+import cmonkey.persistence as persistence
+import cmonkey.datamatrix as dm
+
+
+def spanned_square(value):
+    with instrumentation.span('square'):
+        return value * value
+
+
+class InstrumentationTest(unittest.TestCase):
+    """Test class for the instrumentation module"""
+
+    def setUp(self):
+        self.outdir = tempfile.mkdtemp()
+        instrumentation.SPANS.take()
+
+    def tearDown(self):
+        shutil.rmtree(self.outdir)
+        instrumentation.enable_memory_sampling(False)
+        instrumentation.SPANS.take()
+        instrumentation.SPANS.take_gauges()
+
+    def test_span(self):
+        """the calls and durations of spans with the same name are added up"""
+        with instrumentation.span('fuzzify'):
+            pass
+        with instrumentation.span('fuzzify'):
+            pass
+        instrumentation.SPANS.add('combine', 0.5)
+        spans = instrumentation.SPANS.take()
+        self.assertEquals(['combine', 'fuzzify'], sorted(spans.keys()))
+        self.assertEquals([1, 0.5], spans['combine'])
+        self.assertEquals(2, spans['fuzzify'][0])
+        self.assertEquals({}, instrumentation.SPANS.take())
+
+    def test_span_exception(self):
+        """a span is recorded when its block raises an exception"""
+        try:
+            with instrumentation.span('meme'):
+                raise Exception('meme failed')
+        except Exception:
+            pass
+        self.assertEquals(1, instrumentation.SPANS.take()['meme'][0])
+
+    def test_instrumented(self):
+        """an instrumented function returns only the spans of its call, they
+        are added to the table by merge_results()"""
+        instrumentation.SPANS.add('combine', 0.5)
+        results = [instrumentation.Instrumented(spanned_square)(value) for value in [2, 3]]
+        self.assertEquals([4, 9], [result for result, _ in results])
+        self.assertEquals(['square'], list(results[0][1].keys()))
+        self.assertEquals(['combine'], list(instrumentation.SPANS.take().keys()))
+
+        instrumentation.SPANS.add('combine', 0.5)
+        self.assertEquals([4, 9], instrumentation.merge_results(results))
+        spans = instrumentation.SPANS.take()
+        self.assertEquals(2, spans['square'][0])
+        self.assertEquals([1, 0.5], spans['combine'])
+
+    def test_metrics_table(self):
+        """the spans of an iteration are written to the metrics table and read back"""
+        log = persistence.AppendLog(os.path.join(self.outdir, instrumentation.METRICS_FILE),
+                                    instrumentation.METRICS_HEADER)
+        for iteration, seconds in [(1, 0.25), (2, 0.5)]:
+            for row in instrumentation.metric_rows(iteration, {'fuzzify': [2, seconds]}):
+                log.write_row(row)
+        log.close()
+        path = os.path.join(self.outdir, instrumentation.METRICS_FILE)
+        self.assertEquals({'fuzzify': [(1, 0.25), (2, 0.5)]},
+                          instrumentation.read_metrics(path, 'seconds'))
+        self.assertEquals({'fuzzify': [(1, 2.0), (2, 2.0)]},
+                          instrumentation.read_metrics(path, 'calls'))
+
+    def test_cpu_profile(self):
+        """the profile statistics can be read with pstats"""
+        path = os.path.join(self.outdir, 'cpuprofile-0001.prof')
+        with instrumentation.cpu_profile(path):
+            spanned_square(3)
+        stats = pstats.Stats(path)
+        self.assertTrue(any(function[2] == 'spanned_square' for function in stats.stats))
+
+    def test_gauge(self):
+        """gauges keep the maximum sample"""
+        instrumentation.SPANS.gauge('iteration', 'rss_mb', 12.0)
+        instrumentation.SPANS.gauge('iteration', 'rss_mb', 10.0)
+        instrumentation.SPANS.gauge('iteration', 'rss_mb', None)
+        self.assertEquals({'iteration': {'rss_mb': 12.0}}, instrumentation.SPANS.take_gauges())
+        self.assertEquals({}, instrumentation.SPANS.take_gauges())
+
+    def test_metric_rows_gauges(self):
+        """gauges are written after the spans"""
+        rows = instrumentation.metric_rows(3, {'fuzzify': [1, 0.5]},
+                                           {'membership': {'nbytes_mb': 2.0}})
+        self.assertEquals([(3, 'fuzzify', 'calls', 1), (3, 'fuzzify', 'seconds', '0.500000'),
+                           (3, 'membership', 'nbytes_mb', '2.000000')], rows)
+
+    def test_memory_sampling(self):
+        """memory is only sampled if sampling is turned on"""
+        matrix = dm.DataMatrix(256, 512, values=np.ones((256, 512)))
+        self.assertEquals(256 * 512 * 8, matrix.nbytes)
+        instrumentation.record_nbytes('score:Rows', matrix)
+        with instrumentation.span('fuzzify'):
+            pass
+        self.assertEquals({}, instrumentation.SPANS.take_gauges())
+
+        instrumentation.enable_memory_sampling()
+        instrumentation.record_nbytes('score:Rows', matrix)
+        with instrumentation.span('fuzzify'):
+            pass
+        gauges = instrumentation.SPANS.take_gauges()
+        self.assertEquals(1.0, gauges['score:Rows']['nbytes_mb'])
+        if instrumentation.process_rss() is not None:
+            self.assertTrue(gauges['fuzzify']['rss_mb'] > 0)
+
+    def test_trace_allocations(self):
+        """spans record their allocations while tracing, the top
+        allocation sites are recorded at the end"""
+        instrumentation.enable_memory_sampling()
+        with instrumentation.trace_allocations():
+            with instrumentation.span('allocate'):
+                values = [list(range(100)) for _ in range(1000)]
+        gauges = instrumentation.SPANS.take_gauges()
+        self.assertTrue(gauges['allocate']['traced_mb'] > 0)
+        self.assertTrue(gauges['tracemalloc']['peak_traced_mb'] > 0)
+        self.assertTrue(any(name.startswith('alloc:instrumentation_test.py:')
+                            for name in gauges))
+        self.assertEquals(1000, len(values))
+
+    def test_trace_allocations_without_tracemalloc(self):
+        """without tracemalloc, spans only record their time and memory"""
+        tracemalloc = instrumentation.tracemalloc
+        instrumentation.tracemalloc = None
+        try:
+            instrumentation.enable_memory_sampling()
+            with instrumentation.trace_allocations():
+                with instrumentation.span('allocate'):
+                    pass
+        finally:
+            instrumentation.tracemalloc = tracemalloc
+        gauges = instrumentation.SPANS.take_gauges()
+        self.assertFalse('tracemalloc' in gauges)
+        self.assertFalse('traced_mb' in gauges.get('allocate', {}))
+        self.assertEquals(1, instrumentation.SPANS.take()['allocate'][0])
+
+    def test_profiled(self):
+        """the block is profiled as requested"""
+        path = os.path.join(self.outdir, 'cpuprofile-0002.prof')
+        with instrumentation.profiled():
+            spanned_square(2)
+        self.assertFalse(os.path.exists(path))
+        with instrumentation.profiled(path, trace_memory=True):
+            spanned_square(2)
+        self.assertTrue(os.path.exists(path))
+        self.assertTrue('tracemalloc' in instrumentation.SPANS.take_gauges())
@@ -0,0 +1,79 @@
+"""membership_store_test.py - unit test module for membership_store module
+
+This file is part of cMonkey Python. Please see README and LICENSE for
+more information and licensing details.
+"""
+import unittest
+import os
+import shutil
+import tempfile
+import numpy as np
+
+import cmonkey.membership_store as mstore
+import cmonkey.membership as memb
+import cmonkey.datamatrix as dm
+import cmonkey.database as cm2db
+import cmonkey.tools.util as tools_util
+
+
+class MembershipStoreTest(unittest.TestCase):
+    """Test class for MembershipStore"""
+
+    def setUp(self):
+        self.outdir = tempfile.mkdtemp()
+        self.store = mstore.MembershipStore(self.outdir)
+        self.row_membs = np.array([[1, 3], [2, 0], [3, 1]], dtype='int32')
+        self.col_membs = np.array([[1, 2, 3], [3, 0, 0]], dtype='int32')
+        self.store.write(4, ['R1', 'R2', 'R3'], ['C1', 'C2'], self.row_membs, self.col_membs)
+        self.store.write(2, ['R1', 'R2', 'R3'], ['C1', 'C2'], self.col_membs, self.col_membs)
+
+    def tearDown(self):
+        shutil.rmtree(self.outdir)
+
+    def test_iterations(self):
+        """the stored iterations are listed in order"""
+        self.assertEquals([2, 4], self.store.iterations())
+        self.assertEquals(4, self.store.last_iteration())
+        self.assertTrue(self.store.has_iteration(2))
+        self.assertFalse(self.store.has_iteration(3))
+        self.assertFalse(self.store.has_iteration(None))
+
+    def test_read(self):
+        """the matrices are stored compactly and read back unchanged"""
+        with np.load(self.store.path_for(4)) as data:
+            self.assertEquals(np.int16, data['row_membs'].dtype)
+        snapshot = self.store.read(4)
+        self.assertEquals(['R1', 'R2', 'R3'], snapshot.row_names)
+        self.assertEquals(['C1', 'C2'], snapshot.col_names)
+        self.assertTrue(np.array_equal(self.row_membs, snapshot.row_membs))
+        self.assertTrue(np.array_equal(self.col_membs, snapshot.col_membs))
+
+    def test_cluster_members(self):
+        """members are grouped by cluster"""
+        rows, cols = self.store.cluster_members(4)
+        self.assertEquals(['R1', 'R3'], rows[1])
+        self.assertEquals(['R2'], rows[2])
+        self.assertEquals(['R1', 'R3'], rows[3])
+        self.assertEquals(['C1', 'C2'], cols[3])
+        self.assertEquals([], cols[4])
+
+    def test_last_iteration(self):
+        """the tools find the last iteration in the snapshots and in the database"""
+        session = cm2db.make_session(cm2db.make_sqlite_url(os.path.join(self.outdir, 'cmonkey_run.db')))
+        try:
+            self.assertEquals(4, tools_util.last_iteration(session, self.outdir))
+            session.add(cm2db.RowMember(iteration=5, cluster=1, order_num=0))
+            session.commit()
+            self.assertEquals(5, tools_util.last_iteration(session, self.outdir))
+        finally:
+            session.close()
+
+    def test_seeders(self):
+        """seeding from a snapshot restores the membership"""
+        matrix = dm.DataMatrix(3, 2, ['R1', 'R2', 'R3'], ['C1', 'C2'])
+        row_membership = [[0, 0] for _ in range(3)]
+        memb.make_snapshot_row_seeder(self.store, 4)(row_membership, matrix)
+        self.assertEquals([[1, 3], [2, 0], [3, 1]], row_membership)
+        col_membership = memb.make_snapshot_column_seeder(self.store, 4)(
+            matrix, row_membership, 3, 3)
+        self.assertEquals([[1, 2, 3], [3, 0, 0]], col_membership)
@@ -5,12 +5,70 @@ This file is part of cMonkey Python. Please see README and LICENSE for
 more information and licensing details.
 """
 import cmonkey.meme as meme
+import cmonkey.seqtools as st
 import unittest
+import os
+import shutil
+import tempfile
+
+
+class MemeVersionTest(unittest.TestCase):  # pylint: disable-msg=R0904
+    """Test class for the MEME version check, uses a fake meme script
+    that counts its invocations"""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.cache_dir = os.path.join(self.tmp_dir, 'cache')
+        self.count_path = os.path.join(self.tmp_dir, 'count')
+        self.meme_path = os.path.join(self.tmp_dir, 'meme')
+        with open(self.meme_path, 'w') as outfile:
+            outfile.write('#!/bin/sh\necho x >> %s\necho 4.11.2\n' % self.count_path)
+        os.chmod(self.meme_path, 0o755)
+        self.old_path = os.environ['PATH']
+        os.environ['PATH'] = self.tmp_dir + os.pathsep + self.old_path
+
+    def tearDown(self):
+        os.environ['PATH'] = self.old_path
+        shutil.rmtree(self.tmp_dir)
+
+    def num_invocations(self):
+        with open(self.count_path) as infile:
+            return len(infile.readlines())
+
+    def test_version_cached(self):
+        self.assertEquals('4.11.2', meme.check_meme_version(self.cache_dir))
+        self.assertEquals('4.11.2', meme.check_meme_version(self.cache_dir))
+        self.assertEquals(1, self.num_invocations())
+
+    def test_version_changed_binary(self):
+        self.assertEquals('4.11.2', meme.check_meme_version(self.cache_dir))
+        stat = os.stat(self.meme_path)
+        os.utime(self.meme_path, (stat.st_atime, stat.st_mtime + 10))
+        self.assertEquals('4.11.2', meme.check_meme_version(self.cache_dir))
+        self.assertEquals(2, self.num_invocations())
+
+    def test_version_no_cache(self):
+        self.assertEquals('4.11.2', meme.check_meme_version())
+        self.assertEquals('4.11.2', meme.check_meme_version())
+        self.assertEquals(2, self.num_invocations())
 
 
 class MemeTest(unittest.TestCase):  # pylint: disable-msg=R0904
     """Test class for Location"""
 
+    def test_remove_low_complexity(self):
+        """masks sequences that are longer than max_width, shorter ones
+        are removed"""
+        meme_suite = meme.MemeSuite({'MEME': {'max_width': 24, 'background_order': 3,
+                                              'use_revcomp': 'True', 'arg_mod': 'zoops'}})
+        seq1 = 'GCTTGCAGGCGCTCGGGTCG' + 'A' * 30 + 'ATCGACGACGAGCGTCGAATCG'
+        seq2 = 'ACGTTGCAACGTTGCAACGTTGCAACGT'
+        seqs = {'F1': (None, seq1), 'F2': seq2, 'F3': 'ACGT'}
+        result = meme_suite.remove_low_complexity(seqs)
+        self.assertEquals({'F1': 'GCTTGCAGGCGCTCGGGTCG' + 'N' * 31 + 'TCGACGACGAGCGTCGAATCG',
+                           'F2': seq2}, result)
+        self.assertEquals(result['F1'], meme.DUST_CACHE[seq1])
+
     def test_read_meme_output(self):
         """tests the read_meme_output function"""
         with open('testdata/meme.out') as inputfile:
@@ -127,5 +185,65 @@ class MemeTest(unittest.TestCase):  # pylint: disable-msg=R0904
         self.assertTrue('NP_280363.1' in annotations)
 
 
+class MemeStubTest(unittest.TestCase):  # pylint: disable-msg=R0904
+    """Runs MemeSuite481 against the stub MEME suite in benchmarks/stubs"""
+
+    def setUp(self):
+        self.old_path = os.environ['PATH']
+        os.environ['PATH'] = (os.path.abspath('benchmarks/stubs') + os.pathsep +
+                              self.old_path)
+        self.meme_suite = meme.MemeSuite481({'MEME': {'max_width': 24, 'background_order': 3,
+                                                      'use_revcomp': 'True',
+                                                      'arg_mod': 'zoops'}})
+        self.bgfile = os.path.abspath('testdata/meme1.bg')
+        with open('testdata/meme_input1.fasta') as infile:
+            self.seqs = st.read_sequences_from_fasta_string(infile.read())
+        self.genes = [name for name, _ in self.seqs[:5]]
+        self.tmp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        os.environ['PATH'] = self.old_path
+        if 'MEME_STUB_VERSION' in os.environ:
+            del os.environ['MEME_STUB_VERSION']
+        shutil.rmtree(self.tmp_dir)
+
+    def run_meme(self):
+        infos, output = self.meme_suite.meme('testdata/meme_input1.fasta', self.bgfile, 2)
+        meme_outfile = os.path.join(self.tmp_dir, 'meme.out')
+        with open(meme_outfile, 'w') as outfile:
+            outfile.write(output)
+        return infos, meme_outfile
+
+    def test_version(self):
+        self.assertEquals('4.8.1', meme.check_meme_version())
+
+    def test_meme(self):
+        infos, _ = self.run_meme()
+        self.assertEquals(2, len(infos))
+        self.assertEquals(12, infos[0].width)
+        self.assertEquals(infos[0].num_sites, len(infos[0].sites))
+        self.assertEquals(12, len(infos[0].pssm))
+
+    def test_mast(self):
+        _, meme_outfile = self.run_meme()
+        pevalues, annotations = self.meme_suite.read_mast_output(
+            self.meme_suite.mast(meme_outfile, 'testdata/meme_input1.fasta', self.bgfile),
+            self.genes)
+        self.assertEquals(len(self.seqs), len(pevalues))
+        pvalues = [pvalue for _, pvalue, _ in pevalues]
+        self.assertEquals(sorted(pvalues), pvalues)
+        self.assertTrue(all(gene in annotations for gene in self.genes))
+
+    def test_mast_4_11(self):
+        _, meme_outfile = self.run_meme()
+        mast_output = self.meme_suite.mast(meme_outfile, 'testdata/meme_input1.fasta',
+                                           self.bgfile)
+        os.environ['MEME_STUB_VERSION'] = '4.11.2'
+        mast_output_4_11 = self.meme_suite.mast(meme_outfile, 'testdata/meme_input1.fasta',
+                                                self.bgfile)
+        self.assertEquals(self.meme_suite.read_mast_output(mast_output, self.genes)[0],
+                          self.meme_suite.read_mast_output(mast_output_4_11, self.genes)[0])
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,24 @@
+"""motif_test.py - unit tests for motif module
+
+This file is part of cMonkey Python. Please see README and LICENSE for
+more information and licensing details.
+"""
+import unittest
+import cmonkey.motif as motif
+
+
+class SequenceFilterTest(unittest.TestCase):  # pylint: disable-msg=R0904
+    """Test class for the sequence filters"""
+
+    def test_unique_filter(self):
+        """the first feature in feature_ids with a sequence is kept"""
+        seqs = {'F1': 'ACGT', 'F2': 'ACGT', 'F3': 'GGCC', 'F4': 'TTAA'}
+        self.assertEquals({'F2': 'ACGT', 'F3': 'GGCC'},
+                          motif.unique_filter(seqs, ['F2', 'F1', 'F3', 'F5']))
+
+    def test_remove_atgs_filter(self):
+        """masks 4 positions at the search distance with N's"""
+        atgs_filter = motif.get_remove_atgs_filter((0, 3))
+        seqs = {'F1': 'ACGTACGTAC', 'F2': 'ACGTA', 'F3': 'AC'}
+        self.assertEquals({'F1': 'ACGNNNNTAC', 'F2': 'ACGNNNN', 'F3': 'ACNNNN'},
+                          atgs_filter(seqs, ['F1', 'F2', 'F3']))
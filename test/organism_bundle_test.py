@@ -0,0 +1,97 @@
+"""organism_bundle_test.py - unit tests for organism_bundle module
+
+This file is part of cMonkey Python. Please see README and LICENSE for
+more information and licensing details.
+"""
+import unittest
+import os
+import shutil
+import tempfile
+
+import cmonkey.organism as org
+import cmonkey.organism_bundle as organism_bundle
+import cmonkey.stringdb as stringdb
+from organism_test import MockRsatDatabase, MockMicrobesOnline, SEARCH_DISTANCES, SCAN_DISTANCES
+
+CONFIG_PARAMS = {'organism_code': 'hal', 'use_string': True, 'use_operons': True,
+                 'nonetworks': False, 'string_file': 'testdata/string_links_64091.tab'}
+
+
+def make_microbe(rsat_info, synonyms=None, features=None, operon_mappings=None):
+    return org.Microbe('hal', 'Halobacterium SP', rsat_info, 12345, MockMicrobesOnline(), [],
+                       SEARCH_DISTANCES, SCAN_DISTANCES, synonyms=synonyms, features=features,
+                       operon_mappings=operon_mappings)
+
+
+class OrganismBundleTest(unittest.TestCase):  # pylint: disable-msg=R0904
+    """Test class for organism bundles"""
+
+    def setUp(self):  # pylint: disable-msg=C0103
+        self.cache_dir = tempfile.mkdtemp()
+        self.path = organism_bundle.bundle_path(self.cache_dir, 'hal')
+        self.signature = organism_bundle.source_signature(CONFIG_PARAMS, [CONFIG_PARAMS['string_file']])
+        self.organism = make_microbe(org.RsatSpeciesInfo(MockRsatDatabase(''), 'hal',
+                                                         'Halobacterium_SP', 12345))
+
+    def tearDown(self):  # pylint: disable-msg=C0103
+        shutil.rmtree(self.cache_dir)
+
+    def write_bundle(self):
+        features = self.organism.feature_table()
+        info = {'signature': self.signature,
+                'kegg_species': 'Halobacterium SP', 'rsat_species': 'Halobacterium_SP',
+                'taxonomy_id': 12345, 'thesaurus': self.organism.thesaurus(),
+                'features': features, 'operon_mappings': self.organism.operon_map(),
+                'string_links': stringdb.read_links('hal', CONFIG_PARAMS['string_file'])}
+        organism_bundle.write_bundle(self.path, info,
+                                     {'NC_000915.1': self.organism.contig_sequence('NC_000915.1'),
+                                      'contig2': 'AACCGGTT'})
+
+    def test_read_bundle(self):
+        """bundle contents survive a round trip, contigs are memory-mapped"""
+        self.write_bundle()
+        bundle = organism_bundle.read_bundle(self.path)
+        self.assertEquals(['NC_000915.1', 'contig2'], bundle.contigs())
+        self.assertEquals(self.organism.contig_sequence('NC_000915.1'),
+                          bundle.get_contig_sequence('Halobacterium_SP', 'NC_000915.1'))
+        self.assertEquals('AACCGGTT', bundle.get_contig_sequence('Halobacterium_SP', 'contig2'))
+        self.assertEquals(self.organism.feature_table(), bundle.info['features'])
+        self.assertEquals(('VNG1690G', 'VNG1105G', 1000.0), bundle.info['string_links'][0])
+        self.assertRaises(Exception, bundle.get_contig_sequence, 'Halobacterium_SP', 'contig3')
+
+    def test_organism_from_bundle(self):
+        """an organism created from the bundle returns the same sequences"""
+        self.write_bundle()
+        bundle = organism_bundle.load_bundle(self.path, self.signature)
+        info = bundle.info
+        organism = make_microbe(org.RsatSpeciesInfo(bundle, info['kegg_species'],
+                                                    info['rsat_species'], info['taxonomy_id']),
+                                info['thesaurus'], info['features'], info['operon_mappings'])
+        self.assertEquals(self.organism.sequences_for_genes_scan(['VNG12345G']),
+                          organism.sequences_for_genes_scan(['VNG12345G']))
+        self.assertEquals(self.organism.sequences_for_genes_search(['VNG12345G']),
+                          organism.sequences_for_genes_search(['VNG12345G']))
+
+    def test_load_missing(self):
+        self.assertIsNone(organism_bundle.load_bundle(self.path, self.signature))
+
+    def test_load_stale(self):
+        """bundles built from different sources are not loaded"""
+        self.write_bundle()
+        params = dict(CONFIG_PARAMS)
+        params['use_operons'] = False
+        signature = organism_bundle.source_signature(params, [CONFIG_PARAMS['string_file']])
+        self.assertIsNone(organism_bundle.load_bundle(self.path, signature))
+
+        signature = organism_bundle.source_signature(CONFIG_PARAMS, [self.path])
+        self.assertIsNone(organism_bundle.load_bundle(self.path, signature))
+
+    def test_source_signature_files(self):
+        """the signature changes when an input file changes"""
+        path = os.path.join(self.cache_dir, 'synonyms.csv')
+        with open(path, 'w') as outfile:
+            outfile.write('gene1,alt1')
+        signature = organism_bundle.source_signature(CONFIG_PARAMS, [path, None])
+        with open(path, 'a') as outfile:
+            outfile.write(';alt2')
+        self.assertNotEquals(signature, organism_bundle.source_signature(CONFIG_PARAMS, [path, None]))
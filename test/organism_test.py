@@ -101,6 +101,28 @@ class MicrobeTest(unittest.TestCase):  # pylint: disable-msg=R0904
         self.assertEquals(organism, self.mockFactory.create_called_with)
 
 
+class DictThesaurusOrganism(org.OrganismBase):
+    """an organism whose thesaurus() returns a dictionary"""
+    def __init__(self):
+        org.OrganismBase.__init__(self, 'dict', [])
+        self.synonyms = {'a1': 'G1', 'G1': 'G1', 'G2': 'G2'}
+
+    def thesaurus(self):
+        return self.synonyms
+
+
+class FeatureIdsTest(unittest.TestCase):  # pylint: disable-msg=R0904
+    """Test class for OrganismBase.feature_ids_for"""
+
+    def test_dictionary_thesaurus(self):
+        """a dictionary thesaurus is converted only once"""
+        organism = DictThesaurusOrganism()
+        self.assertEquals(['G1', 'G2'], organism.feature_ids_for(['a1', 'unknown', 'G2']))
+        converted = organism._OrganismBase__converted_thesaurus[1]
+        self.assertEquals(['G1'], organism.feature_ids_for(['G1']))
+        self.assertTrue(converted is organism._OrganismBase__converted_thesaurus[1])
+
+
 class MockNetworkFactory:
     """a mock NetworkFactory"""
     def __init__(self):
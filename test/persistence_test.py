@@ -0,0 +1,185 @@
+"""persistence_test.py - unit test module for persistence module
+
+This file is part of cMonkey Python. Please see README and LICENSE for
+more information and licensing details.
+"""
+import unittest
+import os
+import shutil
+import tempfile
+from datetime import datetime
+
+import cmonkey.persistence as persistence
+import cmonkey.membership as memb
+import cmonkey.datamatrix as dm
+import cmonkey.database as cm2db
+import cmonkey.membership_store as mstore
+
+CONFIG_PARAMS = {
+    'memb.clusters_per_row': 2,
+    'memb.clusters_per_col': 2,
+    'num_clusters': 2,
+    'membership_snapshots': True,
+    'db_url': None,
+    'output_dir': None,
+    'out_database': None
+}
+
+
+class PersistenceTest(unittest.TestCase):
+    """Test class for the result writer"""
+
+    def setUp(self):
+        self.outdir = tempfile.mkdtemp()
+        self.config_params = dict(CONFIG_PARAMS)
+        self.config_params['output_dir'] = self.outdir
+        self.config_params['out_database'] = os.path.join(self.outdir, 'cmonkey_run.db')
+        self.ratios = dm.DataMatrix(3, 2, ['R1', 'R2', 'R3'], ['C1', 'C2'],
+                                    values=[[1.0, 2.0], [3.0, 4.0], [5.0, 6.0]])
+        self.membership = memb.OrigMembership(['R1', 'R2', 'R3'], ['C1', 'C2'],
+                                              {'R1': [1], 'R2': [1, 2], 'R3': [2]},
+                                              {'C1': [1, 2], 'C2': [1]},
+                                              self.config_params)
+        session = cm2db.make_session_from_config(self.config_params)
+        session.add_all([cm2db.RowName(order_num=i, name=name)
+                         for i, name in enumerate(self.ratios.row_names)])
+        session.add_all([cm2db.ColumnName(order_num=i, name=name)
+                         for i, name in enumerate(self.ratios.column_names)])
+        session.add_all([cm2db.StatsType(category='main', name='fuzzy_coeff'),
+                         cm2db.StatsType(category='main', name='median_residual')])
+        session.add(cm2db.RunInfo(start_time=datetime.now(), num_iterations=2,
+                                  num_clusters=2))
+        session.commit()
+        session.close()
+
+    def tearDown(self):
+        shutil.rmtree(self.outdir)
+
+    def test_snapshot_is_a_copy(self):
+        """modifying the membership does not change the snapshot"""
+        snapshot = persistence.MembershipSnapshot(self.membership)
+        self.membership.replace_row_cluster('R1', 0, 2)
+        self.assertEquals({'R1', 'R2'}, snapshot.rows_for_cluster(1))
+        self.assertEquals({'R2', 'R3', 'R1'}, self.membership.rows_for_cluster(2))
+        self.assertEquals({'C1', 'C2'}, snapshot.columns_for_cluster(1))
+
+    def test_threaded_writer(self):
+        """results and the last iteration are in the database after close()"""
+        writer = persistence.ResultWriter(self.config_params, self.ratios, {})
+        for iteration in [1, 2]:
+            iteration_result = {'iteration': iteration, 'score_means': {}}
+            writer.submit(persistence.IterationSnapshot(iteration_result, self.membership,
+                                                        write_results=True, write_stats=True))
+        writer.close()
+
+        session = cm2db.make_session_from_config(self.config_params)
+        try:
+            self.assertEquals(2, session.query(cm2db.RunInfo).first().last_iteration)
+            self.assertEquals(4, session.query(cm2db.RowMember).filter(
+                cm2db.RowMember.iteration == 2).count())
+            self.assertEquals(2, session.query(cm2db.ClusterStat).filter(
+                cm2db.ClusterStat.iteration == 1).count())
+        finally:
+            session.close()
+        self.assertEquals([1, 2], mstore.MembershipStore(self.outdir).iterations())
+
+    def test_writer_error(self):
+        """a failed write is reported to the producer"""
+        writer = persistence.ResultWriter(self.config_params, self.ratios, {})
+        iteration_result = {'iteration': 1, 'score_means': {'unknown': 1.0}}
+        writer.submit(persistence.IterationSnapshot(iteration_result, self.membership,
+                                                    write_stats=True))
+        self.assertRaises(Exception, writer.close)
+
+        session = cm2db.make_session_from_config(self.config_params)
+        try:
+            self.assertIsNone(session.query(cm2db.RunInfo).first().last_iteration)
+            self.assertEquals(0, session.query(cm2db.ClusterStat).count())
+        finally:
+            session.close()
+
+    def test_delete_iterations_after(self):
+        """results of iterations after the checkpoint are removed"""
+        writer = persistence.ResultWriter(self.config_params, self.ratios, {}, threaded=False,
+                                          session=cm2db.make_session_from_config(self.config_params))
+        for iteration in [1, 2]:
+            iteration_result = {'iteration': iteration, 'score_means': {}}
+            writer.submit(persistence.IterationSnapshot(iteration_result, self.membership,
+                                                        write_results=True, write_stats=True))
+        writer.close()
+
+        session = cm2db.make_session_from_config(self.config_params)
+        try:
+            persistence.delete_iterations_after(session, 1)
+            session.commit()
+            self.assertEquals(1, session.query(cm2db.RunInfo).first().last_iteration)
+            self.assertEquals(0, session.query(cm2db.RowMember).filter(
+                cm2db.RowMember.iteration == 2).count())
+            self.assertEquals(4, session.query(cm2db.RowMember).filter(
+                cm2db.RowMember.iteration == 1).count())
+            self.assertEquals(2, session.query(cm2db.ClusterStat).count())
+        finally:
+            session.close()
+
+
+class AppendLogTest(unittest.TestCase):
+    """Test class for AppendLog"""
+
+    def setUp(self):
+        self.outdir = tempfile.mkdtemp()
+        self.path = os.path.join(self.outdir, 'log.csv')
+
+    def tearDown(self):
+        shutil.rmtree(self.outdir)
+
+    def test_write_rows(self):
+        log = persistence.AppendLog(self.path, ',1,2')
+        log.write_row([1, 'set1', 'set2'])
+        log.write_row([2, 'set3', None])
+        log.close()
+        with open(self.path) as infile:
+            self.assertEquals(',1,2\n1,set1,set2\n2,set3,None', infile.read())
+
+    def test_append(self):
+        """the header is only written once, when the file is created"""
+        log = persistence.AppendLog(self.path, ',1')
+        log.write_row([1, 0.5])
+        log.close()
+        log = persistence.AppendLog(self.path, ',1')
+        log.write_row([2, 0.25])
+        log.flush()
+        with open(self.path) as infile:
+            self.assertEquals(',1\n1,0.5\n2,0.25', infile.read())
+        log.close()
+
+    def test_no_rows(self):
+        """nothing is created if no rows are written"""
+        persistence.AppendLog(self.path, ',1').close()
+        self.assertFalse(os.path.exists(self.path))
+
+    def test_remove_after(self):
+        """rows of later iterations are removed, the header is kept"""
+        log = persistence.AppendLog(self.path, 'iteration,value')
+        for iteration in range(1, 5):
+            log.write_row([iteration, 0.5])
+        log.write_row([10, 0.25])
+        log.close()
+        persistence.AppendLog(self.path, 'iteration,value').remove_after(2)
+        with open(self.path) as infile:
+            self.assertEquals('iteration,value\n1,0.5\n2,0.5', infile.read())
+
+    def test_remove_after_append(self):
+        """rows can be appended after removing"""
+        log = persistence.AppendLog(self.path, 'iteration,value')
+        log.write_row([1, 0.5])
+        log.write_row([2, 0.5])
+        log.remove_after(1)
+        log.write_row([2, 0.25])
+        log.close()
+        with open(self.path) as infile:
+            self.assertEquals('iteration,value\n1,0.5\n2,0.25', infile.read())
+
+    def test_remove_after_no_file(self):
+        """nothing is created if the file does not exist"""
+        persistence.AppendLog(self.path, 'iteration,value').remove_after(1)
+        self.assertFalse(os.path.exists(self.path))
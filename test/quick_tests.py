@@ -11,6 +11,7 @@ import datamatrix_test as dmtest
 import util_test as ut
 import organism_test as ot
 import seqtools_test as stt
+import motif_test as mott
 import thesaurus_test as tht
 import operon_nw_test as opnwt
 import network_test as nwt
@@ -20,6 +21,15 @@ import pssm_test as pt
 import combiner_test as ct
 import read_wee_test as rwt
 import setenrichment_test as se_test
+import persistence_test as pst
+import organism_bundle_test as obt
+import database_test as dbt
+import debug_test
+import membership_store_test as mst
+import checkpoint_test as cpt
+import instrumentation_test as it
+import bscm_test
+import webapp_test
 import sys
 
 
@@ -29,6 +39,8 @@ if __name__ == '__main__':
     SUITE.append(unittest.TestLoader().loadTestsFromTestCase(dmtest.DataMatrixTest))
     SUITE.append(unittest.TestLoader().loadTestsFromTestCase(dmtest.DataMatrixReadWriteTest))
     SUITE.append(unittest.TestLoader().loadTestsFromTestCase(dmtest.NoChangeFilterTest))
+    SUITE.append(unittest.TestLoader().loadTestsFromTestCase(dmtest.RatiosFilterTest))
+    SUITE.append(unittest.TestLoader().loadTestsFromTestCase(dmtest.RatiosCacheTest))
     SUITE.append(unittest.TestLoader().loadTestsFromTestCase(dmtest.CenterScaleFilterTest))
     SUITE.append(unittest.TestLoader().loadTestsFromTestCase(dmtest.QuantileNormalizeTest))
 
@@ -39,12 +51,16 @@ if __name__ == '__main__':
     SUITE.append(unittest.TestLoader().loadTestsFromTestCase(ut.Order2StringTest))
 
     SUITE.append(unittest.TestLoader().loadTestsFromTestCase(ot.MicrobeTest))
+    SUITE.append(unittest.TestLoader().loadTestsFromTestCase(ot.FeatureIdsTest))
 
     SUITE.append(unittest.TestLoader().loadTestsFromTestCase(stt.SeqtoolsTest))
+    SUITE.append(unittest.TestLoader().loadTestsFromTestCase(stt.DustTest))
     SUITE.append(unittest.TestLoader().loadTestsFromTestCase(stt.FastaTest))
     SUITE.append(unittest.TestLoader().loadTestsFromTestCase(stt.LocationTest))
+    SUITE.append(unittest.TestLoader().loadTestsFromTestCase(mott.SequenceFilterTest))
 
     SUITE.append(unittest.TestLoader().loadTestsFromTestCase(tht.DelimitedFileFactoryTest))
+    SUITE.append(unittest.TestLoader().loadTestsFromTestCase(tht.ThesaurusTest))
 
     SUITE.append(unittest.TestLoader().loadTestsFromTestCase(opnwt.ReadOperonNetworkTest))
     SUITE.append(unittest.TestLoader().loadTestsFromTestCase(opnwt.GetOperonPairsTest))
@@ -55,6 +71,8 @@ if __name__ == '__main__':
     SUITE.append(unittest.TestLoader().loadTestsFromTestCase(mat.ComputeArrayScoresTest))
 
     SUITE.append(unittest.TestLoader().loadTestsFromTestCase(met.MemeTest))
+    SUITE.append(unittest.TestLoader().loadTestsFromTestCase(met.MemeVersionTest))
+    SUITE.append(unittest.TestLoader().loadTestsFromTestCase(met.MemeStubTest))
 
     SUITE.append(unittest.TestLoader().loadTestsFromTestCase(pt.PssmTest))
     SUITE.append(unittest.TestLoader().loadTestsFromTestCase(ct.CombinerTest))
@@ -64,6 +82,19 @@ if __name__ == '__main__':
     SUITE.append(unittest.TestLoader().loadTestsFromTestCase(se_test.CutoffEnrichmentSetTest))
     SUITE.append(unittest.TestLoader().loadTestsFromTestCase(se_test.SetTypeTest))
     SUITE.append(unittest.TestLoader().loadTestsFromTestCase(se_test.SetEnrichmentComputeClusterScoreTest))
+    SUITE.append(unittest.TestLoader().loadTestsFromTestCase(pst.PersistenceTest))
+    SUITE.append(unittest.TestLoader().loadTestsFromTestCase(pst.AppendLogTest))
+    SUITE.append(unittest.TestLoader().loadTestsFromTestCase(obt.OrganismBundleTest))
+    SUITE.append(unittest.TestLoader().loadTestsFromTestCase(dbt.DatabaseMigrationTest))
+    SUITE.append(unittest.TestLoader().loadTestsFromTestCase(debug_test.WriteIterationTest))
+    SUITE.append(unittest.TestLoader().loadTestsFromTestCase(mst.MembershipStoreTest))
+    SUITE.append(unittest.TestLoader().loadTestsFromTestCase(cpt.CheckpointTest))
+    SUITE.append(unittest.TestLoader().loadTestsFromTestCase(it.InstrumentationTest))
+    SUITE.append(unittest.TestLoader().loadTestsFromTestCase(bscm_test.BackgroundSamplingTest))
+    SUITE.append(unittest.TestLoader().loadTestsFromTestCase(bscm_test.BackgroundStoreTest))
+    SUITE.append(unittest.TestLoader().loadTestsFromTestCase(bscm_test.GetPvalsTest))
+    SUITE.append(unittest.TestLoader().loadTestsFromTestCase(webapp_test.RatiosTest))
+    SUITE.append(unittest.TestLoader().loadTestsFromTestCase(webapp_test.LRUCacheTest))
 
     if len(sys.argv) > 1 and sys.argv[1] == 'xml':
       xmlrunner.XMLTestRunner(output='test-reports').run(unittest.TestSuite(SUITE))
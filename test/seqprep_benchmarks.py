@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""seqprep_benchmarks.py - micro-benchmarks for the sequence preparation stage
+
+Times the functions that prepare the upstream sequences of every cluster
+before MEME is run: the sequence filters, low-complexity masking, reverse complements and the
+Markov background model. The sequences are synthetic, so the benchmarks
+can be run without organism data:
+
+  $ PYTHONPATH=. python test/seqprep_benchmarks.py --num_seqs 4000
+
+This file is part of cMonkey Python. Please see README and LICENSE for
+more information and licensing details.
+"""
+import argparse
+import os
+import random
+import timeit
+
+import cmonkey.seqtools as st
+import cmonkey.motif as motif
+import cmonkey.meme as meme
+
+
+def make_sequences(num_seqs, seq_len, degenerate_fraction=0.01):
+    """returns a dictionary feature id -> (location, sequence) of random
+    sequences, a small fraction of residues is degenerate"""
+    result = {}
+    for index in range(num_seqs):
+        seq = ''.join(random.choice('ACGT') if random.random() >= degenerate_fraction
+                      else random.choice('RYKMSWN')
+                      for _ in range(seq_len))
+        result['F%05d' % index] = (st.Location('contig', index, index + seq_len, False), seq)
+    return result
+
+
+def benchmarks(seqs, cluster_size):
+    """returns a list of (name, function) pairs to time"""
+    feature_ids = sorted(seqs.keys())
+    plain_seqs = {feature_id: locseq[1] for feature_id, locseq in seqs.items()}
+    clusters = [feature_ids[start:start + cluster_size]
+                for start in range(0, len(feature_ids), cluster_size)]
+    atgs_filter = motif.get_remove_atgs_filter((-20, 150))
+
+    def revcomp():
+        for seq in plain_seqs.values():
+            st.revcomp(seq)
+
+    def unique_filter():
+        for cluster in clusters:
+            motif.unique_filter(plain_seqs, cluster)
+
+    def remove_atgs():
+        for cluster in clusters:
+            atgs_filter({feature_id: plain_seqs[feature_id] for feature_id in cluster}, cluster)
+
+    def dust():
+        for seq in plain_seqs.values():
+            st.dust(seq)
+
+    def replace_degenerate_residues():
+        st.replace_degenerate_residues(list(plain_seqs.values()))
+
+    def markov_background():
+        st.markov_background(list(plain_seqs.values()), 3)
+
+    def background_file():
+        filename, _ = meme.make_background_file(seqs, True, 3)
+        os.remove(filename)
+
+    return [('revcomp', revcomp),
+            ('unique_filter', unique_filter),
+            ('remove_atgs', remove_atgs),
+            ('dust', dust),
+            ('replace_degenerate_residues', replace_degenerate_residues),
+            ('markov_background', markov_background),
+            ('make_background_file', background_file)]
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='sequence preparation micro-benchmarks')
+    parser.add_argument('--num_seqs', type=int, default=4000, help='number of sequences')
+    parser.add_argument('--seq_len', type=int, default=250, help='sequence length')
+    parser.add_argument('--cluster_size', type=int, default=30, help='genes per cluster')
+    parser.add_argument('--repeat', type=int, default=5, help='number of repetitions')
+    args = parser.parse_args()
+
+    random.seed(42)
+    seqs = make_sequences(args.num_seqs, args.seq_len)
+    print('%d sequences of length %d, %d genes per cluster, best of %d' %
+          (args.num_seqs, args.seq_len, args.cluster_size, args.repeat))
+    for name, fun in benchmarks(seqs, args.cluster_size):
+        elapsed = min(timeit.repeat(fun, number=1, repeat=args.repeat))
+        print('%-30s %10.2f ms' % (name, elapsed * 1000.0))
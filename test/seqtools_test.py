@@ -70,6 +70,20 @@ class SeqtoolsTest(unittest.TestCase):  # pylint: disable-msg=R0904
         self.assertEquals(2, counts['AT'])
         self.assertEquals(2, counts['CA'])
 
+    def test_kmer_counts(self):
+        """test kmer_counts() with several lengths, subsequences do not
+        cross sequence boundaries"""
+        counts = st.kmer_counts(["ACCGTATA", "CACAT", "", "X"], [1, 3])
+        self.assertEquals(2, len(counts))
+        self.assertEquals({'A': 5, 'C': 4, 'G': 1, 'T': 3, 'X': 1}, counts[0])
+        self.assertEquals({'ACC': 1, 'CCG': 1, 'CGT': 1, 'GTA': 1, 'TAT': 1, 'ATA': 1,
+                           'CAC': 1, 'ACA': 1, 'CAT': 1}, counts[1])
+
+    def test_kmer_counts_empty(self):
+        """test kmer_counts() with sequences shorter than the subsequences"""
+        self.assertEquals([{}], st.kmer_counts([], [2]))
+        self.assertEquals([{}], st.kmer_counts(["A", "C"], [2]))
+
     def test_subseq_frequencies_1(self):
         """test subseq_frequencies() with length 1"""
         freqs = st.subseq_frequencies(["ACCGTATA", "CACAT"], 1)
@@ -113,6 +127,32 @@ class SeqtoolsTest(unittest.TestCase):  # pylint: disable-msg=R0904
         self.assertTrue(re.match('ACGT[GA][TC] [GT][AC][GC][AT][GATC]', newseq) != None)
 
 
+class DustTest(unittest.TestCase):  # pylint: disable-msg=R0904
+    """Test class for the DUST low-complexity filter"""
+
+    def test_dust_homopolymer(self):
+        seq = 'GCTTGCAGGCGCTCGGGTCG' + 'A' * 30 + 'ATCGACGACGAGCGTCGAATCG'
+        self.assertEquals('GCTTGCAGGCGCTCGGGTCG' + 'N' * 31 + 'TCGACGACGAGCGTCGAATCG',
+                          st.dust(seq))
+
+    def test_dust_dinucleotide_repeat(self):
+        """the repeat spans several windows"""
+        seq = 'TTGCAGGCGC' + 'CA' * 40 + 'GTCGAATCGATTCGCGGACATGCGATGTGAACTG'
+        self.assertEquals('TTGCAGGCGC' + 'N' * 80 + 'GTCGAATCGATTCGCGGACATGCGATGTGAACTG',
+                          st.dust(seq))
+
+    def test_dust_unmasked(self):
+        self.assertEquals('', st.dust(''))
+        self.assertEquals('AC', st.dust('AC'))
+        self.assertEquals('ACGTTGCAACGTTGCA', st.dust('ACGTTGCAACGTTGCA'))
+        for _, seq in st.read_sequences_from_fasta_file('testdata/meme_input1.fasta'):
+            self.assertEquals(seq, st.dust(seq))
+
+    def test_dust_level(self):
+        seq = 'GCTTGCAGGCGCTCGGGTCG' + 'A' * 30 + 'ATCGACGACGAGCGTCGAATCG'
+        self.assertEquals(seq, st.dust(seq, level=1000))
+
+
 class FastaTest(unittest.TestCase):  # pylint: disable-msg=R0904
     """Test class for FASTA related functions"""
 
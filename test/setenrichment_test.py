@@ -5,7 +5,10 @@ more information and licensing details.
 """
 import unittest
 import json
+import math
+import random
 import numpy as np
+import scipy.stats
 import cmonkey.set_enrichment as se
 import cmonkey.datamatrix as dm
 import cmonkey.util as util
@@ -78,3 +81,49 @@ class SetEnrichmentComputeClusterScoreTest(unittest.TestCase):
                                                                      self.canonical_row_indexes)
         self.assertEquals('hsa-miR-9', min_set)
         self.assertAlmostEquals(0.000212407251628, min_pvalue)
+
+    def reference_cluster_score(self, cluster_genes, cutoff, ref_min_score, set_type):
+        """direct per-set computation the batched version is checked against"""
+        cluster_genes = {gene for gene in cluster_genes if gene in set_type.genes()}
+        best = None
+        for set_name in sorted(set_type.sets.keys()):
+            set_genes = set_type.sets[set_name].genes()
+            overlap = len(cluster_genes.intersection(set_genes))
+            if overlap > 0:
+                pvalue = scipy.stats.hypergeom.sf(overlap, len(set_type.genes()), len(set_genes),
+                                                  len(cluster_genes))
+                if best is None or pvalue < best[1]:
+                    best = (set_name, pvalue)
+        if best is None:
+            return np.zeros(self.ratios.num_rows), 'NA', np.nan
+        scores = np.zeros(self.ratios.num_rows)
+        min_genes = set_type.sets[best[0]].genes()
+        scores[[self.canonical_row_indexes[gene] for gene in min_genes]] = 0.5
+        scores[[self.canonical_row_indexes[gene]
+                for gene in cluster_genes.intersection(min_genes)]] = 1.0
+        dampened = 1.0 if best[1] <= cutoff else math.log10(best[1]) / math.log10(cutoff)
+        return scores / dampened * ref_min_score, best[0], best[1]
+
+    def test_batched(self):
+        """scores of many clusters at once are the same as computed per cluster"""
+        set_type = self.set_types[0]
+        cutoff = 0.05 / 50
+        ref_min_score = -4.702276
+        compiled = se.CompiledSetType(set_type, self.ratios.num_rows, self.canonical_rownames,
+                                      self.canonical_row_indexes)
+        rand = random.Random(42)
+        set_genes = sorted(set_type.genes())
+        clusters = [rand.sample(set_genes, 20) + rand.sample(self.ratios.row_names, 10)
+                    for _ in range(50)]
+        cluster_rows = [{self.canonical_row_indexes[self.synonyms.get(gene, gene)] for gene in genes}
+                        for genes in clusters]
+        results = se.compute_cluster_scores(compiled, cluster_rows, cutoff, ref_min_score,
+                                            self.ratios.num_rows)
+        self.assertEquals(50, len(results))
+        for genes, (scores, min_set, min_pvalue) in zip(clusters, results):
+            canonical = {self.synonyms.get(gene, gene) for gene in genes}
+            ref_scores, ref_set, ref_pvalue = self.reference_cluster_score(canonical, cutoff,
+                                                                           ref_min_score, set_type)
+            self.assertEquals(ref_set, min_set)
+            self.assertAlmostEquals(ref_pvalue, min_pvalue)
+            self.assertTrue(np.allclose(ref_scores, scores))
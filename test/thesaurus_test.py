@@ -76,3 +76,54 @@ class DelimitedFileFactoryTest(unittest.TestCase):  # pylint: disable-msg=R0904
         self.assertEquals('NAME1', thes['ALT1'])
         self.assertEquals('NAME2', thes['PRIME2'])
         self.assertEquals('NAME2', thes['VNG2664G'])
+
+
+class ThesaurusTest(unittest.TestCase):  # pylint: disable-msg=R0904
+    """Test class for Thesaurus"""
+
+    def setUp(self):  # pylint: disable-msg=C0103
+        self.thes = thesaurus.create_from_delimited_file1(MockDelimitedFile1())
+
+    def test_mapping(self):
+        """the thesaurus behaves like a dictionary alias -> primary name"""
+        self.assertEquals({'alt1': 'gene1', 'alt2': 'gene1', 'alt3': 'gene2'}, self.thes)
+        self.assertEquals(3, len(self.thes))
+        self.assertTrue('alt1' in self.thes)
+        self.assertFalse('ALT1' in self.thes)
+        self.assertEquals('gene2', self.thes.get('alt3'))
+        self.assertEquals('x', self.thes.get('gene1', 'x'))
+        self.assertRaises(KeyError, self.thes.__getitem__, 'gene1')
+
+    def test_gene_ids(self):
+        """aliases of the same gene share an id"""
+        self.assertEquals(['gene1', 'gene2'], self.thes.names)
+        self.assertEquals(0, self.thes.gene_id('alt2'))
+        self.assertEquals(-1, self.thes.gene_id('alt4'))
+        self.assertEquals([0, 1, -1, 0], self.thes.resolve(['alt1', 'alt3', 'alt4', 'alt2']).tolist())
+        self.assertEquals(0, len(self.thes.resolve([])))
+
+    def test_canonical_names(self):
+        """unknown aliases are returned unchanged"""
+        self.assertEquals(['gene1', 'alt4', 'gene2'],
+                          self.thes.canonical_names(['alt2', 'alt4', 'alt3']))
+
+    def test_remap(self):
+        """an alias that is added again is mapped to the new primary name"""
+        self.thes.add('alt1', 'gene2')
+        self.assertEquals('gene2', self.thes['alt1'])
+        self.assertEquals(3, len(self.thes))
+
+    def test_case_insensitive(self):
+        thes = thesaurus.create_from_delimited_file2(MockDelimitedFile2(),
+                                                     case_sensitive=False)
+        self.assertEquals('GENE1', thes['alt1'])
+        self.assertEquals('GENE1', thes['Alt2'])
+        self.assertTrue('gene2' in thes)
+        self.assertEquals([0, 1, -1], thes.resolve(['alt1', 'Alt3', 'alt4']).tolist())
+
+    def test_as_thesaurus(self):
+        synonyms = {'alt1': 'gene1', 'alt2': 'gene1'}
+        thes = thesaurus.as_thesaurus(synonyms)
+        self.assertEquals(synonyms, thes)
+        self.assertEquals(['gene1'], thes.names)
+        self.assertTrue(thes is thesaurus.as_thesaurus(thes))
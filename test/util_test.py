@@ -72,6 +72,46 @@ class DelimitedFileTest(unittest.TestCase):  # pylint: disable-msg=R0904
         self.assertEquals(["value21", "value22"], lines[1])
         self.assertIsNone(dfile.header)
 
+    def test_iter_dfile(self):
+        """streams the rows of a delimited file"""
+        rows = util.iter_dfile("testdata/withemptylines.ssv", sep=';',
+                               has_header=True, comment='#', quote='"')
+        self.assertEquals([["value11", "value12"], ["value21", "value22"]],
+                          list(rows))
+
+    def test_iter_dfile_columns(self):
+        """only returns the projected columns"""
+        rows = list(util.iter_dfile("testdata/simple.tsv", columns=[1, 0]))
+        self.assertEquals([("value12", "value11"), ("value22", "value21")], rows)
+        rows = list(util.iter_dfile("testdata/simple.tsv", columns=[1]))
+        self.assertEquals([("value12",), ("value22",)], rows)
+
+    def test_iter_dfile_gzip(self):
+        """streams a gzip compressed file"""
+        header = next(util.iter_dfile("testdata/acc_rnaseq.tsv.gz"))
+        rows = util.iter_dfile("testdata/acc_rnaseq.tsv.gz", has_header=True)
+        dfile = util.read_dfile("testdata/acc_rnaseq.tsv.gz", has_header=True)
+        self.assertEquals(dfile.header, header)
+        self.assertEquals(dfile.lines, list(rows))
+
+    def test_dfile_rows_multichar_separator(self):
+        rows = util.dfile_rows(["a::b\n", "\n", "c::d"], sep='::')
+        self.assertEquals([["a", "b"], ["c", "d"]], list(rows))
+
+    def test_dfile_rows_long_field_and_carriage_return(self):
+        """fields are not limited in length and a carriage return inside a
+        line is kept in its field"""
+        rows = list(util.dfile_rows(["a\t" + "x" * 200000 + "\r\n", "b\tc\rd\n"]))
+        self.assertEquals(200000, len(rows[0][1]))
+        self.assertEquals(['b', 'c\rd'], rows[1])
+
+    def test_read_dfile_map(self):
+        """reads a map from two columns"""
+        dfile_map = util.read_dfile_map("testdata/simple.tsv", 0, 1)
+        self.assertEquals("value12", dfile_map["value11"])
+        self.assertEquals("value22", dfile_map["value21"])
+        self.assertIsNone(dfile_map["value12"])
+
 
 class LevenshteinDistanceTest(unittest.TestCase):  # pylint: disable-msg=R0904
     """Test class for levenshtein_distance"""
@@ -0,0 +1,83 @@
+"""webapp_test.py - unit test module for the cluster viewer web application
+
+This file is part of cMonkey Python. Please see README and LICENSE for
+more information and licensing details.
+"""
+import unittest
+import numpy as np
+
+import cmonkey.cmviewer.webapp as webapp
+
+
+class RatiosTest(unittest.TestCase):  # pylint: disable-msg=R0904
+    """Test class for the plot data of the viewer's Ratios"""
+
+    def setUp(self):
+        # the values of condition C<j> are j * 10 + [1, 2, 3, 4, 5]
+        values = np.array([[j * 10.0 + i for j in range(1, 5)] for i in range(1, 6)])
+        values[0, 3] = np.nan
+        values[:, 2] = np.nan
+        self.ratios = webapp.Ratios(['G1', 'G2', 'G3', 'G4', 'G5'],
+                                    ['C1', 'C2', 'C3', 'C4'], values)
+
+    def test_subratios_for(self):
+        """the cluster columns are moved to the front"""
+        subratios = self.ratios.subratios_for(['G2', 'G1'], ['C4', 'C2'])
+        self.assertEquals(['G2', 'G1'], subratios.genes)
+        self.assertEquals(['C4', 'C2', 'C1', 'C3'], subratios.conds)
+        self.assertEquals(42.0, subratios.data[0, 0])
+        self.assertEquals(12.0, subratios.data[0, 2])
+
+    def test_hs_subratios_for(self):
+        """NA values are plotted as 0"""
+        series = self.ratios.hs_subratios_for(['G1'], ['C4'])
+        self.assertEquals([{'name': 'G1', 'data': [0.0, 11.0, 21.0, 0.0]}], series)
+
+    def test_boxplot_quantiles(self):
+        """the boxplot rows are the quartiles of the columns, the columns in
+        the cluster come first, each part is sorted by the median"""
+        genes = ['G1', 'G2', 'G3', 'G4', 'G5']
+        rows = self.ratios.hs_boxplot_data_for(genes, ['C2', 'C1'])
+        self.assertEquals([[11.0, 12.0, 13.0, 14.0, 15.0],
+                           [21.0, 22.0, 23.0, 24.0, 25.0],
+                           [0.0, 0.0, 0.0, 0.0, 0.0],
+                           [42.0, 42.75, 43.5, 44.25, 45.0]], rows)
+
+    def test_boxplot_nan_column(self):
+        """columns that only contain NA values are plotted as 0"""
+        rows = self.ratios.hs_boxplot_data_for(['G1', 'G2'], ['C3'])
+        self.assertEquals([0.0, 0.0, 0.0, 0.0, 0.0], rows[0])
+
+    def test_boxplot_empty_cluster(self):
+        """a cluster without rows has no boxplot"""
+        self.assertEquals([], self.ratios.hs_boxplot_data_for([], ['C1']))
+        data = self.ratios.hs_cluster_data_for([], ['C1'])
+        self.assertEquals([], data['expressions'])
+        self.assertEquals([], data['boxplot'])
+
+
+class LRUCacheTest(unittest.TestCase):  # pylint: disable-msg=R0904
+    """Test class for LRUCache"""
+
+    def test_get(self):
+        """values are only computed once"""
+        cache = webapp.LRUCache(2)
+        calls = []
+
+        def compute():
+            calls.append(1)
+            return 'value'
+        self.assertEquals('value', cache.get('key', compute))
+        self.assertEquals('value', cache.get('key', compute))
+        self.assertEquals(1, len(calls))
+
+    def test_eviction(self):
+        """the least recently used entry is evicted"""
+        cache = webapp.LRUCache(2)
+        cache.get(1, lambda: 'one')
+        cache.get(2, lambda: 'two')
+        cache.get(1, lambda: 'one')
+        cache.get(3, lambda: 'three')
+        self.assertEquals([1, 3], list(cache.entries.keys()))
+        self.assertEquals('two again', cache.get(2, lambda: 'two again'))
+        self.assertEquals([3, 2], list(cache.entries.keys()))